@@ -31,6 +31,27 @@ else:
 # Install these dependencies:
 # pip install firebase-admin python-dateutil requests python-dotenv
 
+# Shared helpers (address keys, gazetteer, geocode cache, polygon index) live with the
+# Python functions; FUNCTIONS_PYTHON_DIR points at that folder when the ETL is not run
+# from a full checkout of the repository.
+FUNCTIONS_PYTHON_DIR = os.getenv(
+	"FUNCTIONS_PYTHON_DIR",
+	os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "my-app", "functions-python"),
+)
+if FUNCTIONS_PYTHON_DIR not in sys.path:
+	sys.path.append(FUNCTIONS_PYTHON_DIR)
+try:
+	import address_keys
+	import gazetteer
+	import geocode_cache
+	import polygon_index
+except ImportError as error:
+	raise ImportError(
+		f"The ETL needs the shared helpers in my-app/functions-python, looked for in {FUNCTIONS_PYTHON_DIR} "
+		f"({error}). Run it from a full checkout of the repository or set FUNCTIONS_PYTHON_DIR to that "
+		"folder, and install ETL/requirements.txt."
+	) from error
+
 
 import firebase_admin
 from firebase_admin import credentials, firestore
@@ -220,15 +241,68 @@ def _paced_geocode_get(url: str, timeout: int = 10) -> requests.Response:
 		return response
 
 
-def get_ward_from_coordinates(coordinates: Optional[List[float]]) -> Optional[str]:
-	"""Resolve a DC Ward from [latitude, longitude] without changing Firestore."""
-	if not coordinates or len(coordinates) != 2:
-		return None
+# Generated lookup files (ward boundaries, geocode cache, gazetteer) live next to this script.
+ETL_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
 
-	lat, lng = coordinates
-	if not all(isinstance(value, (int, float)) for value in (lat, lng)):
-		return None
+_WARD_INDEX = None
+_WARD_INDEX_LOADED = False
+_WARD_INDEX_LOCK = Lock()
+
+
+def _ward_boundaries_path() -> str:
+	return os.getenv("DC_WARD_GEOJSON_PATH", os.path.join(ETL_CACHE_DIR, "dc_wards.geojson"))
+
+
+def _download_ward_boundaries(path: str) -> None:
+	"""Save every ward polygon from the DC GIS service as GeoJSON (one request)."""
+	logger.info("Downloading DC ward boundaries from %s to %s", DC_WARD_SERVICE_URL, path)
+	params = {
+		"f": "geojson",
+		"where": "1=1",
+		"outFields": "NAME,WARD",
+		"outSR": "4326",
+		"returnGeometry": "true",
+	}
+	response = requests.get(f"{DC_WARD_SERVICE_URL}?{requests.compat.urlencode(params)}", timeout=60)
+	response.raise_for_status()
+	geojson = response.json()
+	if not geojson.get("features"):
+		raise ValueError("ward service returned no features")
+	directory = os.path.dirname(path)
+	if directory:
+		os.makedirs(directory, exist_ok=True)
+	with open(path, "w", encoding="utf-8") as f:
+		json.dump(geojson, f)
+
+
+def _get_ward_index():
+	"""Local ward polygon index, or None when the boundaries cannot be loaded.
+
+	Reads DC_WARD_GEOJSON_PATH, downloading the boundaries there once when the
+	file is missing (unless WARD_BOUNDARY_DOWNLOAD=0). A failed load is not
+	retried for the rest of the run.
+	"""
+	global _WARD_INDEX, _WARD_INDEX_LOADED
+	with _WARD_INDEX_LOCK:
+		if not _WARD_INDEX_LOADED:
+			_WARD_INDEX_LOADED = True
+			path = _ward_boundaries_path()
+			try:
+				if not os.path.exists(path) and os.getenv("WARD_BOUNDARY_DOWNLOAD", "1") != "0":
+					_download_ward_boundaries(path)
+				_WARD_INDEX = polygon_index.PolygonIndex.from_file(
+					path,
+					lambda properties: normalize_ward_value(properties.get("WARD") or properties.get("NAME")),
+				)
+				logger.info("Loaded ward boundaries from %s: %s", path, _WARD_INDEX.stats())
+			except (OSError, requests.RequestException, ValueError, KeyError, TypeError) as error:
+				logger.warning("Ward boundaries unavailable (%s); %s", path, error)
+				_WARD_INDEX = None
+		return _WARD_INDEX
 
+
+def _get_ward_from_service(lat: float, lng: float) -> Optional[str]:
+	"""Remote ward lookup: one DC GIS query per point."""
 	params = {
 		"f": "json",
 		"geometry": f"{lng},{lat}",
@@ -249,23 +323,120 @@ def get_ward_from_coordinates(coordinates: Optional[List[float]]) -> Optional[st
 		attributes = features[0].get("attributes", {})
 		return normalize_ward_value(attributes.get("WARD") or attributes.get("NAME")) or None
 	except (requests.RequestException, ValueError, KeyError, TypeError) as error:
-		logger.warning("Ward lookup failed for coordinates %s: %s", coordinates, error)
+		logger.warning("Ward lookup failed for coordinates %s: %s", [lat, lng], error)
 		return None
 
+
+def get_wards_for_coordinates(coordinates_list: List[Optional[List[float]]]) -> List[Optional[str]]:
+	"""Resolve DC Wards for many [latitude, longitude] pairs in one vectorized lookup.
+
+	Uses the local ward polygons; when they are unavailable, falls back to one
+	DC GIS request per point unless WARD_REMOTE_FALLBACK=0.
+	"""
+	valid = [
+		index for index, coordinates in enumerate(coordinates_list)
+		if coordinates and len(coordinates) == 2
+		and all(isinstance(value, (int, float)) for value in coordinates)
+	]
+	wards: List[Optional[str]] = [None] * len(coordinates_list)
+	if not valid:
+		return wards
+	ward_index = _get_ward_index()
+	if ward_index is not None:
+		found = ward_index.lookup(
+			[coordinates_list[index][0] for index in valid],
+			[coordinates_list[index][1] for index in valid],
+		)
+		for index, ward in zip(valid, found):
+			wards[index] = ward or None
+	elif os.getenv("WARD_REMOTE_FALLBACK", "1") != "0":
+		for index in valid:
+			wards[index] = _get_ward_from_service(*coordinates_list[index])
+	return wards
+
+
+def get_ward_from_coordinates(coordinates: Optional[List[float]]) -> Optional[str]:
+	"""Resolve a DC Ward from [latitude, longitude] without changing Firestore."""
+	return get_wards_for_coordinates([coordinates])[0]
+
+
+def assign_wards(records: List[Dict[str, Any]]) -> None:
+	"""Set the ward of transformed client records from their coordinates in one lookup.
+
+	Records whose coordinates match no ward keep the spreadsheet's Ward.
+	"""
+	wards = get_wards_for_coordinates([record.get("coordinates") for record in records])
+	for record, ward in zip(records, wards):
+		if ward:
+			record["ward"] = normalize_ward_value(ward)
+
+_GEOCODE_CACHE = None
+_GEOCODE_CACHE_LOCK = Lock()
+
+
+def _get_geocode_cache():
+	"""Shared geocode cache, or None when GEOCODE_CACHE_BACKEND=none.
+
+	Defaults to a local SQLite file; GEOCODE_CACHE_BACKEND=firestore reads and
+	writes the same geocodeCache collection as geocode_addresses_endpoint.
+	"""
+	global _GEOCODE_CACHE
+	backend = os.getenv("GEOCODE_CACHE_BACKEND", "sqlite")
+	if backend == "none":
+		return None
+	with _GEOCODE_CACHE_LOCK:
+		if _GEOCODE_CACHE is None:
+			if backend == "firestore":
+				store = geocode_cache.FirestoreGeocodeStore("geocodeCache", firestore.client)
+			else:
+				store = geocode_cache.SQLiteGeocodeStore(
+					os.getenv("GEOCODE_CACHE_PATH", os.path.join(ETL_CACHE_DIR, "geocode_cache.sqlite3"))
+				)
+			_GEOCODE_CACHE = geocode_cache.GeocodeCache(
+				store,
+				ttl_seconds=_get_env_int("GEOCODE_CACHE_TTL_DAYS", 180) * 24 * 3600,
+				negative_ttl_seconds=_get_env_int("GEOCODE_CACHE_NEGATIVE_TTL_HOURS", 24) * 3600,
+			)
+		return _GEOCODE_CACHE
+
+
+_GAZETTEER = None
+_GAZETTEER_LOADED = False
+_GAZETTEER_LOCK = Lock()
+
+
+def _get_gazetteer():
+	"""Offline DC address points from GAZETTEER_PATH, or None when the file is absent.
+
+	Defaults to ETL/cache/dc_address_points.csv (a Master Address Repository
+	export); a .npz saved by gazetteer.Gazetteer.save loads faster.
+	"""
+	global _GAZETTEER, _GAZETTEER_LOADED
+	with _GAZETTEER_LOCK:
+		if not _GAZETTEER_LOADED:
+			_GAZETTEER_LOADED = True
+			path = os.getenv("GAZETTEER_PATH", os.path.join(ETL_CACHE_DIR, "dc_address_points.csv"))
+			if os.path.exists(path):
+				try:
+					_GAZETTEER = gazetteer.Gazetteer.load(path)
+					logger.info(f"Loaded gazetteer with {len(_GAZETTEER)} DC addresses from {path}")
+				except (OSError, ValueError) as e:
+					logger.warning(f"Gazetteer unavailable ({path}): {e}")
+		return _GAZETTEER
+
+
 def geocode_address_google(address, city, state, zip_code):
 	"""Geocode an address using Google Maps Geocoding API.
-	
+
+	DC addresses in the local gazetteer are answered without any request.
+	Other answers are read through the shared geocode cache, so an address
+	Google found no results for is not retried until its negative entry
+	expires. Failed requests (errors, quota, a bad key) are not cached.
+
 	Returns:
 		dict with 'latitude', 'longitude', and optionally 'zip_code' if found
 		None if geocoding fails
 	"""
-	global GEOCODING_RETRY_ATTEMPTS, GEOCODING_RECOVERED_AFTER_RETRY, GEOCODING_FAILED_AFTER_RETRIES
-	# Try REACT_APP_GOOGLE_MAPS_API_KEY first (from .env), then GOOGLE_MAPS_API_KEY
-	api_key = os.getenv("REACT_APP_GOOGLE_MAPS_API_KEY") or os.getenv("GOOGLE_MAPS_API_KEY", "")
-	if not api_key:
-		logger.warning("Google Maps API key not found in environment; skipping geocoding")
-		return None
-	
 	# Build full address
 	address_parts = [address]
 	if city:
@@ -276,7 +447,58 @@ def geocode_address_google(address, city, state, zip_code):
 		address_parts.append(str(zip_code))
 	
 	full_address = ", ".join(filter(None, address_parts))
-	
+
+	local_gazetteer = _get_gazetteer()
+	if local_gazetteer is not None:
+		match = local_gazetteer.lookup(full_address)
+		if match is not None:
+			latitude, longitude, gazetteer_zip = match
+			result = {'latitude': latitude, 'longitude': longitude}
+			if gazetteer_zip:
+				result['zip_code'] = gazetteer_zip
+			return result
+
+	# Try REACT_APP_GOOGLE_MAPS_API_KEY first (from .env), then GOOGLE_MAPS_API_KEY
+	api_key = os.getenv("REACT_APP_GOOGLE_MAPS_API_KEY") or os.getenv("GOOGLE_MAPS_API_KEY", "")
+	if not api_key:
+		logger.warning("Google Maps API key not found in environment; skipping geocoding")
+		return None
+
+	cache = _get_geocode_cache()
+	if cache is not None:
+		try:
+			entry = cache.get(full_address)
+		except Exception as e:
+			logger.warning(f"Geocode cache read failed for '{full_address}': {e}")
+			entry = None
+		if entry is not None:
+			if entry["status"] != geocode_cache.STATUS_OK:
+				return None
+			return {
+				'latitude': entry["lat"],
+				'longitude': entry["lng"],
+				'zip_code': entry["zip_code"]
+			}
+
+	result, status = _request_google_geocode(full_address, api_key)
+	if cache is not None and status != geocode_cache.STATUS_FAILED:
+		try:
+			cache.put(cache.entry(
+				full_address,
+				status,
+				"google-geocoding/etl",
+				lat=result['latitude'] if result else None,
+				lng=result['longitude'] if result else None,
+				zip_code=result['zip_code'] if result else None,
+			))
+		except Exception as e:
+			logger.warning(f"Geocode cache write failed for '{full_address}': {e}")
+	return result
+
+
+def _request_google_geocode(full_address, api_key):
+	"""Call the Geocoding API with retries; returns (result or None, cache status)."""
+	global GEOCODING_RETRY_ATTEMPTS, GEOCODING_RECOVERED_AFTER_RETRY, GEOCODING_FAILED_AFTER_RETRIES
 	params = {
 		'address': full_address,
 		'key': api_key
@@ -309,7 +531,7 @@ def geocode_address_google(address, city, state, zip_code):
 						'latitude': location['lat'],
 						'longitude': location['lng'],
 						'zip_code': extracted_zip
-					}
+					}, geocode_cache.STATUS_OK
 
 				# Retry transient/rate-limited statuses with exponential backoff.
 				if status in {'OVER_QUERY_LIMIT', 'UNKNOWN_ERROR'} and attempt < max_retries:
@@ -326,7 +548,9 @@ def geocode_address_google(address, city, state, zip_code):
 					GEOCODING_FAILED_AFTER_RETRIES += 1
 
 				logger.warning(f"Google Maps API returned status: {status} for address: {full_address}")
-				return None
+				if status == 'ZERO_RESULTS':
+					return None, geocode_cache.STATUS_NOT_FOUND
+				return None, geocode_cache.STATUS_FAILED
 
 			# Retry occasional gateway and service failures.
 			if resp.status_code in {429, 500, 502, 503, 504} and attempt < max_retries:
@@ -343,13 +567,13 @@ def geocode_address_google(address, city, state, zip_code):
 				GEOCODING_FAILED_AFTER_RETRIES += 1
 
 			logger.warning(f"Google Maps API request failed with status code: {resp.status_code}")
-			return None
+			return None, geocode_cache.STATUS_FAILED
 
 		logger.warning(f"Google Maps API exhausted retries for address: {full_address}")
-		return None
+		return None, geocode_cache.STATUS_FAILED
 	except Exception as e:
 		logger.warning(f"Error geocoding address '{full_address}': {e}")
-		return None
+		return None, geocode_cache.STATUS_FAILED
 
 # --- Begin full code from firebase_migration.py ---
 from urllib.parse import urlencode
@@ -370,6 +594,7 @@ class MigrationStats:
 	geocoding_retry_attempts: int = 0
 	geocoding_recovered_after_retry: int = 0
 	geocoding_failed_after_retries: int = 0
+	gazetteer_stats: Dict[str, Any] = None  # Offline gazetteer hits/misses and lookup latency
 	def __post_init__(self):
 		if self.unmapped_frequencies is None:
 			self.unmapped_frequencies = {}
@@ -396,16 +621,16 @@ class FirestoreMigration:
 		self.collection_name = collection_name
 		# ...existing code for Firestore client...
 
-		# Load spreadsheet ZIP mapping (ADDRESS -> ZIP)
+		# Load spreadsheet ZIP mapping (canonical address key -> ZIP)
 		self.address_zip_map = {}
 		try:
 			df = pd.read_excel(CLIENT_DATABASE_FILE_PATH, sheet_name=CLIENT_DATABASE_SHEET_NAME, dtype=str)
 			df = normalize_client_database_dataframe(df)
-			for idx, row in df.iterrows():
-				addr = str(row.get('ADDRESS', '')).strip().lower()
-				zip_val = str(row.get('ZIP', '')).strip()
-				if addr and zip_val:
-					self.address_zip_map[addr] = zip_val
+			if 'ADDRESS' in df.columns and 'ZIP' in df.columns:
+				keys = address_keys.address_key(df['ADDRESS'])
+				zips = df['ZIP'].fillna('').astype(str).str.strip()
+				found = (keys != '') & (zips != '') & (zips.str.lower() != 'nan')
+				self.address_zip_map = dict(zip(keys[found], zips[found]))
 		except Exception as e:
 			logger.warning(f"Could not load spreadsheet ZIP mapping: {e}")
 
@@ -574,13 +799,25 @@ class FirestoreMigration:
 				return True
         
 		return False
+	def _referral_form_index(self, referral_form_records):
+		# Built once per record list; addresses compare by canonical key so
+		# "123 Main Street NW, Apt 2" matches "123 Main St NW".
+		if getattr(self, "_referral_index_source", None) is not referral_form_records:
+			index = {}
+			for rec in referral_form_records:
+				key = (
+					str(rec.get('First Name', '')).strip().lower(),
+					str(rec.get('Last Name', '')).strip().lower(),
+					address_keys.address_key(rec.get('Address', '')),
+				)
+				index.setdefault(key, rec)
+			self._referral_index = index
+			self._referral_index_source = referral_form_records
+		return self._referral_index
+
 	def match_referral_form(self, first_name, last_name, address, referral_form_records):
-		for rec in referral_form_records:
-			if (str(rec.get('First Name', '')).strip().lower() == str(first_name).strip().lower() and
-				str(rec.get('Last Name', '')).strip().lower() == str(last_name).strip().lower() and
-				str(rec.get('Address', '')).strip().lower() == str(address).strip().lower()):
-				return rec
-		return None
+		key = (str(first_name).strip().lower(), str(last_name).strip().lower(), address_keys.address_key(address))
+		return self._referral_form_index(referral_form_records).get(key)
 
 	def parse_referral_entity(self, row: Dict[str, Any], referral_form_records=None) -> Dict[str, Any]:
 		import re
@@ -900,6 +1137,8 @@ class FirestoreMigration:
 				failed_inserts = []
 		skipped_inactive = 0
 		skipped_duplicate = 0
+		# Client writes wait for the batch's wards, which are resolved together after the loop.
+		pending_clients = []
 		# Load referral form records once
 		referral_form_records = self.load_referral_form('ETL/Client Referral Form v.3_20_24 (Responses).xlsx')
 		# Prefix used in the on-screen status to show the current batch
@@ -1169,10 +1408,7 @@ class FirestoreMigration:
 				transformed.pop("_referralContactPhone", None)
 				transformed.pop("_referralContactEmail", None)
 				doc_ref = self.db.collection(self.collection_name).document(doc_id)
-				if self.create_only:
-					batch.create(doc_ref, transformed)
-				else:
-					batch.set(doc_ref, transformed)
+				pending_clients.append((row, doc_ref, transformed))
 				successful += 1
 				# Update the on-screen current-record line for a successful insert
 				name_preview = f"{transformed.get('firstName', '')} {transformed.get('lastName', '')}".strip() or display_name
@@ -1203,6 +1439,19 @@ class FirestoreMigration:
 				self._advance_progress(
 					f"{batch_prefix}❌ Error: {display_name} (ID {row.get('ID', 'Unknown')}) [{idx}/{total_records}]"
 				)
+		assign_wards([transformed for _, _, transformed in pending_clients])
+		for row, doc_ref, transformed in pending_clients:
+			try:
+				if self.create_only:
+					batch.create(doc_ref, transformed)
+				else:
+					batch.set(doc_ref, transformed)
+			except Exception as e:
+				logger.error(f"[ERROR] Failed to stage client {row.get('ID', 'Unknown')}: {str(e)}")
+				successful -= 1
+				failed += 1
+				failed_inserts.append(row)
+				failed_client_inserts.append({"client": row, "error": str(e)})
 		logger.debug(f"[DEBUG] Batch summary: {skipped_inactive} inactive, {skipped_duplicate} duplicates, {skipped} total skipped, {successful} to insert")
 		try:
 			if successful > 0:
@@ -1424,6 +1673,9 @@ class FirestoreMigration:
 		self.stats.geocoding_retry_attempts = GEOCODING_RETRY_ATTEMPTS
 		self.stats.geocoding_recovered_after_retry = GEOCODING_RECOVERED_AFTER_RETRY
 		self.stats.geocoding_failed_after_retries = GEOCODING_FAILED_AFTER_RETRIES
+		if _GAZETTEER is not None:
+			self.stats.gazetteer_stats = _GAZETTEER.stats()
+			logger.info(f"Gazetteer: {self.stats.gazetteer_stats}")
 		return self.stats
 	def load_json_file(self, file_path: str) -> List[Dict[str, Any]]:
 		"""
@@ -1669,48 +1921,6 @@ class FirestoreMigration:
 				return ""
 			return text
 
-		def _extract_quadrant_abbreviation(value: Any) -> str:
-			"""Return normalized DC quadrant token (NW/NE/SW/SE) or empty string."""
-			cleaned = _clean_name(value)
-			if not cleaned:
-				return ""
-			standardized = re.sub(
-				r"\b(northwest|northeast|southwest|southeast)\b",
-				lambda m: {
-					"northwest": "NW",
-					"northeast": "NE",
-					"southwest": "SW",
-					"southeast": "SE",
-				}.get(m.group(1).lower(), m.group(0)),
-				cleaned,
-				flags=re.IGNORECASE,
-			)
-			match = re.search(r"\b(NE|NW|SE|SW)\b", standardized, flags=re.IGNORECASE)
-			return match.group(1).upper() if match else ""
-
-		def _normalize_address_directions(value: Any) -> str:
-			"""Normalize spelled-out DC directions in address text to NW/NE/SW/SE."""
-			cleaned = _clean_name(value)
-			if not cleaned:
-				return ""
-			return re.sub(
-				r"\b(northwest|northeast|southwest|southeast)\b",
-				lambda m: {
-					"northwest": "NW",
-					"northeast": "NE",
-					"southwest": "SW",
-					"southeast": "SE",
-				}.get(m.group(1).lower(), m.group(0)),
-				cleaned,
-				flags=re.IGNORECASE,
-			)
-
-		def _is_street_style_address(value: Any) -> bool:
-			"""Heuristic: real street addresses usually include at least one digit."""
-			cleaned = _clean_name(value)
-			if not cleaned:
-				return False
-			return bool(re.search(r"\d", cleaned))
 		first_name_raw = row.get("FIRST_database") or row.get("FIRST", "")
 		last_name_raw = row.get("LAST_database") or row.get("LAST", "")
 		first_name = _clean_name(first_name_raw)
@@ -1818,39 +2028,19 @@ class FirestoreMigration:
 
 		# --- Address handling: use main address up to quadrant for geocoding,
 		# and capture apartment/unit suffix into address2 when possible. ---
-		raw_address = _normalize_address_directions(row.get("ADDRESS"))
 		apt_from_col = _clean_name(row.get("APT")) or _clean_name(row.get("APT #"))
-		apt_from_address = ""
-		quadrant_value = _extract_quadrant_abbreviation(row.get("Quadrant_database")) or _extract_quadrant_abbreviation(row.get("Quadrant"))
-		quadrant_match = re.search(r"\b(NE|NW|SE|SW)\b", raw_address)
-		if quadrant_match:
-			quadrant_value = quadrant_match.group(1).upper()
-			end_idx = quadrant_match.end()
-			address_for_coords = raw_address[:end_idx].strip()
-			# Anything after the quadrant may contain apartment/unit info
-			remainder = raw_address[end_idx:].strip()
-		else:
-			# Split on first comma or apartment keyword to get the street part
-			parts = re.split(r",|\b(?:Apt|Apartment|Unit|#)\b", raw_address, maxsplit=1, flags=re.IGNORECASE)
-			address_for_coords = parts[0].strip()
-			remainder = raw_address[len(parts[0]):].strip() if len(parts) > 1 else ""
-		# If there is no explicit APT column value, try to extract an
-		# apartment/unit suffix from the remainder of the ADDRESS field.
-		if not apt_from_col and remainder:
-			m = re.search(r"\b(Apt|Apartment|Unit|#)\b\s*(.*)", remainder, flags=re.IGNORECASE)
-			if m:
-				label = m.group(1)
-				rest = m.group(2).strip()
-				apt_from_address = f"{label} {rest}".strip() if rest else label
-		# Spreadsheet often stores quadrant in a separate column; append it when the
-		# address string is missing a quadrant token so downstream UIs/exports are consistent.
-		# Skip status/non-address text rows (e.g., "DECEASED", "MOVED").
-		if (
-			quadrant_value
-			and _is_street_style_address(address_for_coords)
-			and not re.search(r"\b(NE|NW|SE|SW)\b", address_for_coords, flags=re.IGNORECASE)
-		):
-			address_for_coords = f"{address_for_coords} {quadrant_value}".strip()
+		# The spreadsheet often stores the quadrant in a separate column; split_address
+		# appends it when the address string is missing a quadrant token so downstream
+		# UIs/exports are consistent.
+		address_parts = address_keys.split_address(
+			row.get("ADDRESS"),
+			address_keys.extract_quadrant(row.get("Quadrant_database")) or address_keys.extract_quadrant(row.get("Quadrant")),
+		)
+		address_for_coords = address_parts.street
+		quadrant_value = address_parts.quadrant
+		# If there is no explicit APT column value, use the apartment/unit suffix
+		# from the remainder of the ADDRESS field.
+		apt_from_address = "" if apt_from_col else address_parts.unit
 		address = address_for_coords
 		city = _clean_name(row.get("City"))
 		state = _clean_name(row.get("State"))
@@ -1883,8 +2073,8 @@ class FirestoreMigration:
 		if not zip_code:
 			zip_code = str(zip_in_data) if zip_in_data else ""
 
-		ward_from_coordinates = get_ward_from_coordinates(coordinates)
-		ward_value = normalize_ward_value(ward_from_coordinates or row.get("Ward"))
+		# The spreadsheet's Ward until import_batch resolves the batch's coordinates (assign_wards).
+		ward_value = normalize_ward_value(row.get("Ward"))
 
 		DEFAULT_END_DATE_STR = "12/31/2026"
 		raw_end = row.get("EndDate") or row.get("End Date", "")
@@ -2249,6 +2439,15 @@ def main():
 		f"recovered after retry={stats.geocoding_recovered_after_retry}, "
 		f"failed after retries={stats.geocoding_failed_after_retries}"
 	)
+	if stats.gazetteer_stats:
+		print(
+			"Gazetteer summary: "
+			f"hits={stats.gazetteer_stats['hits']}, "
+			f"near hits={stats.gazetteer_stats['near_hits']}, "
+			f"misses={stats.gazetteer_stats['misses']}, "
+			f"hit rate={stats.gazetteer_stats['hit_rate']:.1%}, "
+			f"mean lookup={stats.gazetteer_stats['mean_lookup_us']}us"
+		)
 	print(f"Case workers collected: {len(migration.case_workers)}")
 	if stats.unmapped_frequencies:
 		print("\n⚠️  Unmapped frequency values found:")
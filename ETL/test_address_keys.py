@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+from unittest import TestCase
+
+import pandas as pd
+
+import firebase_migration_v2 as migration
+from address_keys import address_key
+
+
+class AddressKeySeriesTests(TestCase):
+    def test_series_keys_match_scalar_keys(self) -> None:
+        addresses = pd.Series([
+            "1600 Pennsylvania Avenue Northwest, Apt 2",
+            "45 K Street, Unit 3B",
+            None,
+            "DECEASED",
+        ])
+        keys = address_key(addresses)
+        self.assertIsInstance(keys, pd.Series)
+        self.assertEqual(keys.tolist(), [address_key(value) for value in addresses])
+
+
+class MatchReferralFormTests(TestCase):
+    def test_addresses_match_by_canonical_key(self) -> None:
+        migrator = migration.FirestoreMigration.__new__(migration.FirestoreMigration)
+        records = [
+            {"First Name": "Ana", "Last Name": "Diaz", "Address": "12 Oak Street NW, Apt 4"},
+            {"First Name": "Ana", "Last Name": "Diaz", "Address": "12 Oak St NE"},
+        ]
+        self.assertIs(migrator.match_referral_form("ana", "DIAZ", "12 oak st. NW", records), records[0])
+        self.assertIs(migrator.match_referral_form("Ana", "Diaz", "12 Oak Street Northeast", records), records[1])
+        self.assertIsNone(migrator.match_referral_form("Ana", "Diaz", "12 Oak St SE", records))
+
+
+class SharedHelperImportTests(TestCase):
+    def test_missing_functions_folder_fails_with_a_clear_error(self) -> None:
+        env = {**os.environ, "FUNCTIONS_PYTHON_DIR": os.path.join(os.sep, "nonexistent", "functions-python")}
+        env.pop("PYTHONPATH", None)
+        result = subprocess.run(
+            [sys.executable, "-c", "import firebase_migration_v2"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn("set FUNCTIONS_PYTHON_DIR", result.stderr)
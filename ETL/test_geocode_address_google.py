@@ -0,0 +1,82 @@
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+import firebase_migration_v2 as migration
+
+
+def _response(payload):
+    response = MagicMock(status_code=200)
+    response.json.return_value = payload
+    return response
+
+
+class GeocodeCacheReadThroughTests(TestCase):
+    def setUp(self) -> None:
+        self.tempdir = tempfile.TemporaryDirectory()
+        env = {
+            "GOOGLE_MAPS_API_KEY": "test-key",
+            "REACT_APP_GOOGLE_MAPS_API_KEY": "",
+            "GEOCODE_CACHE_BACKEND": "sqlite",
+            "GEOCODE_CACHE_PATH": os.path.join(self.tempdir.name, "geocode.sqlite3"),
+            "GAZETTEER_PATH": os.path.join(self.tempdir.name, "address_points.csv"),
+        }
+        self.env = patch.dict(os.environ, env)
+        self.env.start()
+        migration._GEOCODE_CACHE = None
+        migration._GAZETTEER = None
+        migration._GAZETTEER_LOADED = False
+
+    def tearDown(self) -> None:
+        if migration._GEOCODE_CACHE is not None:
+            migration._GEOCODE_CACHE.store.close()
+        migration._GEOCODE_CACHE = None
+        migration._GAZETTEER = None
+        migration._GAZETTEER_LOADED = False
+        self.env.stop()
+        self.tempdir.cleanup()
+
+    def test_second_lookup_is_served_from_cache(self) -> None:
+        payload = {
+            "status": "OK",
+            "results": [{
+                "geometry": {"location": {"lat": 38.9, "lng": -77.01}},
+                "address_components": [{"types": ["postal_code"], "long_name": "20001"}],
+            }],
+        }
+        with patch.object(migration, "_paced_geocode_get", return_value=_response(payload)) as get:
+            first = migration.geocode_address_google("1 Main St NW", "Washington", "DC", None)
+            second = migration.geocode_address_google("1 main st nw", "washington", "dc", None)
+
+        self.assertEqual(first, {"latitude": 38.9, "longitude": -77.01, "zip_code": "20001"})
+        self.assertEqual(second, first)
+        get.assert_called_once()
+        self.assertEqual(migration._GEOCODE_CACHE.get("1 Main St NW, Washington, DC")["source"], "google-geocoding/etl")
+
+    def test_failed_address_is_not_retried_while_negative_entry_is_fresh(self) -> None:
+        with patch.object(migration, "_paced_geocode_get", return_value=_response({"status": "ZERO_RESULTS"})) as get:
+            self.assertIsNone(migration.geocode_address_google("999 Nowhere Rd", None, None, None))
+            self.assertIsNone(migration.geocode_address_google("999 Nowhere Rd", None, None, None))
+
+        get.assert_called_once()
+        self.assertEqual(migration._GEOCODE_CACHE.get("999 Nowhere Rd")["status"], "not_found")
+
+    def test_failed_requests_are_not_cached(self) -> None:
+        with patch.object(migration, "_paced_geocode_get", return_value=_response({"status": "REQUEST_DENIED"})) as get:
+            self.assertIsNone(migration.geocode_address_google("1 Main St NW", None, None, None))
+            self.assertIsNone(migration.geocode_address_google("1 Main St NW", None, None, None))
+
+        self.assertEqual(get.call_count, 2)
+        self.assertIsNone(migration._GEOCODE_CACHE.get("1 Main St NW"))
+
+    def test_gazetteer_addresses_skip_google_and_the_cache(self) -> None:
+        with open(os.environ["GAZETTEER_PATH"], "w", encoding="utf-8") as f:
+            f.write("FULLADDRESS,LATITUDE,LONGITUDE,ZIPCODE\n1 MAIN STREET NW,38.91,-77.02,20001\n")
+        with patch.object(migration, "_paced_geocode_get") as get:
+            result = migration.geocode_address_google("1 Main St NW Apt 3", "Washington", "DC", None)
+
+        self.assertEqual(result, {"latitude": 38.91, "longitude": -77.02, "zip_code": "20001"})
+        get.assert_not_called()
+        self.assertEqual(migration._GAZETTEER.stats()["hits"], 1)
+        self.assertIsNone(migration._GEOCODE_CACHE)
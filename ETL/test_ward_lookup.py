@@ -0,0 +1,99 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+import firebase_migration_v2 as migration
+
+
+def _square(x0, y0, x1, y1):
+    return [[[x0, y0], [x1, y0], [x1, y1], [x0, y1], [x0, y0]]]
+
+
+BOUNDARIES = {
+    "type": "FeatureCollection",
+    "features": [
+        {"properties": {"NAME": "Ward 1", "WARD": 1}, "geometry": {"type": "Polygon", "coordinates": _square(-77.05, 38.90, -77.00, 38.95)}},
+        {"properties": {"NAME": "Ward 6", "WARD": 6}, "geometry": {"type": "Polygon", "coordinates": _square(-77.00, 38.85, -76.95, 38.90)}},
+    ],
+}
+
+
+class WardLookupTests(TestCase):
+    def setUp(self) -> None:
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tempdir.name, "wards.geojson")
+        self.env = patch.dict(os.environ, {"DC_WARD_GEOJSON_PATH": self.path, "WARD_BOUNDARY_DOWNLOAD": "0"})
+        self.env.start()
+        migration._WARD_INDEX = None
+        migration._WARD_INDEX_LOADED = False
+
+    def tearDown(self) -> None:
+        migration._WARD_INDEX = None
+        migration._WARD_INDEX_LOADED = False
+        self.env.stop()
+        self.tempdir.cleanup()
+
+    def test_local_boundaries_answer_a_batch_without_network(self) -> None:
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(BOUNDARIES, f)
+        with patch.object(migration, "_paced_geocode_get") as get:
+            wards = migration.get_wards_for_coordinates([
+                [38.92, -77.02],
+                None,
+                [38.87, -76.97],
+                [39.5, -77.0],
+            ])
+            single = migration.get_ward_from_coordinates([38.93, -77.01])
+        self.assertEqual(wards, ["1", None, "6", None])
+        self.assertEqual(single, "1")
+        get.assert_not_called()
+
+    def test_falls_back_to_service_when_boundaries_are_missing(self) -> None:
+        with patch.object(migration, "_get_ward_from_service", return_value="3") as service:
+            self.assertEqual(migration.get_wards_for_coordinates([[38.93, -77.06], []]), ["3", None])
+        service.assert_called_once_with(38.93, -77.06)
+
+    def test_fallback_can_be_disabled(self) -> None:
+        with patch.dict(os.environ, {"WARD_REMOTE_FALLBACK": "0"}), \
+                patch.object(migration, "_get_ward_from_service") as service:
+            self.assertEqual(migration.get_ward_from_coordinates([38.93, -77.06]), None)
+        service.assert_not_called()
+
+
+class BatchWardTests(TestCase):
+    def test_default_boundaries_path_does_not_depend_on_the_working_directory(self) -> None:
+        with patch.dict(os.environ, {}, clear=False) as env:
+            env.pop("DC_WARD_GEOJSON_PATH", None)
+            self.assertEqual(
+                migration._ward_boundaries_path(),
+                os.path.join(os.path.dirname(os.path.abspath(migration.__file__)), "cache", "dc_wards.geojson"),
+            )
+
+    def test_import_batch_resolves_all_wards_in_one_lookup(self) -> None:
+        importer = migration.FirestoreMigration.__new__(migration.FirestoreMigration)
+        importer.db = MagicMock()
+        importer.collection_name = "client-profile2"
+        importer.referral_collection_name = "referral"
+        importer.create_only = True
+        importer.stats = migration.MigrationStats()
+        importer.processed_names = set()
+        importer.load_referral_form = MagicMock(return_value=[])
+        importer.check_recent_deliveries = MagicMock(return_value=False)
+        importer._advance_progress = MagicMock()
+        importer.transform_record = MagicMock(side_effect=[
+            {"firstName": "In", "coordinates": [38.92, -77.02], "ward": "2"},
+            {"firstName": "Out", "coordinates": [39.5, -77.0], "ward": "5"},
+            {"firstName": "Unlocated", "coordinates": None, "ward": ""},
+        ])
+
+        with patch.object(migration, "get_wards_for_coordinates", return_value=["1", None, None]) as lookup:
+            successful, failed = importer.import_batch([
+                {"ID": f"NEW-{index}", "FIRST": "Client", "LAST": str(index), "Active": "Yes"} for index in range(3)
+            ])
+
+        self.assertEqual((successful, failed), (3, 0))
+        lookup.assert_called_once_with([[38.92, -77.02], [39.5, -77.0], None])
+        written = [call.args[1]["ward"] for call in importer.db.batch.return_value.create.call_args_list]
+        self.assertEqual(written, ["1", "5", ""])
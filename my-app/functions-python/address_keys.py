@@ -0,0 +1,165 @@
+"""Address canonicalization shared by the geocoding endpoint, the geocode cache and the ETL.
+
+``address_key`` reduces an address to street + DC quadrant with any apartment or
+unit split off ("1600 Pennsylvania Avenue Northwest, Apt 2" -> "1600
+PENNSYLVANIA AVE NW"), for joining records that describe the same building.
+``geocode_key`` keeps the locality (city, state, ZIP) and only drops the unit,
+so it is safe as a geocode cache key. Both accept a single value or a pandas
+Series; a Series is processed with vectorized ``.str`` operations.
+
+Patterns are compiled once at import. Only the standard library is imported, so
+the ETL can load this module without the functions' dependencies.
+"""
+import re
+from dataclasses import dataclass
+from typing import Any, List, Tuple
+
+QUADRANTS = ("NE", "NW", "SE", "SW")
+DIRECTION_ABBREVIATIONS = {"northwest": "NW", "northeast": "NE", "southwest": "SW", "southeast": "SE"}
+STREET_SUFFIXES = {
+    "STREET": "ST",
+    "AVENUE": "AVE",
+    "AV": "AVE",
+    "ROAD": "RD",
+    "PLACE": "PL",
+    "DRIVE": "DR",
+    "TERRACE": "TER",
+    "COURT": "CT",
+    "BOULEVARD": "BLVD",
+    "LANE": "LN",
+    "PARKWAY": "PKWY",
+    "CIRCLE": "CIR",
+    "HIGHWAY": "HWY",
+}
+
+_DIRECTIONS = re.compile(r"\b(northwest|northeast|southwest|southeast)\b", re.IGNORECASE)
+_QUADRANT = re.compile(r"\b(NE|NW|SE|SW)\b")
+_QUADRANT_ANY_CASE = re.compile(r"\b(NE|NW|SE|SW)\b", re.IGNORECASE)
+_DIGIT = re.compile(r"\d")
+# transform_record's split rules: the street ends at the first comma or unit keyword.
+_STREET_END = re.compile(r",|\b(?:Apt|Apartment|Unit|#)\b", re.IGNORECASE)
+_UNIT_SUFFIX = re.compile(r"\b(Apt|Apartment|Unit|#)\b\s*(.*)", re.IGNORECASE)
+
+# Canonical-key patterns, applied to upper-cased text.
+_KEY_STREET_END = re.compile(r"(?:,|#|\b(?:APT|APARTMENT|UNIT|STE|SUITE)\b).*$")
+_KEY_QUADRANT_TAIL = re.compile(r"\b(?:NE|NW|SE|SW)\b.*$")
+_KEY_UNIT = re.compile(r"(?:\b(?:APT|APARTMENT|UNIT|STE|SUITE)\b\.?|#)\s*[A-Z0-9-]*")
+_KEY_PUNCTUATION = re.compile(r"[.,;:'\"()]+")
+_KEY_WHITESPACE = re.compile(r"\s+")
+_KEY_SUFFIX = re.compile(r"\b(" + "|".join(STREET_SUFFIXES) + r")\b")
+
+
+@dataclass(frozen=True)
+class AddressParts:
+    street: str
+    quadrant: str
+    unit: str
+
+
+def clean_text(value: Any) -> str:
+    """String form of a spreadsheet cell; None and NaN become ""."""
+    if value is None:
+        return ""
+    text = str(value).strip()
+    if not text or text.lower() == "nan":
+        return ""
+    return text
+
+
+def _abbreviate_direction(match: re.Match) -> str:
+    return DIRECTION_ABBREVIATIONS[match.group(1).lower()]
+
+
+def normalize_directions(value: Any) -> str:
+    """Normalize spelled-out DC directions in address text to NW/NE/SW/SE."""
+    return _DIRECTIONS.sub(_abbreviate_direction, clean_text(value))
+
+
+def extract_quadrant(value: Any) -> str:
+    """Return normalized DC quadrant token (NW/NE/SW/SE) or empty string."""
+    match = _QUADRANT_ANY_CASE.search(normalize_directions(value))
+    return match.group(1).upper() if match else ""
+
+
+def is_street_style(value: Any) -> bool:
+    """Heuristic: real street addresses usually include at least one digit."""
+    return bool(_DIGIT.search(clean_text(value)))
+
+
+def split_address(value: Any, quadrant_hint: str = "") -> AddressParts:
+    """Split a spreadsheet ADDRESS cell into the street used for geocoding, quadrant and unit.
+
+    ``quadrant_hint`` (e.g. from a separate Quadrant column) is used, and appended
+    to street-style addresses, when the text itself has no quadrant.
+    """
+    raw_address = normalize_directions(value)
+    quadrant = quadrant_hint
+    quadrant_match = _QUADRANT.search(raw_address)
+    if quadrant_match:
+        quadrant = quadrant_match.group(1).upper()
+        street = raw_address[:quadrant_match.end()].strip()
+        # Anything after the quadrant may contain apartment/unit info
+        remainder = raw_address[quadrant_match.end():].strip()
+    else:
+        parts = _STREET_END.split(raw_address, maxsplit=1)
+        street = parts[0].strip()
+        remainder = raw_address[len(parts[0]):].strip() if len(parts) > 1 else ""
+
+    unit = ""
+    unit_match = _UNIT_SUFFIX.search(remainder) if remainder else None
+    if unit_match:
+        label = unit_match.group(1)
+        rest = unit_match.group(2).strip()
+        unit = f"{label} {rest}".strip() if rest else label
+
+    # Skip status/non-address text rows (e.g., "DECEASED", "MOVED").
+    if quadrant and is_street_style(street) and not _QUADRANT_ANY_CASE.search(street):
+        street = f"{street} {quadrant}".strip()
+    return AddressParts(street=street, quadrant=quadrant, unit=unit)
+
+
+def _abbreviate_suffix(match: re.Match) -> str:
+    return STREET_SUFFIXES[match.group(1)]
+
+
+Step = Tuple[re.Pattern, Any]
+
+_TIDY_STEPS: List[Step] = [
+    (_KEY_PUNCTUATION, " "),
+    (_KEY_SUFFIX, _abbreviate_suffix),
+    (_KEY_WHITESPACE, " "),
+]
+
+
+def _apply(value, steps: List[Step]):
+    if hasattr(value, "str"):
+        for pattern, replacement in steps:
+            value = value.str.replace(pattern, replacement, regex=True)
+        return value.str.strip()
+    for pattern, replacement in steps:
+        value = pattern.sub(replacement, value)
+    return value.strip()
+
+
+def _upper_with_directions(value):
+    if hasattr(value, "str"):
+        text = value.where(value.notna(), "").astype(str).str.replace(_DIRECTIONS, _abbreviate_direction, regex=True)
+        return text.str.upper()
+    return normalize_directions(value).upper()
+
+
+def address_key(value):
+    """Street + quadrant join key with the unit split off; str or pandas Series."""
+    text = _upper_with_directions(value)
+    if hasattr(text, "str"):
+        quadrant = text.str.extract(_QUADRANT, expand=False).fillna("")
+        street = _apply(text, [(_KEY_QUADRANT_TAIL, ""), (_KEY_STREET_END, "")] + _TIDY_STEPS)
+        return (street + " " + quadrant).str.strip()
+    quadrant_match = _QUADRANT.search(text)
+    street = _apply(text, [(_KEY_QUADRANT_TAIL, ""), (_KEY_STREET_END, "")] + _TIDY_STEPS)
+    return f"{street} {quadrant_match.group(1)}".strip() if quadrant_match else street
+
+
+def geocode_key(value):
+    """Whole-address key (unit removed, locality kept) for caching geocoder answers."""
+    return _apply(_upper_with_directions(value), [(_KEY_UNIT, " ")] + _TIDY_STEPS)
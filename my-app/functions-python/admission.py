@@ -0,0 +1,124 @@
+"""Admission control for CPU-bound clustering solves.
+
+A solve's cost is estimated as n x k (deliveries times drivers). At most
+``max_running`` slots are in use at once and at most ``max_queued`` solves
+wait for one; a solve that spreads over several worker processes holds a slot
+per worker.
+A request is shed with ``Overloaded`` when the queue is full, when the work
+already admitted plus its own would exceed ``max_work``, or when it waits
+longer than ``queue_timeout_seconds``. The Retry-After hint is the admitted
+work divided over the running slots, at the seconds per unit of work measured
+on recent solves.
+"""
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+# Seconds per unit of n x k work assumed until a solve has been timed.
+DEFAULT_SECONDS_PER_WORK = 1e-4
+# Weight of the latest solve in the running seconds-per-work average.
+RATE_SMOOTHING = 0.2
+MAX_RETRY_AFTER_SECONDS = 120
+
+
+class Overloaded(Exception):
+    """The instance is too busy to take this solve; retry after ``retry_after`` seconds."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Clustering is busy; retry in {retry_after}s.")
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_running: int,
+        max_queued: int,
+        max_work: float,
+        queue_timeout_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_running = max_running
+        self.max_queued = max_queued
+        self.max_work = max_work
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self._clock = clock
+        self._condition = threading.Condition()
+        self.running = 0
+        self.queued = 0
+        # Estimated work of the running and queued solves.
+        self.work = 0.0
+        self.rejected = 0
+        self._seconds_per_work: Optional[float] = None
+
+    def retry_after(self) -> int:
+        rate = self._seconds_per_work or DEFAULT_SECONDS_PER_WORK
+        seconds = math.ceil(self.work * rate / self.max_running)
+        return min(max(seconds, 1), MAX_RETRY_AFTER_SECONDS)
+
+    def _reject(self) -> Overloaded:
+        self.rejected += 1
+        return Overloaded(self.retry_after())
+
+    def acquire(self, work: float, slots: int = 1, timeout: Optional[float] = None) -> Callable[[], None]:
+        """Take ``slots`` running slots for a solve of estimated ``work``; returns the call that gives them back.
+
+        Raises ``Overloaded`` instead of waiting longer than ``timeout`` (or
+        ``queue_timeout_seconds``, whichever is shorter). A solve larger than
+        ``max_work`` is still admitted when nothing else is, so request size
+        limits stay the only hard cap.
+        """
+        slots = min(max(slots, 1), self.max_running)
+        wait = self.queue_timeout_seconds if timeout is None else min(self.queue_timeout_seconds, timeout)
+        with self._condition:
+            if self.running + slots > self.max_running and self.queued >= self.max_queued:
+                raise self._reject()
+            if self.work > 0 and self.work + work > self.max_work:
+                raise self._reject()
+            self.queued += 1
+            self.work += work
+            deadline = self._clock() + wait
+            try:
+                while self.running + slots > self.max_running:
+                    remaining = deadline - self._clock()
+                    if remaining <= 0:
+                        self.work -= work
+                        raise self._reject()
+                    self._condition.wait(remaining)
+            finally:
+                self.queued -= 1
+            self.running += slots
+
+        started = self._clock()
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            elapsed = self._clock() - started
+            with self._condition:
+                if released:
+                    return
+                released = True
+                self.running -= slots
+                self.work -= work
+                if work > 0:
+                    sample = elapsed / work
+                    previous = self._seconds_per_work
+                    self._seconds_per_work = (
+                        sample if previous is None else (1 - RATE_SMOOTHING) * previous + RATE_SMOOTHING * sample
+                    )
+                # Waiters may need more than one slot, so let each recheck.
+                self._condition.notify_all()
+
+        return release
+
+    @contextmanager
+    def admit(self, work: float, slots: int = 1, timeout: Optional[float] = None) -> Iterator[None]:
+        """Hold running slots for the duration of the block; see ``acquire``."""
+        release = self.acquire(work, slots, timeout)
+        try:
+            yield
+        finally:
+            release()
@@ -0,0 +1,147 @@
+"""Size-constrained assignment of points to clusters for arbitrary cost matrices.
+
+KMeansConstrained only knows Euclidean distance. This solves the same min-cost
+flow assignment step for any point x cluster cost matrix (road distances,
+for example), so custom Lloyd-style loops can reuse it.
+"""
+from typing import Callable, Optional, Tuple, Union
+
+import numpy as np
+from ortools.graph.python.min_cost_flow import SimpleMinCostFlow
+
+# Costs are rounded to integers for the flow solver; km inputs keep metre precision.
+COST_SCALE = 1000
+# Sparse assignment starts with each point's nearest clusters as its only arcs.
+DEFAULT_CANDIDATES = 8
+
+
+class AssignmentInfeasible(ValueError):
+    """The size limits cannot be met with the available arcs."""
+
+
+def _integer_costs(costs: np.ndarray) -> np.ndarray:
+    finite = np.isfinite(costs)
+    # Unreachable pairs stay usable as a last resort, but cost more than any real arc.
+    ceiling = (costs[finite].max() if finite.any() else 1.0) * 10 + 1
+    return np.rint(np.where(finite, costs, ceiling) * COST_SCALE).astype(np.int64)
+
+
+def _solve_flow(
+    arc_points: np.ndarray,
+    arc_clusters: np.ndarray,
+    arc_costs: np.ndarray,
+    weights: np.ndarray,
+    n_clusters: int,
+    size_min: int,
+    size_max: Union[int, np.ndarray],
+) -> Optional[np.ndarray]:
+    """Min-cost assignment over point -> cluster arcs (grouped by point), or None if they cannot meet the limits.
+
+    Point ``i`` carries ``weights[i]`` units of flow. The result has one label
+    per unit, point by point. ``size_max`` may give one limit per cluster.
+    """
+    n_points = len(weights)
+    # Nodes: points [0, n), clusters [n, n + k), one sink taking the flow above size_min.
+    cluster_nodes = n_points + np.arange(n_clusters)
+    sink = n_points + n_clusters
+
+    flow = SimpleMinCostFlow()
+    point_arcs = flow.add_arcs_with_capacity_and_unit_cost(
+        arc_points,
+        n_points + arc_clusters,
+        weights[arc_points],
+        arc_costs,
+    )
+    flow.add_arcs_with_capacity_and_unit_cost(
+        cluster_nodes,
+        np.full(n_clusters, sink),
+        _cluster_limits(size_max, n_clusters) - size_min,
+        np.zeros(n_clusters, dtype=np.int64),
+    )
+    flow.set_nodes_supplies(
+        np.arange(sink + 1),
+        np.concatenate([
+            weights,
+            np.full(n_clusters, -size_min, dtype=np.int64),
+            [-(int(weights.sum()) - n_clusters * size_min)],
+        ]),
+    )
+
+    if flow.solve() != flow.OPTIMAL:
+        return None
+
+    return np.repeat(arc_clusters, flow.flows(point_arcs))
+
+
+def _cluster_limits(size_max: Union[int, np.ndarray], n_clusters: int) -> np.ndarray:
+    return np.broadcast_to(np.asarray(size_max, dtype=np.int64), (n_clusters,)).copy()
+
+
+def _check_sizes(n_points: int, n_clusters: int, size_min: int, size_max: Union[int, np.ndarray]) -> None:
+    limits = _cluster_limits(size_max, n_clusters)
+    if size_min * n_clusters > n_points or limits.sum() < n_points or (limits < size_min).any():
+        raise AssignmentInfeasible("Cluster size limits cannot hold every point.")
+
+
+def constrained_assignment(costs: np.ndarray, size_min: int, size_max: int) -> np.ndarray:
+    """Assign each row of ``costs`` (n points x k clusters) to one cluster.
+
+    Every cluster receives between ``size_min`` and ``size_max`` points and the
+    total cost is minimal.
+    """
+    n_points, n_clusters = costs.shape
+    _check_sizes(n_points, n_clusters, size_min, size_max)
+    labels = _solve_flow(
+        np.repeat(np.arange(n_points), n_clusters),
+        np.tile(np.arange(n_clusters), n_points),
+        _integer_costs(costs).ravel(),
+        np.ones(n_points, dtype=np.int64),
+        n_clusters,
+        size_min,
+        size_max,
+    )
+    if labels is None:
+        raise AssignmentInfeasible("Min cost flow assignment failed.")
+    return labels
+
+
+def sparse_assignment(
+    candidates_for: Callable[[int], Tuple[np.ndarray, np.ndarray]],
+    n_points: int,
+    n_clusters: int,
+    size_min: int,
+    size_max: Union[int, np.ndarray],
+    candidates: int = DEFAULT_CANDIDATES,
+    weights: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, int]:
+    """Like ``constrained_assignment``, with arcs only to each point's nearest clusters.
+
+    ``candidates_for(m)`` returns (n, m) arrays of cluster labels and costs for
+    each point's ``m`` cheapest clusters, so the full n x k cost matrix is never
+    built. When the size limits cannot be met through those arcs, ``m`` doubles
+    until it covers every cluster. Returns the labels and the ``m`` that was used.
+
+    With ``weights``, point ``i`` stands for ``weights[i]`` points and counts that
+    many towards the size limits. Its points may be split across clusters, so
+    the labels are for the points repeated ``weights`` times, in order.
+    ``size_max`` may give one limit per cluster.
+    """
+    weights = np.ones(n_points, dtype=np.int64) if weights is None else np.asarray(weights, dtype=np.int64)
+    _check_sizes(int(weights.sum()), n_clusters, size_min, size_max)
+    m = max(1, min(candidates, n_clusters))
+    while True:
+        clusters, costs = candidates_for(m)
+        labels = _solve_flow(
+            np.repeat(np.arange(n_points), m),
+            np.asarray(clusters, dtype=np.int64).ravel(),
+            _integer_costs(costs).ravel(),
+            weights,
+            n_clusters,
+            size_min,
+            size_max,
+        )
+        if labels is not None:
+            return labels, m
+        if m == n_clusters:
+            raise AssignmentInfeasible("Min cost flow assignment failed.")
+        m = min(2 * m, n_clusters)
@@ -0,0 +1,74 @@
+"""Cold-start import cost per function entry point.
+
+Each entry point is imported in a fresh interpreter, so the numbers match what a
+new Cloud Functions instance pays before handling its first request. Run from
+my-app/functions-python:
+
+    python benchmarks/import_time.py --repeat 5
+    python benchmarks/import_time.py --json import_time.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+FUNCTIONS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What each kind of instance loads before its first request completes.
+ENTRY_POINTS = {
+    "user-management": "import main",
+    "geocoding": "import main, clustering; clustering._finish_imports(clustering.maps_client, clustering.payloads)",
+    "clustering": "import main, clustering; clustering._finish_imports(*clustering.CLUSTERING_MODULES)",
+}
+
+PROBE = """
+import resource, sys, time
+started = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - started
+heavy = [name for name in ("numpy", "sklearn", "k_means_constrained", "scipy", "googlemaps", "google.cloud.secretmanager")
+         if name in sys.modules and type(sys.modules[name]).__name__ == "module"]
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, ",".join(heavy), sep="|")
+"""
+
+
+def measure(statement: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(statement=statement)],
+        cwd=FUNCTIONS_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.strip().splitlines()[-1]
+    elapsed, max_rss_kb, heavy = output.split("|")
+    return {"seconds": float(elapsed), "rss_mb": int(max_rss_kb) / 1024, "heavy_modules": [m for m in heavy.split(",") if m]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="Write results to this file.")
+    args = parser.parse_args()
+
+    results = {}
+    for name, statement in ENTRY_POINTS.items():
+        runs = [measure(statement) for _ in range(args.repeat)]
+        results[name] = {
+            "seconds": statistics.median(run["seconds"] for run in runs),
+            "rss_mb": statistics.median(run["rss_mb"] for run in runs),
+            "heavy_modules": runs[-1]["heavy_modules"],
+        }
+        print(
+            f"{name:16} {results[name]['seconds']:7.3f}s  {results[name]['rss_mb']:7.1f} MB  "
+            f"{', '.join(results[name]['heavy_modules']) or '-'}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
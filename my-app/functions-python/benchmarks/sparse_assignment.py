@@ -0,0 +1,104 @@
+"""Dense vs sparse candidate-arc assignment on synthetic DC-shaped delivery days.
+
+Points are drawn around DC neighbourhood centres with a uniform background
+across the city, projected to local km, and clustered with the normal
+KMeansConstrained solve and with ``constrained_kmeans.sparse_solve``. Run from
+my-app/functions-python:
+
+    python benchmarks/sparse_assignment.py
+    python benchmarks/sparse_assignment.py --sizes 1000:20 5000:100 --candidates 8 --json sparse.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import assignment  # noqa: E402
+import constrained_kmeans  # noqa: E402
+import geo  # noqa: E402
+
+# (lat, lon, weight) of neighbourhoods with many deliveries.
+NEIGHBOURHOODS = [
+    (38.8640, -76.9860, 3.0),  # Anacostia
+    (38.8490, -77.0000, 2.0),  # Congress Heights
+    (38.8950, -76.9500, 2.0),  # Deanwood
+    (38.9050, -76.9850, 1.5),  # Trinidad
+    (38.9300, -77.0300, 1.5),  # Columbia Heights
+    (38.9600, -77.0250, 1.0),  # Brightwood
+    (38.8800, -77.0200, 1.0),  # Southwest
+]
+DC_BOUNDS = ((38.82, 38.99), (-77.11, -76.91))
+
+
+def dc_day(n_points: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    weights = np.array([w for _, _, w in NEIGHBOURHOODS])
+    n_background = n_points // 5
+    picks = rng.choice(len(NEIGHBOURHOODS), size=n_points - n_background, p=weights / weights.sum())
+    centres = np.array([(lat, lon) for lat, lon, _ in NEIGHBOURHOODS])[picks]
+    clustered = centres + rng.normal(0, 0.012, size=centres.shape)
+    (lat_lo, lat_hi), (lon_lo, lon_hi) = DC_BOUNDS
+    background = np.column_stack([rng.uniform(lat_lo, lat_hi, n_background), rng.uniform(lon_lo, lon_hi, n_background)])
+    return np.vstack([clustered, background])
+
+
+def run(solve, points, n_clusters, size_min, size_max, **kwargs) -> dict:
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = solve(points, n_clusters, size_min, size_max, n_init=1, **kwargs)
+    seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    sizes = np.bincount(result.labels, minlength=n_clusters)
+    return {
+        "seconds": seconds,
+        "peak_mb": peak / 2**20,
+        "inertia": result.inertia,
+        "iterations": result.n_iter,
+        "sizes_ok": bool(((sizes >= size_min) & (sizes <= size_max)).all()),
+        "candidates": result.candidates,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", default=["500:10", "2000:40", "5000:100"], help="points:drivers")
+    parser.add_argument("--candidates", type=int, default=assignment.DEFAULT_CANDIDATES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write results to this file.")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'n':>6} {'k':>4} {'dense s':>8} {'sparse s':>8} {'dense MB':>8} {'sparse MB':>9} {'inertia':>8} {'m':>3}")
+    for spec in args.sizes:
+        n_points, n_clusters = (int(part) for part in spec.split(":"))
+        points = geo.to_local_planar(dc_day(n_points, args.seed))
+        per_driver = n_points // n_clusters
+        size_min, size_max = constrained_kmeans.size_bounds(
+            n_points, n_clusters, max(1, per_driver // 2), per_driver + per_driver // 4
+        )
+        dense = run(constrained_kmeans.solve, points, n_clusters, size_min, size_max)
+        sparse = run(
+            constrained_kmeans.sparse_solve, points, n_clusters, size_min, size_max, candidates=args.candidates
+        )
+        results.append({"n": n_points, "k": n_clusters, "dense": dense, "sparse": sparse})
+        print(
+            f"{n_points:>6} {n_clusters:>4} {dense['seconds']:>8.2f} {sparse['seconds']:>8.2f} "
+            f"{dense['peak_mb']:>8.1f} {sparse['peak_mb']:>9.1f} "
+            f"{sparse['inertia'] / dense['inertia']:>8.3f} {sparse['candidates']:>3}"
+        )
+    print("inertia = sparse / dense (lower is better); m = widest candidate set the sparse solve needed")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
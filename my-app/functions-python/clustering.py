@@ -1,19 +1,80 @@
-from math import cos, sin, radians
 from collections import defaultdict
-import googlemaps
-from firebase_functions import https_fn
-from k_means_constrained import KMeansConstrained
-from pydantic import BaseModel, ValidationError
-from typing import Dict, List, Tuple, Optional
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, datetime, timedelta, timezone
+from firebase_functions import firestore_fn, https_fn
+from pydantic import BaseModel, ConfigDict, ValidationError
+from typing import Dict, List, Literal, Tuple, Optional
+import importlib.util
 import json
 import logging
-import numpy as np
 import os
 import re
-from google.cloud import secretmanager
+import sys
+import threading
+import time
+from zoneinfo import ZoneInfoNotFoundError
 import firebase_admin
 from firebase_admin import auth as admin_auth
 
+# ClusterDateRequest reads its default timezone from here when the class is defined.
+import delivery_queries
+
+
+def _lazy_import(name: str):
+    """Import ``name`` on first attribute access.
+
+    main.py loads this module for every function, so the NumPy/scikit-learn,
+    Maps/Secret Manager and Firestore stacks, and the helpers that only
+    clustering and geocoding requests use, are deferred until a request
+    actually needs them.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+_lazy_import_lock = threading.Lock()
+
+
+def _finish_imports(*modules) -> None:
+    """Load lazy modules under a lock; LazyLoader is not thread-safe before Python 3.12."""
+    with _lazy_import_lock:
+        for module in modules:
+            getattr(module, "__name__")
+
+
+firestore = _lazy_import("firebase_admin.firestore")
+admission = _lazy_import("admission")
+geocode_cache = _lazy_import("geocode_cache")
+geocoding = _lazy_import("geocoding")
+jobs = _lazy_import("jobs")
+worker_pool = _lazy_import("worker_pool")
+maps_client = _lazy_import("maps_client")
+coalesce = _lazy_import("coalesce")
+constrained_kmeans = _lazy_import("constrained_kmeans")
+distance_store = _lazy_import("distance_store")
+gazetteer = _lazy_import("gazetteer")
+geo = _lazy_import("geo")
+hierarchical = _lazy_import("hierarchical")
+insertion = _lazy_import("insertion")
+multistart = _lazy_import("multistart")
+payloads = _lazy_import("payloads")
+result_cache = _lazy_import("result_cache")
+road_clustering = _lazy_import("road_clustering")
+road_network = _lazy_import("road_network")
+sequencing = _lazy_import("sequencing")
+zones = _lazy_import("zones")
+CLUSTERING_MODULES = (
+    coalesce, constrained_kmeans, distance_store, geo, hierarchical, insertion, multistart,
+    payloads, result_cache, road_clustering, road_network, sequencing, zones,
+)
 
 try:
     firebase_admin.initialize_app()
@@ -41,62 +102,274 @@ def _env_int(name: str, default: int) -> int:
 
 MAX_GEOCODE_ADDRESSES = _env_int("MAX_GEOCODE_ADDRESSES", 1000)
 MAX_ADDRESS_LENGTH = _env_int("MAX_ADDRESS_LENGTH", 500)
+# Geocoding fans out over a thread pool; the rate limit is shared by the whole instance.
+GEOCODE_MAX_WORKERS = _env_int("GEOCODE_MAX_WORKERS", 8)
+GEOCODE_QPS = _env_int("GEOCODE_QPS", 40)
+# "firestore" (shared by all instances and the ETL), "sqlite" (GEOCODE_CACHE_PATH) or "none".
+GEOCODE_CACHE_BACKEND = os.getenv("GEOCODE_CACHE_BACKEND", "firestore")
+GEOCODE_CACHE_COLLECTION = "geocodeCache"
+GEOCODE_CACHE_TTL_DAYS = _env_int("GEOCODE_CACHE_TTL_DAYS", 180)
+GEOCODE_CACHE_NEGATIVE_TTL_HOURS = _env_int("GEOCODE_CACHE_NEGATIVE_TTL_HOURS", 24)
+# DC address-point file (MAR CSV or a saved .npz index); the gazetteer tier is off without it.
+GAZETTEER_PATH = os.getenv("GAZETTEER_PATH", "")
 MAX_CLUSTER_COORDS = _env_int("MAX_CLUSTER_COORDS", 5000)
 MAX_CLUSTER_DRIVERS = _env_int("MAX_CLUSTER_DRIVERS", 500)
+MAX_INSERT_COORDS = _env_int("MAX_INSERT_COORDS", 500)
+# Hierarchical mode splits the day into small regions, so it accepts larger inputs.
+MAX_HIERARCHICAL_CLUSTER_COORDS = _env_int("MAX_HIERARCHICAL_CLUSTER_COORDS", 25000)
+MAX_HIERARCHICAL_CLUSTER_DRIVERS = _env_int("MAX_HIERARCHICAL_CLUSTER_DRIVERS", 2000)
+HIERARCHICAL_REGION_COORDS = _env_int("HIERARCHICAL_REGION_COORDS", 600)
+MAX_CLUSTER_STARTS = _env_int("MAX_CLUSTER_STARTS", 16)
+# Batch endpoint: per-request limits on dates and on coordinates across all of them.
+MAX_BATCH_PROBLEMS = _env_int("MAX_BATCH_PROBLEMS", 14)
+MAX_BATCH_COORDS = _env_int("MAX_BATCH_COORDS", 20000)
+COALESCE_TOLERANCE_METERS = _env_int("COALESCE_TOLERANCE_METERS", 15)
+# Keep the default budget comfortably inside the 300s function timeout.
+MAX_CLUSTER_DEADLINE_SECONDS = _env_int("MAX_CLUSTER_DEADLINE_SECONDS", 270)
+DEFAULT_CLUSTER_DEADLINE_SECONDS = _env_int("DEFAULT_CLUSTER_DEADLINE_SECONDS", 240)
+# Directory written by road_network.build_graph; road distances are disabled without it.
+ROAD_GRAPH_PATH = os.getenv("ROAD_GRAPH_PATH", "")
+# Per-day distance matrices reused by stop sequencing; empty disables the store.
+# /tmp is in-memory, so the store is capped at a quarter of the 512 MB the
+# clustering endpoints get, which also caps one matrix at about 5800 clients.
+DISTANCE_STORE_DIR = os.getenv("DISTANCE_STORE_DIR", "/tmp/distance-matrices")
+DISTANCE_STORE_MAX_CLIENTS = _env_int("DISTANCE_STORE_MAX_CLIENTS", 5000)
+DISTANCE_STORE_MAX_MB = _env_int("DISTANCE_STORE_MAX_MB", 128)
+DISTANCE_STORE_MAX_AGE_HOURS = _env_int("DISTANCE_STORE_MAX_AGE_HOURS", 48)
+# Admission control: solves above ADMISSION_FAST_PATH_WORK (deliveries x drivers) run
+# in a process pool with CLUSTER_WORKERS slots and at most ADMISSION_MAX_QUEUED waiting;
+# the rest of the load is shed with a 429 and Retry-After. Queue waits count against
+# the solve's deadline, so queueing plus solving stays inside the function timeout.
+ADMISSION_FAST_PATH_WORK = _env_int("ADMISSION_FAST_PATH_WORK", 20000)
+ADMISSION_MAX_QUEUED = _env_int("ADMISSION_MAX_QUEUED", 4)
+ADMISSION_MAX_WORK = _env_int("ADMISSION_MAX_WORK", 1000000)
+ADMISSION_QUEUE_TIMEOUT_SECONDS = _env_int("ADMISSION_QUEUE_TIMEOUT_SECONDS", 60)
+CLUSTER_RESULT_CACHE_SIZE = _env_int("CLUSTER_RESULT_CACHE_SIZE", 128)
+CLUSTER_RESULT_CACHE_TTL_SECONDS = _env_int("CLUSTER_RESULT_CACHE_TTL_SECONDS", 900)
+CLUSTER_RESULT_CACHE_COLLECTION = "clusterResultCache"
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+CACHE_HEADERS = "X-Cache, X-Cache-Hits, X-Cache-Misses"
+BINARY_CLUSTER_HEADERS = "X-Cluster-Keys, X-Solver"
+MAPS_CLIENT_HEADERS = "X-Maps-Client-Hits, X-Maps-Client-Refreshes"
+# Zones mode: service areas learned from this many days of saved clusters, stored
+# by the nightly job and re-read hourly (retried after ZONE_RETRY_SECONDS when
+# Firestore fails). Days where more
+# than ZONE_MAX_IMBALANCE_PERCENT of the deliveries would have to leave their
+# nearest zone get the full solve instead.
+ZONE_HISTORY_DAYS = _env_int("ZONE_HISTORY_DAYS", 28)
+ZONE_MODEL_TTL_SECONDS = _env_int("ZONE_MODEL_TTL_SECONDS", 3600)
+ZONE_RETRY_SECONDS = _env_int("ZONE_RETRY_SECONDS", 300)
+ZONE_MAX_IMBALANCE_PERCENT = _env_int("ZONE_MAX_IMBALANCE_PERCENT", 15)
+# Nightly pre-clustering: candidate clusters for this many upcoming delivery dates.
+PRECLUSTER_DAYS = _env_int("PRECLUSTER_DAYS", 3)
+CLUSTER_JOBS_COLLECTION = "clusterJobs"
+# "memory" keeps jobs in-process and runs them on a thread, for the emulator and tests.
+CLUSTER_JOB_STORE = os.getenv("CLUSTER_JOB_STORE", "firestore")
+
+
+class _Model(BaseModel):
+    # Validators are built on first use rather than at import, which every function pays for.
+    model_config = ConfigDict(defer_build=True)
 
 
-class KMeansClusterDeliveriesRequest(BaseModel):
+class KMeansClusterDeliveriesRequest(_Model):
     coords: List[Tuple[float, float]]
     drivers_count: int
     min_deliveries: int
     max_deliveries: int
+    projection: Literal["cartesian", "planar"] = "cartesian"
+    mode: Literal["standard", "hierarchical", "multistart", "zones"] = "standard"
+    # Multistart: run `starts` seeded solves concurrently and keep the best one
+    # finished within `deadline_seconds`. Hierarchical solves also stop at it.
+    starts: int = 8
+    deadline_seconds: Optional[float] = None
+    distance: Literal["euclidean", "road"] = "euclidean"
+    # "sparse" links each point only to its nearest centroids in the assignment step.
+    assignment: Literal["dense", "sparse"] = "dense"
+    # Merge deliveries within COALESCE_TOLERANCE_METERS of each other into weighted
+    # points and leave (0, 0) geocoding placeholders out of the solve.
+    coalesce: bool = False
+    # Warm start: seed centroids from `previous_clusters` (indices into coords) or,
+    # when only client_ids/delivery_date are given, from that day's clusters document.
+    warm_start: bool = False
+    previous_clusters: Optional[Dict[str, List[int]]] = None
+    client_ids: Optional[List[str]] = None
+    delivery_date: Optional[date] = None
+    # Also return each cluster's stops in driving order.
+    sequence_stops: bool = False
+
+
+# Shared per-instance state is built by the first request that needs it, so
+# functions that never cluster or geocode do not pay for it at import.
+_instances_lock = threading.Lock()
+_geocode_rate_limiter = None
+_geocode_cache = None
+_geocode_cache_loaded = False
+
+
+def _get_geocode_rate_limiter() -> "geocoding.RateLimiter":
+    global _geocode_rate_limiter
+    with _instances_lock:
+        if _geocode_rate_limiter is None:
+            _geocode_rate_limiter = geocoding.RateLimiter(GEOCODE_QPS)
+        return _geocode_rate_limiter
+
+
+def _new_geocode_cache() -> Optional["geocode_cache.GeocodeCache"]:
+    if GEOCODE_CACHE_BACKEND == "firestore":
+        store = geocode_cache.FirestoreGeocodeStore(GEOCODE_CACHE_COLLECTION, firestore.client)
+    elif GEOCODE_CACHE_BACKEND == "sqlite":
+        store = geocode_cache.SQLiteGeocodeStore(os.getenv("GEOCODE_CACHE_PATH", "/tmp/geocode_cache.sqlite3"))
+    else:
+        return None
+    return geocode_cache.GeocodeCache(
+        store,
+        ttl_seconds=GEOCODE_CACHE_TTL_DAYS * 24 * 3600,
+        negative_ttl_seconds=GEOCODE_CACHE_NEGATIVE_TTL_HOURS * 3600,
+    )
+
+
+def _get_geocode_cache() -> Optional["geocode_cache.GeocodeCache"]:
+    global _geocode_cache, _geocode_cache_loaded
+    with _instances_lock:
+        if not _geocode_cache_loaded:
+            _geocode_cache = _new_geocode_cache()
+            _geocode_cache_loaded = True
+        return _geocode_cache
+
 
+_gazetteer = None
+_gazetteer_loaded = False
+_gazetteer_lock = threading.Lock()
 
-class GeocodeAddressesRequest(BaseModel):
+
+def _get_gazetteer():
+    """Offline first-tier geocoder, loaded on the first geocoding request; None if unavailable."""
+    global _gazetteer, _gazetteer_loaded
+    if not GAZETTEER_PATH:
+        return None
+    with _gazetteer_lock:
+        if not _gazetteer_loaded:
+            _gazetteer_loaded = True
+            try:
+                _finish_imports(gazetteer)
+                _gazetteer = gazetteer.Gazetteer.load(GAZETTEER_PATH)
+                logging.info("Loaded gazetteer with %d addresses from %s", len(_gazetteer), GAZETTEER_PATH)
+            except (OSError, ValueError) as e:
+                logging.error("Gazetteer unavailable (%s): %s", GAZETTEER_PATH, e)
+        return _gazetteer
+
+
+class BatchClusterDeliveriesRequest(_Model):
+    # One independent clustering problem per delivery date.
+    problems: Dict[date, KMeansClusterDeliveriesRequest]
+
+
+class ClusterDateRequest(_Model):
+    # The server reads the day's events and client coordinates itself.
+    delivery_date: date
+    drivers_count: int
+    min_deliveries: int
+    max_deliveries: int
+    tz_name: str = delivery_queries.DEFAULT_TIMEZONE
+    projection: Literal["cartesian", "planar"] = "cartesian"
+    mode: Literal["standard", "hierarchical", "multistart", "zones"] = "standard"
+    distance: Literal["euclidean", "road"] = "euclidean"
+    assignment: Literal["dense", "sparse"] = "dense"
+    coalesce: bool = False
+    # Keep the cluster ids of the day's existing clusters document.
+    warm_start: bool = False
+
+
+class GeocodeAddressesRequest(_Model):
     addresses: List[str]
 
 
-class ClusterDeliveriesResponse(BaseModel):
+class SolverStats(_Model):
+    mode: str = "standard"
+    iterations: int
+    n_init: int
+    warm_started: bool
+    elapsed_ms: int
+    regions: Optional[int] = None
+    starts_completed: Optional[int] = None
+    timed_out: Optional[bool] = None
+    sequencing_ms: Optional[int] = None
+    candidates: Optional[int] = None
+    coalesced_points: Optional[int] = None
+    # Zones mode: whether the day fell back to the full solve, and the share of
+    # deliveries outside the size limits on the nearest-zone pass.
+    fallback: Optional[bool] = None
+    imbalance: Optional[float] = None
+
+
+class ClusterDeliveriesResponse(_Model):
+    clusters: Dict[str, List[int]]
+    sequences: Optional[Dict[str, List[int]]] = None
+    solver: Optional[SolverStats] = None
+    # Coalesce: indices left unassigned because their coordinates are placeholders.
+    quarantined: Optional[List[int]] = None
+
+
+class InsertDeliveriesRequest(_Model):
+    # The day's existing assignment: `clusters` holds indices into `coords`.
+    coords: List[Tuple[float, float]]
+    clusters: Dict[str, List[int]]
+    new_coords: List[Tuple[float, float]]
+    max_deliveries: int
+
+
+class InsertDeliveriesResponse(_Model):
+    # New points are numbered after the existing ones: len(coords) + j.
     clusters: Dict[str, List[int]]
+    # Existing point index -> cluster id, for deliveries a repair moved.
+    moved: Dict[int, str]
+    # Existing points no cluster listed (e.g. quarantined), passed through still unassigned.
+    unassigned: List[int] = []
+    repairs: int
+    elapsed_ms: int
 
 
-class FieldError(BaseModel):
+class ClusteringDeadlineExceeded(Exception):
+    """The solve did not finish before the caller's deadline."""
+
+
+class FieldError(_Model):
     field: str
     message: str
 
 
 # Convert a list of addresses to (lat, lon) using Google Maps Geocoding API.
 def geocode_addresses(addresses: List[str]) -> List[Tuple[float, float]]:
-    client = secretmanager.SecretManagerServiceClient()
-    project_id = "251910218620"
-    secret_id = "MAPS_API_KEY"
-    version = "latest"
+    _finish_imports(maps_client)
+    holder = maps_client.default_holder()
     try:
-        secret_name = f"projects/{project_id}/secrets/{secret_id}/versions/{version}"
-        response = client.access_secret_version(request={"name": secret_name})
-        api_key = response.payload.data.decode("UTF-8")
-        gmaps = googlemaps.Client(key=api_key)
+        holder.client()
     except Exception as e:
         logging.error("Failed to initialize Google Maps client or access secret: %s", e, exc_info=True)
         raise
 
-    logging.info("got gmaps")
-    coords = []
+    logging.info("got gmaps: %s", holder.stats())
 
-    for address in addresses:
-        try:
-            geocode_result = gmaps.geocode(address)
-            if geocode_result:
-                location = geocode_result[0]["geometry"]["location"]
-                coords.append((location["lat"], location["lng"]))
-            else:
-                print(f"Warning: Address not found: {address}")
-                coords.append((0.0, 0.0))
-        except Exception as e:
-            logging.error(f"Error occurred: {str(e)}", exc_info=True)
-            print(f"Geocoding failed for {address}: {str(e)}")
-            coords.append((0.0, 0.0))
+    def geocode_one(address: str) -> Optional[Tuple[float, float]]:
+        geocode_result = holder.call(lambda gmaps: gmaps.geocode(address))
+        if not geocode_result:
+            return None
+        location = geocode_result[0]["geometry"]["location"]
+        return location["lat"], location["lng"]
 
+    coords, stats = geocoding.geocode_batch(
+        addresses,
+        geocode_one,
+        GEOCODE_MAX_WORKERS,
+        _get_geocode_rate_limiter(),
+        cache=_get_geocode_cache(),
+        source="google-geocoding/geocode_addresses_endpoint",
+        gazetteer=_get_gazetteer(),
+    )
+    logging.info("geocode_addresses: %s", stats.summary())
+    if _gazetteer is not None:
+        logging.info("gazetteer: %s", _gazetteer.stats())
     return coords
 
 
@@ -107,22 +380,13 @@ def parse_error_fields(e: ValidationError):
     ]
 
 
-def latlon_to_cartesian(lat, lon, radius=6371):
-    lat_rad = radians(lat)
-    lon_rad = radians(lon)
-    x = radius * cos(lat_rad) * cos(lon_rad)
-    y = radius * cos(lat_rad) * sin(lon_rad)
-    z = radius * sin(lat_rad)
-    return x, y, z
-
-
 def _cors_headers(req: https_fn.Request) -> dict:
     origin = req.headers.get("Origin", "")
     allow_origin = origin if origin in HOSTED_ORIGINS or LOCAL_ORIGIN_PATTERN.fullmatch(origin) else ""
 
     headers = {
         "Access-Control-Allow-Methods": "POST, OPTIONS",
-        "Access-Control-Allow-Headers": "Content-Type, Authorization",
+        "Access-Control-Allow-Headers": "Content-Type, Content-Encoding, Accept, Authorization",
         "Vary": "Origin",
     }
     if allow_origin:
@@ -178,6 +442,7 @@ def geocode_addresses_endpoint(req: https_fn.Request) -> https_fn.Response:
     auth_error = _require_authenticated_request(req, headers)
     if auth_error:
         return auth_error
+    _finish_imports(payloads)
 
     try:
         data = req.get_json(silent=True)
@@ -205,7 +470,23 @@ def geocode_addresses_endpoint(req: https_fn.Request) -> https_fn.Response:
                     content_type="application/json",
                 )
         coordinates = geocode_addresses(request_body.addresses)
+        maps_stats = maps_client.default_holder().stats()
+        headers = {
+            **headers,
+            "Access-Control-Expose-Headers": MAPS_CLIENT_HEADERS,
+            "X-Maps-Client-Hits": str(maps_stats["hits"]),
+            "X-Maps-Client-Refreshes": str(maps_stats["refreshes"]),
+        }
 
+        if payloads.accepts_binary(req.headers.get("Accept")):
+            body, encoding = payloads.compress(
+                payloads.encode_coords(coordinates), req.headers.get("Accept-Encoding")
+            )
+            if encoding:
+                headers = {**headers, "Content-Encoding": encoding}
+            return https_fn.Response(
+                response=body, status=200, headers=headers, content_type=payloads.BINARY_CONTENT_TYPE
+            )
         return https_fn.Response(
             response=json.dumps({"coordinates": coordinates}),
             status=200,
@@ -234,6 +515,583 @@ def geocode_addresses_endpoint(req: https_fn.Request) -> https_fn.Response:
         )
 
 
+def _stored_prior_clusters(delivery_date: date, client_ids: List[str]) -> Dict[str, List[int]]:
+    """Map the saved clusters document for a day onto indices of ``client_ids``."""
+    query = delivery_queries.clusters_query(firestore.client(), delivery_date)
+
+    index_by_client = {client_id: index for index, client_id in enumerate(client_ids)}
+    prior_clusters = {}
+    for doc in query.stream():
+        for cluster in (doc.to_dict() or {}).get("clusters") or []:
+            if not isinstance(cluster, dict):
+                continue
+            indices = [
+                index_by_client[client_id]
+                for client_id in cluster.get("deliveries") or []
+                if client_id in index_by_client
+            ]
+            if indices:
+                prior_clusters[str(cluster.get("id"))] = indices
+    return prior_clusters
+
+
+def _load_zone_history(db):
+    """One lat/lon array per recent clusters document: every delivery it held."""
+    start = datetime.now(timezone.utc) - timedelta(days=ZONE_HISTORY_DAYS)
+    query = db.collection(delivery_queries.CLUSTERS_COLLECTION).where(
+        filter=firestore.FieldFilter("date", ">=", start)
+    )
+    history = []
+    for doc in query.stream():
+        history.append([
+            client_id
+            for cluster in (doc.to_dict() or {}).get("clusters") or []
+            if isinstance(cluster, dict)
+            for client_id in cluster.get("deliveries") or []
+        ])
+    coordinates = delivery_queries.client_coordinates(db, {client_id for day in history for client_id in day})
+    return [
+        geo.latlon_array([coordinates[client_id] for client_id in day if client_id in coordinates])
+        for day in history
+    ]
+
+
+def refresh_zone_history(db) -> int:
+    """Store the recent days' deliveries that zones mode learns from; returns the number of days.
+
+    Runs in the nightly job, so zones requests read one stored document
+    instead of scanning the clusters collection and every client on the way.
+    """
+    _finish_imports(geo)
+    history = _load_zone_history(db)
+    # Firestore has no nested arrays, so each day is stored as parallel lat/lon lists.
+    delivery_queries.save_precomputed(
+        db,
+        delivery_queries.ZONE_HISTORY_DOC,
+        {"days": [{"lat": latlon[:, 0].tolist(), "lon": latlon[:, 1].tolist()} for latlon in history]},
+    )
+    logging.info("Stored %d days of clusters for delivery zones", len(history))
+    return len(history)
+
+
+def _read_zone_history():
+    """The stored zone history as (computedAt, one lat/lon array per day), or (None, None) before the first run."""
+    stored = delivery_queries.precomputed(firestore.client(), delivery_queries.ZONE_HISTORY_DOC)
+    if stored is None:
+        return None, None
+    return stored.get("computedAt"), [
+        geo.latlon_array(list(zip(day.get("lat") or [], day.get("lon") or [])))
+        for day in stored.get("days") or []
+        if isinstance(day, dict)
+    ]
+
+
+_zone_history = None
+_zone_history_computed_at = None
+_zone_history_version = 0
+_zone_history_loaded_at = None
+_zone_history_failed = False
+# zone count -> (history version it was built from, model or None)
+_zone_models = {}
+_zone_model_lock = threading.Lock()
+
+
+def _get_zone_model(n_zones: int):
+    """Zones learned from the history the nightly job stored, None if unavailable.
+
+    The stored history is re-read every ZONE_MODEL_TTL_SECONDS, or
+    ZONE_RETRY_SECONDS after a failed read, and the models are refit only when
+    it changed. Each zone count gets its own model, rebuilt from the previous
+    one's centers so zone ids stay in place.
+    """
+    global _zone_history, _zone_history_computed_at, _zone_history_version
+    global _zone_history_loaded_at, _zone_history_failed
+    with _zone_model_lock:
+        now = time.monotonic()
+        max_age = ZONE_RETRY_SECONDS if _zone_history_failed else ZONE_MODEL_TTL_SECONDS
+        if _zone_history_loaded_at is None or now - _zone_history_loaded_at > max_age:
+            _zone_history_loaded_at = now
+            try:
+                computed_at, history = _read_zone_history()
+                if history is not None and (_zone_history is None or computed_at != _zone_history_computed_at):
+                    _zone_history, _zone_history_computed_at = history, computed_at
+                    _zone_history_version += 1
+                _zone_history_failed = False
+            except Exception as e:
+                logging.warning("Delivery zones unavailable: %s", e)
+                _zone_history_failed = True
+        if _zone_history is None:
+            return None
+
+        version, model = _zone_models.get(n_zones, (None, None))
+        if version != _zone_history_version:
+            previous = model
+            model = zones.ZoneModel.from_history(
+                _zone_history, n_zones, init=previous.centers if previous is not None else None
+            )
+            _zone_models[n_zones] = (_zone_history_version, model)
+        return model
+
+
+_cluster_result_cache = None
+
+
+def _get_cluster_result_cache() -> "result_cache.ResultCache":
+    global _cluster_result_cache
+    with _instances_lock:
+        if _cluster_result_cache is None:
+            _cluster_result_cache = result_cache.ResultCache(
+                result_cache.TTLCache(CLUSTER_RESULT_CACHE_SIZE, CLUSTER_RESULT_CACHE_TTL_SECONDS),
+                result_cache.FirestoreResultStore(
+                    CLUSTER_RESULT_CACHE_COLLECTION, CLUSTER_RESULT_CACHE_TTL_SECONDS, firestore.client
+                )
+                if os.getenv("CLUSTER_RESULT_CACHE_FIRESTORE", "").lower() == "true"
+                else None,
+            )
+        return _cluster_result_cache
+
+
+def _cluster_cache_key(request_body: KMeansClusterDeliveriesRequest) -> Optional[str]:
+    # A warm start from the stored clusters document, or zones learned from
+    # saved clusters, depend on Firestore state, not just the request.
+    if request_body.warm_start and request_body.previous_clusters is None:
+        return None
+    if request_body.mode == "zones":
+        return None
+    params = request_body.model_dump(mode="json", exclude={"coords"})
+    return result_cache.request_fingerprint(geo.latlon_array(request_body.coords), params)
+
+
+def _solve_for_cache(request_body: KMeansClusterDeliveriesRequest) -> Tuple[dict, bool]:
+    response_data = solve_cluster_request(request_body)
+    # A multistart result cut short by its deadline is not the answer for this input.
+    return response_data.model_dump(), not response_data.solver.timed_out
+
+
+_admission = None
+
+
+def _get_admission() -> "admission.AdmissionController":
+    global _admission
+    with _instances_lock:
+        if _admission is None:
+            _admission = admission.AdmissionController(
+                worker_pool.worker_count(),
+                ADMISSION_MAX_QUEUED,
+                ADMISSION_MAX_WORK,
+                ADMISSION_QUEUE_TIMEOUT_SECONDS,
+            )
+        return _admission
+
+
+_solve_pool = None
+_solve_pool_lock = threading.Lock()
+
+
+def _get_solve_pool() -> ProcessPoolExecutor:
+    global _solve_pool
+    with _solve_pool_lock:
+        if _solve_pool is None:
+            _solve_pool = ProcessPoolExecutor(max_workers=_get_admission().max_running, mp_context=worker_pool.mp_context())
+        return _solve_pool
+
+
+def _solve_in_worker(request: dict, coords) -> Tuple[dict, bool]:
+    """Worker-process entry point: solve one clustering request for the result cache."""
+    _finish_imports(*CLUSTERING_MODULES)
+    # Coordinates travel separately so binary requests keep their array.
+    request_body = KMeansClusterDeliveriesRequest(coords=[], **request).model_copy(update={"coords": coords})
+    return _solve_for_cache(request_body)
+
+
+def _solve_admitted(request_body: KMeansClusterDeliveriesRequest) -> Tuple[dict, bool]:
+    """Solve small requests inline; queue larger ones for the solve pool, or raise ``admission.Overloaded``.
+
+    Queueing and solving share the request's deadline, so a request that waited
+    for a slot gets a 504 rather than outliving the function timeout.
+    """
+    global _solve_pool
+    work = len(request_body.coords) * _effective_drivers_count(request_body)
+    if work <= ADMISSION_FAST_PATH_WORK:
+        return _solve_for_cache(request_body)
+    budget = DEFAULT_CLUSTER_DEADLINE_SECONDS
+    if request_body.mode in ("hierarchical", "multistart") and request_body.deadline_seconds:
+        budget = request_body.deadline_seconds
+    deadline = time.monotonic() + budget
+    # These modes spread one solve over a process pool of their own, so they
+    # hold a slot and a share of the work budget for each of its workers.
+    slots = 1
+    if request_body.mode == "hierarchical":
+        slots = worker_pool.worker_count()
+    elif request_body.mode == "multistart":
+        slots = min(worker_pool.worker_count(), request_body.starts)
+    release = _get_admission().acquire(work * slots, slots, timeout=budget)
+    released_later = False
+    try:
+        remaining = deadline - time.monotonic()
+        if request_body.mode in ("hierarchical", "multistart"):
+            return _solve_for_cache(request_body.model_copy(update={"deadline_seconds": max(remaining, 0.001)}))
+        pool = _get_solve_pool()
+        future = pool.submit(
+            _solve_in_worker, request_body.model_dump(mode="json", exclude={"coords"}), request_body.coords
+        )
+        try:
+            return future.result(timeout=max(remaining, 0))
+        except FutureTimeoutError:
+            if not future.cancel():
+                # The worker keeps its slot until the solve it is running ends.
+                future.add_done_callback(lambda _: release())
+                released_later = True
+            raise ClusteringDeadlineExceeded(f"Clustering did not finish within {budget:g} seconds.")
+        except BrokenProcessPool:
+            with _solve_pool_lock:
+                if _solve_pool is pool:
+                    _solve_pool = None
+            raise
+    finally:
+        if not released_later:
+            release()
+
+
+def _effective_drivers_count(request_body: KMeansClusterDeliveriesRequest) -> int:
+    if request_body.drivers_count > len(request_body.coords):
+        print("Warning: Number of drivers exceeds the number of deliveries. Adjusting drivers count to match deliveries.")
+        return len(request_body.coords)
+    return request_body.drivers_count
+
+
+def cluster_request_error(request_body: KMeansClusterDeliveriesRequest) -> Optional[str]:
+    """Return the client-facing message for an unsolvable clustering request, if any."""
+    hierarchical_mode = request_body.mode == "hierarchical"
+    max_coords = MAX_HIERARCHICAL_CLUSTER_COORDS if hierarchical_mode else MAX_CLUSTER_COORDS
+    max_drivers = MAX_HIERARCHICAL_CLUSTER_DRIVERS if hierarchical_mode else MAX_CLUSTER_DRIVERS
+    if len(request_body.coords) > max_coords:
+        return "Too many coordinates in request."
+    if request_body.drivers_count > max_drivers:
+        return "Too many drivers requested."
+    latlon = geo.latlon_array(request_body.coords)
+    coordinate_error = payloads.coordinate_error(latlon)
+    if coordinate_error:
+        return coordinate_error
+    if request_body.drivers_count <= 0 or request_body.min_deliveries <= 0 or request_body.max_deliveries <= 0:
+        return "Invalid clustering parameters."
+    if request_body.min_deliveries > request_body.max_deliveries:
+        return "min_deliveries cannot exceed max_deliveries."
+    if request_body.client_ids is not None and len(request_body.client_ids) != len(request_body.coords):
+        return "client_ids must match coords in length."
+    if request_body.warm_start and request_body.mode != "standard":
+        return "warm_start is only supported in standard mode."
+    if request_body.distance == "road":
+        if request_body.mode != "standard" or request_body.warm_start:
+            return "Road distances are only supported in standard mode without warm_start."
+        if not road_network.graph_exists(ROAD_GRAPH_PATH):
+            return "Road distances are not configured on this server."
+    if request_body.assignment == "sparse" and (
+        request_body.mode != "standard" or request_body.distance != "euclidean"
+    ):
+        return "Sparse assignment is only supported in standard mode with euclidean distance."
+    n_points = len(request_body.coords)
+    if request_body.coalesce:
+        if request_body.mode != "standard" or request_body.distance != "euclidean" or request_body.warm_start:
+            return "coalesce is only supported in standard mode with euclidean distance and without warm_start."
+        # Placeholders are quarantined, so only the valid coordinates need drivers.
+        n_points = int(geo.valid_coordinate_mask(latlon).sum())
+        if n_points == 0:
+            return "No valid coordinates to cluster."
+    if request_body.mode == "multistart" and not 1 <= request_body.starts <= MAX_CLUSTER_STARTS:
+        return f"starts must be between 1 and {MAX_CLUSTER_STARTS}."
+    if request_body.mode in ("hierarchical", "multistart") and request_body.deadline_seconds is not None and not (
+        0 < request_body.deadline_seconds <= MAX_CLUSTER_DEADLINE_SECONDS
+    ):
+        return f"deadline_seconds must be between 0 and {MAX_CLUSTER_DEADLINE_SECONDS}."
+    if request_body.warm_start and request_body.previous_clusters is None and (
+        request_body.client_ids is None or request_body.delivery_date is None
+    ):
+        return "warm_start needs previous_clusters or client_ids with delivery_date."
+    if request_body.min_deliveries * min(request_body.drivers_count, n_points) > n_points:
+        return "Not enough deliveries to give every driver min_deliveries."
+    return None
+
+
+def solve_cluster_request(request_body: KMeansClusterDeliveriesRequest) -> ClusterDeliveriesResponse:
+    """Cluster a request that already passed ``cluster_request_error``."""
+    latlon = geo.latlon_array(request_body.coords)
+    coords = geo.project(latlon, request_body.projection)
+    merged = None
+    n_points = len(coords)
+    if request_body.coalesce:
+        merged = coalesce.coalesce(latlon, COALESCE_TOLERANCE_METERS / 1000, request_body.projection)
+        n_points = int(merged.weights.sum())
+    drivers_count = min(_effective_drivers_count(request_body), n_points)
+    size_min, size_max = constrained_kmeans.size_bounds(
+        n_points, drivers_count, request_body.min_deliveries, request_body.max_deliveries
+    )
+
+    started = time.perf_counter()
+    if request_body.mode == "hierarchical":
+        try:
+            result = hierarchical.solve(
+                coords,
+                drivers_count,
+                size_min,
+                size_max,
+                max_region_points=HIERARCHICAL_REGION_COORDS,
+                deadline_seconds=request_body.deadline_seconds,
+            )
+        except TimeoutError:
+            raise ClusteringDeadlineExceeded(
+                f"Hierarchical clustering did not finish within {request_body.deadline_seconds:g} seconds."
+            ) from None
+        keys = constrained_kmeans.cluster_keys([], drivers_count)
+        stats = SolverStats(
+            mode="hierarchical",
+            iterations=result.n_iter,
+            n_init=hierarchical.REGION_N_INIT,
+            warm_started=False,
+            elapsed_ms=0,
+            regions=result.regions,
+        )
+    elif request_body.distance == "road":
+        graph = road_network.load_graph(ROAD_GRAPH_PATH)
+        result = road_clustering.solve(latlon, graph, drivers_count, size_min, size_max)
+        keys = constrained_kmeans.cluster_keys([], drivers_count)
+        stats = SolverStats(
+            mode="road",
+            iterations=result.n_iter,
+            n_init=result.n_init,
+            warm_started=False,
+            elapsed_ms=0,
+        )
+    elif request_body.mode == "multistart":
+        deadline_seconds = request_body.deadline_seconds or DEFAULT_CLUSTER_DEADLINE_SECONDS
+        outcome = multistart.solve(
+            coords, drivers_count, size_min, size_max, request_body.starts, deadline_seconds
+        )
+        if outcome.result is None:
+            raise ClusteringDeadlineExceeded(
+                f"No clustering start finished within {deadline_seconds:g} seconds."
+            )
+        result = outcome.result
+        keys = constrained_kmeans.cluster_keys([], drivers_count)
+        stats = SolverStats(
+            mode="multistart",
+            iterations=result.n_iter,
+            n_init=outcome.starts_requested,
+            warm_started=False,
+            elapsed_ms=0,
+            starts_completed=outcome.starts_completed,
+            timed_out=outcome.timed_out,
+        )
+    elif request_body.mode == "zones":
+        result, keys, stats = _solve_zones(latlon, coords, request_body.projection, drivers_count, size_min, size_max)
+    elif merged is not None:
+        # Co-located deliveries count once per delivery towards the size limits.
+        result = constrained_kmeans.sparse_solve(
+            merged.points, drivers_count, size_min, size_max, weights=merged.weights
+        )
+        result.labels = merged.expand(result.labels)
+        keys = constrained_kmeans.cluster_keys([], drivers_count)
+        stats = SolverStats(
+            iterations=result.n_iter,
+            n_init=result.n_init,
+            warm_started=False,
+            elapsed_ms=0,
+            candidates=result.candidates,
+            coalesced_points=len(merged.points),
+        )
+    else:
+        init_centers, seed_ids = None, []
+        if request_body.warm_start:
+            prior_clusters = request_body.previous_clusters
+            if prior_clusters is None:
+                try:
+                    prior_clusters = _stored_prior_clusters(request_body.delivery_date, request_body.client_ids)
+                except Exception as e:
+                    logging.warning("cluster_deliveries_k_means could not load stored clusters: %s", e)
+                    prior_clusters = {}
+            prior_labels, prior_ids = constrained_kmeans.prior_labels_from_clusters(prior_clusters, len(coords))
+            init_centers, seed_ids = constrained_kmeans.warm_start_centers(
+                coords, prior_labels, prior_ids, drivers_count
+            )
+
+        solve = constrained_kmeans.sparse_solve if request_body.assignment == "sparse" else constrained_kmeans.solve
+        result = solve(coords, drivers_count, size_min, size_max, init=init_centers)
+        keys = constrained_kmeans.cluster_keys(seed_ids, drivers_count)
+        stats = SolverStats(
+            iterations=result.n_iter,
+            n_init=result.n_init,
+            warm_started=result.warm_started,
+            elapsed_ms=0,
+            candidates=result.candidates,
+        )
+    stats.elapsed_ms = int((time.perf_counter() - started) * 1000)
+    logging.info(
+        "cluster_deliveries_k_means solved n=%d k=%d mode=%s warm_started=%s iterations=%d in %dms",
+        len(coords), drivers_count, stats.mode, stats.warm_started, stats.iterations, stats.elapsed_ms,
+    )
+
+    clusters = defaultdict(list)
+    for index, label in enumerate(result.labels):
+        if label >= 0:
+            clusters[keys[label]].append(index)
+
+    sequences = None
+    if request_body.sequence_stops:
+        started = time.perf_counter()
+        # The day's stored matrix when the request names its clients; otherwise
+        # straight-line order in a local km frame.
+        orders = sequencing.sequence_clusters(
+            geo.to_local_planar(latlon),
+            result.labels,
+            drivers_count,
+            _stored_distance_blocks(request_body, latlon),
+        )
+        sequences = {keys[label]: order.tolist() for label, order in enumerate(orders) if len(order)}
+        stats.sequencing_ms = int((time.perf_counter() - started) * 1000)
+    quarantined = merged.quarantined.tolist() if merged is not None else None
+    return ClusterDeliveriesResponse(clusters=clusters, sequences=sequences, solver=stats, quarantined=quarantined)
+
+
+def _solve_zones(latlon, coords, projection: str, drivers_count: int, size_min: int, size_max: int):
+    """Assign the day to the learned zones, or solve it in full when it does not fit them."""
+    model = _get_zone_model(drivers_count)
+    if model is not None:
+        zone_assignment = zones.assign(latlon, model, size_min, size_max, ZONE_MAX_IMBALANCE_PERCENT / 100)
+        if zone_assignment is not None:
+            result = constrained_kmeans.ClusteringResult(
+                labels=zone_assignment.labels,
+                centers=model.centers,
+                inertia=zone_assignment.inertia,
+                n_iter=1,
+                n_init=1,
+            )
+            stats = SolverStats(
+                mode="zones",
+                iterations=1,
+                n_init=1,
+                warm_started=False,
+                elapsed_ms=0,
+                fallback=False,
+                imbalance=round(zone_assignment.imbalance, 4),
+            )
+            return result, model.ids, stats
+
+    # Seed the full solve from the zones, so the service areas keep their ids.
+    init, seed_ids = None, []
+    if model is not None:
+        init, seed_ids = zones.project_centers(model.centers, latlon, projection), model.ids
+    result = constrained_kmeans.solve(coords, drivers_count, size_min, size_max, init=init)
+    stats = SolverStats(
+        mode="zones",
+        iterations=result.n_iter,
+        n_init=result.n_init,
+        warm_started=result.warm_started,
+        elapsed_ms=0,
+        fallback=True,
+    )
+    return result, constrained_kmeans.cluster_keys(seed_ids, drivers_count), stats
+
+
+_distance_store = None
+_distance_store_lock = threading.Lock()
+
+
+def _stored_distance_blocks(request_body: KMeansClusterDeliveriesRequest, latlon):
+    """Block lookup into the day's stored distance matrix, or None to use straight lines."""
+    global _distance_store
+    client_ids, delivery_date = request_body.client_ids, request_body.delivery_date
+    if not DISTANCE_STORE_DIR or client_ids is None or delivery_date is None:
+        return None
+    if len(set(client_ids)) > DISTANCE_STORE_MAX_CLIENTS:
+        return None
+    metric = "road" if request_body.distance == "road" else "haversine"
+    try:
+        with _distance_store_lock:
+            if _distance_store is None:
+                _distance_store = distance_store.DistanceStore(
+                    DISTANCE_STORE_DIR,
+                    max_bytes=DISTANCE_STORE_MAX_MB * 1024 * 1024,
+                    max_age_seconds=DISTANCE_STORE_MAX_AGE_HOURS * 3600,
+                )
+            if metric == "road":
+                _distance_store.road_graph = road_network.load_graph(ROAD_GRAPH_PATH)
+        day = _distance_store.ensure(delivery_date, client_ids, latlon, metric)
+        rows = day.rows(client_ids)
+    except Exception as e:
+        logging.warning("Distance store unavailable for %s: %s", delivery_date, e)
+        return None
+    return lambda indices: day.block(rows[indices])
+
+
+def _json_response(body: dict, status: int, headers: dict) -> https_fn.Response:
+    return https_fn.Response(
+        response=json.dumps(body),
+        status=status,
+        headers=headers,
+        content_type="application/json",
+    )
+
+
+def _parse_cluster_request(
+    req: https_fn.Request, headers: dict
+) -> Tuple[Optional[KMeansClusterDeliveriesRequest], Optional[https_fn.Response]]:
+    """Validate a clustering payload, returning the request or a 400 response.
+
+    Binary bodies carry only the packed coordinates; the other fields come from
+    the query string.
+    """
+    try:
+        if payloads.is_binary(req.mimetype):
+            latlon = payloads.decode_coords(
+                req.get_data(),
+                req.headers.get("Content-Encoding"),
+                max(MAX_CLUSTER_COORDS, MAX_HIERARCHICAL_CLUSTER_COORDS),
+            )
+            request_body = KMeansClusterDeliveriesRequest(coords=[], **req.args.to_dict())
+            # Skip per-tuple validation; cluster_request_error range-checks the array.
+            request_body = request_body.model_copy(update={"coords": latlon})
+        else:
+            data = req.get_json()
+            request_body = KMeansClusterDeliveriesRequest(**data)
+    except payloads.PayloadError as e:
+        return None, _json_response({"error": str(e)}, 400, headers)
+    except ValidationError as e:
+        return None, _json_response(
+            {
+                "error": "Validation error",
+                "details": [field_error.model_dump() for field_error in parse_error_fields(e)],
+            },
+            400,
+            headers,
+        )
+    except Exception as e:
+        logging.error("cluster_deliveries_k_means invalid json: %s", e, exc_info=True)
+        return None, _json_response({"error": "Invalid request payload."}, 400, headers)
+
+    error = cluster_request_error(request_body)
+    if error:
+        return None, _json_response({"error": error}, 400, headers)
+    return request_body, None
+
+
+def _solve_cached(request_body: KMeansClusterDeliveriesRequest, admitted: bool = True) -> Tuple[dict, str]:
+    """Solve through the result cache; ``admitted`` solves go through admission control."""
+    solve = _solve_admitted if admitted else _solve_for_cache
+    cache_key = _cluster_cache_key(request_body)
+    if cache_key is None:
+        return solve(request_body)[0], result_cache.MISS
+    return _get_cluster_result_cache().get_or_compute(cache_key, lambda: solve(request_body))
+
+
+def _overloaded_response(e: "admission.Overloaded", headers: dict) -> https_fn.Response:
+    headers = {
+        **headers,
+        "Access-Control-Expose-Headers": "Retry-After",
+        "Retry-After": str(e.retry_after),
+    }
+    return _json_response({"error": str(e), "retry_after": e.retry_after}, 429, headers)
+
+
 @https_fn.on_request(region="us-central1", memory=512, timeout_sec=300)
 def cluster_deliveries_k_means(req: https_fn.Request) -> https_fn.Response:
     headers = _cors_headers(req)
@@ -242,99 +1100,517 @@ def cluster_deliveries_k_means(req: https_fn.Request) -> https_fn.Response:
         return https_fn.Response("", headers=headers, status=204, content_type="application/json")
 
     if req.method != "POST":
-        return https_fn.Response(
-            response=json.dumps({"error": "Method not allowed."}),
-            status=405,
-            headers=headers,
-            content_type="application/json",
-        )
+        return _json_response({"error": "Method not allowed."}, 405, headers)
+
+    auth_error = _require_authenticated_request(req, headers)
+    if auth_error:
+        return auth_error
+    _finish_imports(*CLUSTERING_MODULES)
+
+    request_body, error_response = _parse_cluster_request(req, headers)
+    if error_response:
+        return error_response
+
+    try:
+        response_json, cache_status = _solve_cached(request_body)
+    except ClusteringDeadlineExceeded as e:
+        return _json_response({"error": str(e), "timed_out": True}, 504, headers)
+    except admission.Overloaded as e:
+        return _overloaded_response(e, headers)
+
+    headers = {
+        **headers,
+        "Access-Control-Expose-Headers": CACHE_HEADERS,
+        "X-Cache": cache_status,
+        "X-Cache-Hits": str(_get_cluster_result_cache().hits),
+        "X-Cache-Misses": str(_get_cluster_result_cache().misses),
+    }
+    if payloads.accepts_binary(req.headers.get("Accept")):
+        return _binary_cluster_response(req, response_json, len(request_body.coords), headers)
+    return _json_response(response_json, 201, headers)
+
+
+def _binary_cluster_response(
+    req: https_fn.Request, response_json: dict, n_points: int, headers: dict
+) -> https_fn.Response:
+    body, keys = payloads.encode_clusters(response_json["clusters"], n_points, response_json.get("sequences"))
+    body, encoding = payloads.compress(body, req.headers.get("Accept-Encoding"))
+    headers = {
+        **headers,
+        "Access-Control-Expose-Headers": f"{headers['Access-Control-Expose-Headers']}, {BINARY_CLUSTER_HEADERS}",
+        "X-Cluster-Keys": ",".join(keys),
+        "X-Solver": json.dumps(response_json.get("solver"), separators=(",", ":")),
+    }
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return https_fn.Response(response=body, status=201, headers=headers, content_type=payloads.BINARY_CONTENT_TYPE)
+
+
+_cluster_job_store = None
+
+
+def _get_cluster_job_store():
+    global _cluster_job_store
+    with _instances_lock:
+        if _cluster_job_store is None:
+            _cluster_job_store = (
+                jobs.InMemoryJobStore()
+                if CLUSTER_JOB_STORE == "memory"
+                else jobs.FirestoreJobStore(CLUSTER_JOBS_COLLECTION, firestore.client)
+            )
+        return _cluster_job_store
+
+
+def _solve_job_request(request: dict, report_progress) -> dict:
+    request_body = KMeansClusterDeliveriesRequest(**request)
+    # The limits may have changed since the job was queued.
+    error = cluster_request_error(request_body)
+    if error:
+        raise ValueError(error)
+    report_progress("solving")
+    # Jobs run from a trigger, off the request path; shedding one would only fail it.
+    response_json, _ = _solve_cached(request_body, admitted=False)
+    return response_json
+
+
+@https_fn.on_request(region="us-central1", memory=512, timeout_sec=60)
+def cluster_deliveries_k_means_job(req: https_fn.Request) -> https_fn.Response:
+    """POST queues a clustering job and returns its id; GET ?job_id= polls it."""
+    headers = {**_cors_headers(req), "Access-Control-Allow-Methods": "GET, POST, OPTIONS"}
+
+    if req.method == "OPTIONS":
+        return https_fn.Response("", headers=headers, status=204, content_type="application/json")
+
+    if req.method not in ("GET", "POST"):
+        return _json_response({"error": "Method not allowed."}, 405, headers)
+
+    auth_error = _require_authenticated_request(req, headers)
+    if auth_error:
+        return auth_error
+
+    # Polling only reads the job store, so it does not wait for the solver imports.
+    if req.method == "GET":
+        job_id = req.args.get("job_id", "")
+        if not job_id:
+            return _json_response({"error": "job_id is required."}, 400, headers)
+        job = _get_cluster_job_store().get(job_id)
+        if job is None:
+            return _json_response({"error": "Job not found."}, 404, headers)
+        return _json_response(jobs.job_status(job_id, job), 200, headers)
+
+    _finish_imports(*CLUSTERING_MODULES)
+    request_body, error_response = _parse_cluster_request(req, headers)
+    if error_response:
+        return error_response
+
+    job_id = jobs.new_job_id()
+    request_json = json.dumps({
+        **request_body.model_dump(mode="json", exclude={"coords"}),
+        "coords": geo.latlon_array(request_body.coords).tolist(),
+    })
+    job_store = _get_cluster_job_store()
+    job_store.create(job_id, jobs.new_job(request_json))
+    if CLUSTER_JOB_STORE == "memory":
+        # No Firestore trigger locally, so run the worker in-process.
+        threading.Thread(
+            target=jobs.run_job, args=(job_store, job_id, _solve_job_request), daemon=True
+        ).start()
+    logging.info("cluster_deliveries_k_means_job queued %s n=%d", job_id, len(request_body.coords))
+    return _json_response({"job_id": job_id, "status": jobs.JOB_QUEUED}, 202, headers)
+
+
+@firestore_fn.on_document_created(
+    document=CLUSTER_JOBS_COLLECTION + "/{jobId}", region="us-central1", memory=1024, timeout_sec=540
+)
+def run_cluster_job(event: firestore_fn.Event) -> None:
+    _finish_imports(*CLUSTERING_MODULES)
+    jobs.run_job(_get_cluster_job_store(), event.params["jobId"], _solve_job_request)
+
+
+def batch_request_error(request_body: BatchClusterDeliveriesRequest) -> Optional[Tuple[str, Dict[str, str]]]:
+    """Return the message, and per-date messages, for a batch that cannot be solved."""
+    if not request_body.problems:
+        return "problems must not be empty.", {}
+    if len(request_body.problems) > MAX_BATCH_PROBLEMS:
+        return f"At most {MAX_BATCH_PROBLEMS} dates per batch.", {}
+    if sum(len(problem.coords) for problem in request_body.problems.values()) > MAX_BATCH_COORDS:
+        return "Too many coordinates in batch.", {}
+    errors = {}
+    for day, problem in request_body.problems.items():
+        # Problems already run in parallel, so modes with their own worker pools are not allowed.
+        if problem.mode in ("hierarchical", "multistart"):
+            errors[day.isoformat()] = "Batch problems cannot use hierarchical or multistart mode."
+            continue
+        error = cluster_request_error(problem)
+        if error:
+            errors[day.isoformat()] = error
+    if errors:
+        return "Invalid batch problems.", errors
+    return None
+
+
+def _batch_results(problems: Dict[date, KMeansClusterDeliveriesRequest]):
+    """Yield one NDJSON line per date as its solve finishes, then a summary line.
+
+    Each problem goes through the result cache and admission control like a
+    single request, so large ones share the instance's solve pool instead of
+    starting processes of their own, and a shed problem gets a 429 line.
+    """
+    started = time.perf_counter()
+    workers = min(worker_pool.worker_count(), len(problems))
+    with ThreadPoolExecutor(max_workers=workers) as threads:
+        futures = {threads.submit(_solve_cached, problem): day for day, problem in problems.items()}
+        failed = 0
+        for future in as_completed(futures):
+            day = futures[future].isoformat()
+            try:
+                result, cache_status = future.result()
+                line = {"date": day, "status": 201, "cache": cache_status, "result": result}
+            except admission.Overloaded as e:
+                failed += 1
+                line = {"date": day, "status": 429, "error": str(e), "retry_after": e.retry_after}
+            except ClusteringDeadlineExceeded as e:
+                failed += 1
+                line = {"date": day, "status": 504, "error": str(e), "timed_out": True}
+            except Exception as e:
+                logging.error("cluster_deliveries_batch failed for %s: %s", day, e, exc_info=True)
+                failed += 1
+                line = {"date": day, "status": 500, "error": "Clustering failed."}
+            yield json.dumps(line) + "\n"
+
+    elapsed_ms = int((time.perf_counter() - started) * 1000)
+    logging.info("cluster_deliveries_batch solved %d dates (%d failed) in %dms", len(problems), failed, elapsed_ms)
+    yield json.dumps({"done": True, "dates": len(problems), "failed": failed, "elapsed_ms": elapsed_ms}) + "\n"
+
+
+@https_fn.on_request(region="us-central1", memory=1024, timeout_sec=540)
+def cluster_deliveries_batch(req: https_fn.Request) -> https_fn.Response:
+    """Cluster several delivery dates at once, streaming each result as NDJSON when it is ready."""
+    headers = _cors_headers(req)
+
+    if req.method == "OPTIONS":
+        return https_fn.Response("", headers=headers, status=204, content_type="application/json")
+
+    if req.method != "POST":
+        return _json_response({"error": "Method not allowed."}, 405, headers)
 
     auth_error = _require_authenticated_request(req, headers)
     if auth_error:
         return auth_error
+    _finish_imports(*CLUSTERING_MODULES)
 
     try:
-        data = req.get_json()
-        request_body = KMeansClusterDeliveriesRequest(**data)
+        request_body = BatchClusterDeliveriesRequest(**req.get_json())
     except ValidationError as e:
-        return https_fn.Response(
-            response=json.dumps(
-                {
-                    "error": "Validation error",
-                    "details": [field_error.model_dump() for field_error in parse_error_fields(e)],
-                }
-            ),
-            status=400,
-            headers=headers,
-            content_type="application/json",
+        return _json_response(
+            {
+                "error": "Validation error",
+                "details": [field_error.model_dump() for field_error in parse_error_fields(e)],
+            },
+            400,
+            headers,
         )
     except Exception as e:
-        logging.error("cluster_deliveries_k_means invalid json: %s", e, exc_info=True)
-        return https_fn.Response(
-            response=json.dumps({"error": "Invalid request payload."}),
-            status=400,
-            headers=headers,
-            content_type="application/json",
-        )
+        logging.error("cluster_deliveries_batch invalid json: %s", e, exc_info=True)
+        return _json_response({"error": "Invalid request payload."}, 400, headers)
+
+    error = batch_request_error(request_body)
+    if error:
+        message, details = error
+        return _json_response({"error": message, "details": details} if details else {"error": message}, 400, headers)
 
+    # Each problem is for its key's date unless it names one itself.
+    problems = {
+        day: problem if problem.delivery_date else problem.model_copy(update={"delivery_date": day})
+        for day, problem in request_body.problems.items()
+    }
+    return https_fn.Response(
+        response=_batch_results(problems),
+        status=200,
+        headers=headers,
+        content_type=NDJSON_CONTENT_TYPE,
+    )
+
+
+def insert_request_error(request_body: InsertDeliveriesRequest) -> Optional[str]:
+    """Return the client-facing message for an invalid insertion request, if any."""
     if len(request_body.coords) > MAX_CLUSTER_COORDS:
-        return https_fn.Response(
-            response=json.dumps({"error": "Too many coordinates in request."}),
-            status=400,
-            headers=headers,
-            content_type="application/json",
-        )
-    if request_body.drivers_count > MAX_CLUSTER_DRIVERS:
-        return https_fn.Response(
-            response=json.dumps({"error": "Too many drivers requested."}),
-            status=400,
-            headers=headers,
-            content_type="application/json",
-        )
-    if request_body.drivers_count <= 0 or request_body.min_deliveries <= 0 or request_body.max_deliveries <= 0:
-        return https_fn.Response(
-            response=json.dumps({"error": "Invalid clustering parameters."}),
-            status=400,
-            headers=headers,
-            content_type="application/json",
+        return "Too many coordinates in request."
+    if len(request_body.new_coords) > MAX_INSERT_COORDS:
+        return "Too many new coordinates in request."
+    if not request_body.new_coords:
+        return "new_coords must not be empty."
+    if request_body.max_deliveries <= 0:
+        return "Invalid clustering parameters."
+    seen = set()
+    for cluster_id, indices in request_body.clusters.items():
+        for index in indices:
+            if not 0 <= index < len(request_body.coords):
+                return f"Cluster {cluster_id} lists index {index}, which is not in coords."
+            if index in seen:
+                return f"Index {index} is listed under more than one cluster."
+            seen.add(index)
+    for coords in (request_body.coords, request_body.new_coords):
+        coordinate_error = payloads.coordinate_error(geo.latlon_array(coords))
+        if coordinate_error:
+            return coordinate_error
+    return None
+
+
+def solve_insert_request(request_body: InsertDeliveriesRequest) -> InsertDeliveriesResponse:
+    """Add ``new_coords`` to an existing assignment; other deliveries keep their clusters."""
+    started = time.perf_counter()
+    n_existing = len(request_body.coords)
+    latlon = geo.latlon_array(list(request_body.coords) + list(request_body.new_coords))
+    points = geo.to_local_planar(latlon)
+    labels, cluster_ids = constrained_kmeans.prior_labels_from_clusters(request_body.clusters, n_existing)
+    result = insertion.insert_points(
+        points[:n_existing], labels, points[n_existing:], len(cluster_ids), request_body.max_deliveries
+    )
+    if result.unplaced:
+        raise insertion.InsertionInfeasible(
+            "No nearby cluster has room for every new delivery; re-cluster the day instead.",
+            unplaced=[n_existing + index for index in result.unplaced],
         )
-    if request_body.min_deliveries > request_body.max_deliveries:
-        return https_fn.Response(
-            response=json.dumps({"error": "min_deliveries cannot exceed max_deliveries."}),
-            status=400,
-            headers=headers,
-            content_type="application/json",
+    for index, label in result.moved.items():
+        labels[index] = label
+
+    clusters = {str(cluster_id): [] for cluster_id in request_body.clusters}
+    for index, label in enumerate(labels.tolist() + result.labels.tolist()):
+        if label >= 0:
+            clusters[cluster_ids[label]].append(index)
+    return InsertDeliveriesResponse(
+        clusters=clusters,
+        moved={index: cluster_ids[label] for index, label in result.moved.items()},
+        unassigned=[index for index, label in enumerate(labels.tolist()) if label < 0],
+        repairs=result.repairs,
+        elapsed_ms=int((time.perf_counter() - started) * 1000),
+    )
+
+
+@https_fn.on_request(region="us-central1", memory=512, timeout_sec=60)
+def insert_deliveries(req: https_fn.Request) -> https_fn.Response:
+    """Place late-added deliveries into an existing clustering without re-solving the day."""
+    headers = _cors_headers(req)
+
+    if req.method == "OPTIONS":
+        return https_fn.Response("", headers=headers, status=204, content_type="application/json")
+
+    if req.method != "POST":
+        return _json_response({"error": "Method not allowed."}, 405, headers)
+
+    auth_error = _require_authenticated_request(req, headers)
+    if auth_error:
+        return auth_error
+    _finish_imports(constrained_kmeans, geo, insertion, payloads)
+
+    try:
+        request_body = InsertDeliveriesRequest(**req.get_json())
+    except ValidationError as e:
+        return _json_response(
+            {
+                "error": "Validation error",
+                "details": [field_error.model_dump() for field_error in parse_error_fields(e)],
+            },
+            400,
+            headers,
         )
+    except Exception as e:
+        logging.error("insert_deliveries invalid json: %s", e, exc_info=True)
+        return _json_response({"error": "Invalid request payload."}, 400, headers)
 
-    coords = np.array(request_body.coords, dtype=object)
-    coords = np.array([latlon_to_cartesian(lat, lon) for lat, lon in coords])
-    drivers_count = request_body.drivers_count
-    min_deliveries = request_body.min_deliveries
-    max_deliveries = request_body.max_deliveries
+    error = insert_request_error(request_body)
+    if error:
+        return _json_response({"error": error}, 400, headers)
 
-    if drivers_count > len(coords):
-        print("Warning: Number of drivers exceeds the number of deliveries. Adjusting drivers count to match deliveries.")
-        drivers_count = len(coords)
+    try:
+        response = solve_insert_request(request_body)
+    except insertion.InsertionInfeasible as e:
+        return _json_response({"error": str(e), "unplaced": e.unplaced}, 409, headers)
+    logging.info(
+        "insert_deliveries n=%d new=%d repairs=%d elapsed_ms=%d",
+        len(request_body.coords), len(request_body.new_coords), response.repairs, response.elapsed_ms,
+    )
+    return _json_response(response.model_dump(), 200, headers)
 
-    size_max = max(max_deliveries, (len(coords) + drivers_count - 1) // drivers_count)
 
-    kmeans = KMeansConstrained(
-        n_clusters=drivers_count,
-        size_min=min_deliveries,
-        size_max=size_max,
-        random_state=42,
-    ).fit(coords)
-    labels = kmeans.labels_
+def _read_date(db, day: date, tz_name: str) -> Tuple[List[str], Dict[str, Tuple[float, float]], List[str], int]:
+    """Located client ids (sorted), their coordinates, unlocated client ids and the event count for a day."""
+    event_client_ids, event_count = delivery_queries.event_client_ids(db, day, tz_name)
+    client_ids = sorted(set(event_client_ids))
+    coordinates = delivery_queries.client_coordinates(db, client_ids)
+    located = [client_id for client_id in client_ids if client_id in coordinates]
+    unlocated = [client_id for client_id in client_ids if client_id not in coordinates]
+    return located, coordinates, unlocated, event_count
 
-    clusters = defaultdict(list)
-    for index, label in enumerate(labels):
-        clusters[f"{label + 1}"].append(index)
 
-    response_data = ClusterDeliveriesResponse(clusters=clusters)
+def _date_cluster_request(
+    request_body: ClusterDateRequest, located: List[str], coordinates: Dict[str, Tuple[float, float]]
+) -> KMeansClusterDeliveriesRequest:
+    return KMeansClusterDeliveriesRequest(
+        coords=[coordinates[client_id] for client_id in located],
+        client_ids=located,
+        **request_body.model_dump(exclude={"tz_name"}),
+    )
 
-    return https_fn.Response(
-        response=json.dumps(response_data.model_dump()),
-        status=201,
-        headers=headers,
-        content_type="application/json",
+
+def _fit_drivers(cluster_request: KMeansClusterDeliveriesRequest) -> KMeansClusterDeliveriesRequest:
+    """The request with its driver count moved just enough to fit the day, when it cannot as asked."""
+    n_located = len(cluster_request.coords)
+    most = n_located // max(cluster_request.min_deliveries, 1)
+    fewest = -(-n_located // max(cluster_request.max_deliveries, 1))
+    drivers_count = max(min(cluster_request.drivers_count, most), fewest)
+    return cluster_request.model_copy(update={"drivers_count": drivers_count})
+
+
+def _date_fingerprint(cluster_request: KMeansClusterDeliveriesRequest, unlocated: List[str]) -> str:
+    # The day's client ids and coordinates, with the parameters as requested: a
+    # fitted driver count is part of the solve, not of the key.
+    params = cluster_request.model_dump(mode="json", exclude={"coords"})
+    params["unlocated"] = unlocated
+    return result_cache.request_fingerprint(geo.latlon_array(cluster_request.coords), params)
+
+
+def _solve_date(db, cluster_request: KMeansClusterDeliveriesRequest, unlocated: List[str]) -> Tuple[dict, bool]:
+    """Clusters (by client id) and solver stats for a day, and whether they were precomputed.
+
+    A stored result is reused while its fingerprint matches; a new one is stored for later calls.
+    ``cluster_request`` holds the parameters as requested; the solve fits the driver count to the day.
+    """
+    key = cluster_request.delivery_date.isoformat()
+    fingerprint = _date_fingerprint(cluster_request, unlocated)
+    stored = delivery_queries.precomputed(db, key)
+    if stored is not None and stored.get("fingerprint") == fingerprint:
+        return stored, True
+
+    response_json, _ = _solve_cached(_fit_drivers(cluster_request))
+    located = cluster_request.client_ids
+    entry = {
+        "fingerprint": fingerprint,
+        "clusters": {
+            cluster_id: [located[index] for index in indices]
+            for cluster_id, indices in response_json["clusters"].items()
+        },
+        "solver": response_json.get("solver"),
+    }
+    # A multistart result cut short by its deadline is not the answer for this input.
+    if not (entry["solver"] or {}).get("timed_out"):
+        delivery_queries.save_precomputed(db, key, entry)
+    return entry, False
+
+
+def cluster_date(db, request_body: ClusterDateRequest) -> Tuple[dict, int]:
+    """Cluster a day's deliveries from Firestore and save them as its clusters document.
+
+    Returns the response body and status. Clients without usable coordinates
+    are left out and listed under ``unlocated``.
+    """
+    day = request_body.delivery_date
+    located, coordinates, unlocated, event_count = _read_date(db, day, request_body.tz_name)
+    if not located and not unlocated:
+        return {"error": f"No deliveries on {day.isoformat()}."}, 404
+    if not located:
+        return {"error": f"No deliveries with coordinates on {day.isoformat()}.", "unlocated": unlocated}, 404
+
+    cluster_request = _date_cluster_request(request_body, located, coordinates)
+    error = cluster_request_error(_fit_drivers(cluster_request))
+    if error:
+        return {"error": error, "deliveries": len(located)}, 400
+
+    # The nightly pre-clustering reuses the latest parameters.
+    delivery_queries.save_precomputed(
+        db, delivery_queries.LAST_REQUEST_DOC, {"params": request_body.model_dump(mode="json", exclude={"delivery_date"})}
+    )
+    entry, precomputed = _solve_date(db, cluster_request, unlocated)
+    doc_id = delivery_queries.save_day_clusters(db, day, entry["clusters"])
+    return {
+        "docId": doc_id,
+        "clusters": entry["clusters"],
+        "unlocated": unlocated,
+        "event_count": event_count,
+        "solver": entry.get("solver"),
+        "precomputed": precomputed,
+    }, 201
+
+
+def precluster_upcoming_dates(db, first_date: date, days: int = PRECLUSTER_DAYS) -> Dict[str, str]:
+    """Precompute candidate clusters for ``days`` dates from ``first_date``; returns each date's outcome.
+
+    Dates whose events are unchanged since they were last clustered are skipped.
+    """
+    last_request = delivery_queries.precomputed(db, delivery_queries.LAST_REQUEST_DOC)
+    if not last_request or not last_request.get("params"):
+        logging.info("Pre-clustering skipped: no cluster_deliveries_for_date request yet.")
+        return {}
+    _finish_imports(*CLUSTERING_MODULES)
+
+    outcomes = {}
+    for offset in range(days):
+        day = first_date + timedelta(days=offset)
+        try:
+            params = last_request["params"]
+            located, coordinates, unlocated, _ = _read_date(
+                db, day, params.get("tz_name", delivery_queries.DEFAULT_TIMEZONE)
+            )
+            if not located:
+                outcomes[day.isoformat()] = "no deliveries"
+                continue
+            request_body = ClusterDateRequest(**params, delivery_date=day)
+            cluster_request = _date_cluster_request(request_body, located, coordinates)
+            error = cluster_request_error(_fit_drivers(cluster_request))
+            if error:
+                outcomes[day.isoformat()] = error
+                continue
+            _, precomputed = _solve_date(db, cluster_request, unlocated)
+            outcomes[day.isoformat()] = "unchanged" if precomputed else "computed"
+        except Exception as e:
+            logging.error("Pre-clustering %s failed: %s", day, e, exc_info=True)
+            outcomes[day.isoformat()] = "failed"
+    return outcomes
+
+
+@https_fn.on_request(region="us-central1", memory=512, timeout_sec=300)
+def cluster_deliveries_for_date(req: https_fn.Request) -> https_fn.Response:
+    """Cluster a delivery date from its events and write the clusters document, all server-side."""
+    headers = _cors_headers(req)
+
+    if req.method == "OPTIONS":
+        return https_fn.Response("", headers=headers, status=204, content_type="application/json")
+
+    if req.method != "POST":
+        return _json_response({"error": "Method not allowed."}, 405, headers)
+
+    auth_error = _require_authenticated_request(req, headers)
+    if auth_error:
+        return auth_error
+    _finish_imports(*CLUSTERING_MODULES)
+
+    try:
+        request_body = ClusterDateRequest(**req.get_json())
+    except ValidationError as e:
+        return _json_response(
+            {
+                "error": "Validation error",
+                "details": [field_error.model_dump() for field_error in parse_error_fields(e)],
+            },
+            400,
+            headers,
+        )
+    except Exception as e:
+        logging.error("cluster_deliveries_for_date invalid json: %s", e, exc_info=True)
+        return _json_response({"error": "Invalid request payload."}, 400, headers)
+
+    started = time.perf_counter()
+    try:
+        body, status = cluster_date(firestore.client(), request_body)
+    except ClusteringDeadlineExceeded as e:
+        return _json_response({"error": str(e), "timed_out": True}, 504, headers)
+    except ZoneInfoNotFoundError:
+        return _json_response({"error": f"Unknown timezone: {request_body.tz_name}"}, 400, headers)
+    except admission.Overloaded as e:
+        return _overloaded_response(e, headers)
+    logging.info(
+        "cluster_deliveries_for_date date=%s status=%d elapsed_ms=%d",
+        request_body.delivery_date, status, int((time.perf_counter() - started) * 1000),
     )
+    return _json_response(body, status, headers)
@@ -0,0 +1,58 @@
+"""Merge co-located deliveries into weighted points before clustering.
+
+Apartment buildings and senior residences put many deliveries at the same or
+nearly the same coordinate, and failed geocodes all sit at the (0, 0)
+placeholder. Points are snapped to a grid of ``tolerance_km`` cells; each
+occupied cell becomes one point at its members' mean, weighted by how many
+deliveries it holds. Invalid coordinates are quarantined: they are left out of
+the solve and come back unlabelled.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+import geo
+
+
+@dataclass
+class Coalesced:
+    points: np.ndarray
+    weights: np.ndarray
+    # Original indices of the merged points, grouped by cell in the order of ``points``.
+    order: np.ndarray
+    quarantined: np.ndarray
+    n_original: int
+
+    def expand(self, labels: np.ndarray) -> np.ndarray:
+        """Labels for the original points from labels over ``points`` repeated ``weights`` times.
+
+        Quarantined points are labelled -1.
+        """
+        expanded = np.full(self.n_original, -1, dtype=np.int64)
+        expanded[self.order] = labels
+        return expanded
+
+
+def coalesce(latlon: np.ndarray, tolerance_km: float, projection: str = "cartesian") -> Coalesced:
+    """Merge coordinates that share a grid cell in ``projection`` (km); quarantine invalid ones.
+
+    Only valid coordinates are projected, so placeholders do not move the
+    origin of a planar projection.
+    """
+    if tolerance_km <= 0:
+        raise ValueError("tolerance_km must be positive.")
+    valid = geo.valid_coordinate_mask(latlon)
+    kept = np.flatnonzero(valid)
+    points = geo.project(latlon[kept], projection)
+    cells = np.floor(points / tolerance_km).astype(np.int64)
+    _, cell_of, weights = np.unique(cells, axis=0, return_inverse=True, return_counts=True)
+    cell_of = cell_of.ravel()
+    sums = np.zeros((len(weights), points.shape[1]))
+    np.add.at(sums, cell_of, points)
+    return Coalesced(
+        points=sums / weights[:, None],
+        weights=weights.astype(np.int64),
+        order=kept[np.argsort(cell_of, kind="stable")],
+        quarantined=np.flatnonzero(~valid),
+        n_original=len(latlon),
+    )
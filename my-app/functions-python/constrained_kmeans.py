@@ -0,0 +1,230 @@
+"""Size-constrained k-means solve shared by the clustering endpoints.
+
+Kept free of Firebase imports so worker processes can import it cheaply.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from k_means_constrained import KMeansConstrained
+from scipy.spatial import cKDTree
+from sklearn.cluster import kmeans_plusplus
+
+import assignment
+
+DEFAULT_RANDOM_STATE = 42
+DEFAULT_N_INIT = 10
+SPARSE_MAX_ITER = 50
+
+
+@dataclass
+class ClusteringResult:
+    labels: np.ndarray
+    centers: np.ndarray
+    inertia: float
+    n_iter: int
+    n_init: int
+    warm_started: bool = False
+    # Sparse assignment: the most candidate clusters per point any iteration needed.
+    candidates: Optional[int] = None
+
+
+def size_bounds(n_points: int, n_clusters: int, min_deliveries: int, max_deliveries: int) -> Tuple[int, int]:
+    """Widen size_max just enough that every point fits into ``n_clusters``."""
+    size_max = max(max_deliveries, (n_points + n_clusters - 1) // n_clusters)
+    return min_deliveries, size_max
+
+
+def solve(
+    points: np.ndarray,
+    n_clusters: int,
+    size_min: int,
+    size_max: int,
+    init: Optional[np.ndarray] = None,
+    random_state: int = DEFAULT_RANDOM_STATE,
+    n_init: Optional[int] = None,
+) -> ClusteringResult:
+    """Run KMeansConstrained, seeding from ``init`` centers when provided."""
+    if init is not None:
+        n_init = 1
+    elif n_init is None:
+        n_init = DEFAULT_N_INIT
+    kmeans = KMeansConstrained(
+        n_clusters=n_clusters,
+        size_min=size_min,
+        size_max=size_max,
+        init=init if init is not None else "k-means++",
+        n_init=n_init,
+        random_state=random_state,
+    ).fit(points)
+    return ClusteringResult(
+        labels=kmeans.labels_,
+        centers=kmeans.cluster_centers_,
+        inertia=float(kmeans.inertia_),
+        n_iter=int(kmeans.n_iter_),
+        n_init=n_init,
+        warm_started=init is not None,
+    )
+
+
+def _sparse_run(
+    points: np.ndarray,
+    centers: np.ndarray,
+    size_min: int,
+    size_max: int,
+    candidates: int,
+    max_iter: int,
+    weights: np.ndarray,
+) -> ClusteringResult:
+    n_clusters = len(centers)
+    # Labels are per unit of weight; owners maps each back to its point.
+    owners = np.repeat(np.arange(len(points)), weights)
+    labels = None
+    widest = 0
+    n_iter = 0
+    for n_iter in range(1, max_iter + 1):
+        tree = cKDTree(centers)
+
+        def candidates_for(m):
+            distances, clusters = tree.query(points, k=m)
+            return clusters.reshape(len(points), m), distances.reshape(len(points), m) ** 2
+
+        new_labels, used = assignment.sparse_assignment(
+            candidates_for, len(points), n_clusters, size_min, size_max, candidates, weights
+        )
+        widest = max(widest, used)
+        converged = labels is not None and np.array_equal(new_labels, labels)
+        labels = new_labels
+        if converged:
+            break
+        counts = np.bincount(labels, minlength=n_clusters)[:, None]
+        sums = np.zeros_like(centers)
+        np.add.at(sums, labels, points[owners])
+        centers = np.where(counts > 0, sums / np.maximum(counts, 1), centers)
+
+    return ClusteringResult(
+        labels=labels,
+        centers=centers,
+        inertia=float(((points[owners] - centers[labels]) ** 2).sum()),
+        n_iter=n_iter,
+        n_init=1,
+        candidates=widest,
+    )
+
+
+def sparse_solve(
+    points: np.ndarray,
+    n_clusters: int,
+    size_min: int,
+    size_max: int,
+    init: Optional[np.ndarray] = None,
+    random_state: int = DEFAULT_RANDOM_STATE,
+    n_init: Optional[int] = None,
+    candidates: int = assignment.DEFAULT_CANDIDATES,
+    max_iter: int = SPARSE_MAX_ITER,
+    weights: Optional[np.ndarray] = None,
+) -> ClusteringResult:
+    """Same objective as ``solve``, but each assignment step only links points to nearby centroids.
+
+    KMeansConstrained's flow network has an arc from every point to every
+    cluster; here each point gets arcs to its ``candidates`` nearest centroids
+    (widened when the size limits need more), so the network and the cost
+    arrays grow as n x candidates instead of n x k.
+
+    ``weights`` makes point ``i`` count as ``weights[i]`` points (see
+    ``assignment.sparse_assignment``); the labels are then for the points
+    repeated ``weights`` times.
+    """
+    weights = np.ones(len(points), dtype=np.int64) if weights is None else np.asarray(weights, dtype=np.int64)
+    if init is not None:
+        n_init = 1
+    elif n_init is None:
+        n_init = DEFAULT_N_INIT
+    rng = np.random.RandomState(random_state)
+    best = None
+    for _ in range(n_init):
+        if init is None and len(points) < n_clusters:
+            # Fewer distinct points than clusters: seed from the repeated points.
+            centers, _ = kmeans_plusplus(np.repeat(points, weights, axis=0), n_clusters, random_state=rng)
+        elif init is None:
+            centers, _ = kmeans_plusplus(points, n_clusters, sample_weight=weights, random_state=rng)
+        else:
+            centers = np.asarray(init, dtype=np.float64)
+        result = _sparse_run(points, centers, size_min, size_max, candidates, max_iter, weights)
+        if best is None or result.inertia < best.inertia:
+            best = result
+    best.n_init = n_init
+    best.warm_started = init is not None
+    return best
+
+
+def prior_labels_from_clusters(clusters: Dict[str, List[int]], n_points: int) -> Tuple[np.ndarray, List[str]]:
+    """Turn a ``{cluster_id: [point index, ...]}`` mapping into a label per point.
+
+    Points missing from the mapping are labelled -1. The returned list maps each
+    label back to its cluster id.
+    """
+    labels = np.full(n_points, -1, dtype=np.int64)
+    cluster_ids = []
+    for cluster_id, indices in clusters.items():
+        valid = [index for index in indices if 0 <= index < n_points]
+        if not valid:
+            continue
+        labels[valid] = len(cluster_ids)
+        cluster_ids.append(str(cluster_id))
+    return labels, cluster_ids
+
+
+def warm_start_centers(
+    points: np.ndarray,
+    prior_labels: np.ndarray,
+    prior_ids: List[str],
+    n_clusters: int,
+) -> Tuple[Optional[np.ndarray], List[Optional[str]]]:
+    """Seed centers from the mean of each prior cluster.
+
+    The largest prior clusters are kept when there are more than ``n_clusters``;
+    missing centers are filled with the points farthest from the existing seeds.
+    Returns the centers and the prior cluster id for each of them (None for
+    filled seeds), or ``(None, [])`` when nothing usable was supplied.
+    """
+    known = prior_labels >= 0
+    if not known.any():
+        return None, []
+
+    counts = np.bincount(prior_labels[known], minlength=len(prior_ids))
+    sums = np.zeros((len(prior_ids), points.shape[1]), dtype=np.float64)
+    np.add.at(sums, prior_labels[known], points[known])
+
+    order = [label for label in np.argsort(-counts, kind="stable") if counts[label] > 0][:n_clusters]
+    centers = [sums[label] / counts[label] for label in order]
+    seed_ids: List[Optional[str]] = [prior_ids[label] for label in order]
+
+    nearest = np.full(points.shape[0], np.inf)
+    for center in centers:
+        nearest = np.minimum(nearest, np.linalg.norm(points - center, axis=1))
+    while len(centers) < n_clusters:
+        farthest = int(np.argmax(nearest))
+        centers.append(points[farthest].copy())
+        seed_ids.append(None)
+        nearest = np.minimum(nearest, np.linalg.norm(points - points[farthest], axis=1))
+
+    return np.asarray(centers, dtype=np.float64), seed_ids
+
+
+def cluster_keys(seed_ids: List[Optional[str]], n_clusters: int) -> List[str]:
+    """Label -> response key, reusing prior cluster ids so driver areas keep their names."""
+    if not seed_ids:
+        return [f"{label + 1}" for label in range(n_clusters)]
+
+    used = {cluster_id for cluster_id in seed_ids if cluster_id is not None}
+    keys = []
+    next_id = 1
+    for cluster_id in seed_ids:
+        if cluster_id is None:
+            while str(next_id) in used:
+                next_id += 1
+            cluster_id = str(next_id)
+            used.add(cluster_id)
+        keys.append(cluster_id)
+    return keys
@@ -0,0 +1,127 @@
+"""Firestore reads and writes for a delivery day, shared by main.py and the clustering endpoints.
+
+Every function takes the Firestore client, so callers keep control of when it
+is created and tests can pass a fake.
+"""
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from firebase_admin import firestore
+
+EVENTS_COLLECTION = "events"
+CLIENTS_COLLECTION = "client-profile2"
+CLUSTERS_COLLECTION = "clusters"
+# Candidate clusters per date (document id YYYY-MM-DD), written ahead of time.
+PRECOMPUTED_COLLECTION = "precomputedClusters"
+# Document in PRECOMPUTED_COLLECTION holding the latest on-demand request's parameters.
+LAST_REQUEST_DOC = "lastRequest"
+# Document in PRECOMPUTED_COLLECTION holding the recent deliveries zones mode learns from.
+ZONE_HISTORY_DOC = "zoneHistory"
+DEFAULT_TIMEZONE = "America/New_York"
+# Documents per get_all call.
+GET_ALL_BATCH = 300
+
+
+def day_bounds_utc(delivery_date: date, tz_name: str = DEFAULT_TIMEZONE) -> Tuple[datetime, datetime]:
+    """Start and end of ``delivery_date`` in ``tz_name``, as UTC datetimes for timestamp comparisons."""
+    tz = ZoneInfo(tz_name)
+    start = datetime(delivery_date.year, delivery_date.month, delivery_date.day, tzinfo=tz)
+    return start.astimezone(timezone.utc), (start + timedelta(days=1)).astimezone(timezone.utc)
+
+
+def event_client_ids(db, delivery_date: date, tz_name: str = DEFAULT_TIMEZONE) -> Tuple[List[str], int]:
+    """Client ids of the events whose deliveryDate falls on ``delivery_date``, and the event count."""
+    start_utc, end_utc = day_bounds_utc(delivery_date, tz_name)
+    query = (
+        db.collection(EVENTS_COLLECTION)
+        .where(filter=firestore.FieldFilter("deliveryDate", ">=", start_utc))
+        .where(filter=firestore.FieldFilter("deliveryDate", "<", end_utc))
+    )
+    client_ids = []
+    event_count = 0
+    for doc in query.stream():
+        event_count += 1
+        client_id = (doc.to_dict() or {}).get("clientId")
+        if client_id:
+            client_ids.append(client_id)
+    return client_ids, event_count
+
+
+def coordinate_pair(value) -> Optional[Tuple[float, float]]:
+    """A client profile's ``coordinates`` as (lat, lng); None when missing or the (0, 0) placeholder."""
+    if isinstance(value, dict):
+        value = (value.get("lat", value.get("latitude")), value.get("lng", value.get("longitude")))
+    if not isinstance(value, (list, tuple)) or len(value) != 2:
+        return None
+    try:
+        lat, lng = float(value[0]), float(value[1])
+    except (TypeError, ValueError):
+        return None
+    if lat == 0.0 and lng == 0.0:
+        return None
+    return lat, lng
+
+
+def client_coordinates(db, client_ids: Iterable[str]) -> Dict[str, Tuple[float, float]]:
+    """Saved coordinates of each client that has usable ones, read only the ``coordinates`` field."""
+    collection = db.collection(CLIENTS_COLLECTION)
+    client_ids = sorted(set(client_ids))
+    coordinates = {}
+    for start in range(0, len(client_ids), GET_ALL_BATCH):
+        refs = [collection.document(client_id) for client_id in client_ids[start:start + GET_ALL_BATCH]]
+        for snapshot in db.get_all(refs, field_paths=["coordinates"]):
+            if not snapshot.exists:
+                continue
+            point = coordinate_pair((snapshot.to_dict() or {}).get("coordinates"))
+            if point is not None:
+                coordinates[snapshot.id] = point
+    return coordinates
+
+
+def clusters_query(db, delivery_date: date):
+    """The ``clusters`` document query for a day."""
+    # Cluster documents are dated at UTC midnight of the delivery day (see initClustersForDay).
+    start = datetime(delivery_date.year, delivery_date.month, delivery_date.day, tzinfo=timezone.utc)
+    return (
+        db.collection(CLUSTERS_COLLECTION)
+        .where(filter=firestore.FieldFilter("date", ">=", start))
+        .where(filter=firestore.FieldFilter("date", "<", start + timedelta(days=1)))
+        .limit(1)
+    )
+
+
+def save_day_clusters(db, delivery_date: date, clusters: Dict[str, List[str]]) -> str:
+    """Write ``{cluster id: [client id, ...]}`` as the day's clusters document; returns its id.
+
+    Like regenerating clusters in the app, this replaces the clusters of an
+    existing document (clearing driver, time and client overrides) or creates one.
+    """
+    documents = [
+        {"id": cluster_id, "deliveries": list(dict.fromkeys(client_ids)), "driver": "", "time": ""}
+        for cluster_id, client_ids in clusters.items()
+    ]
+    for doc in clusters_query(db, delivery_date).stream():
+        doc.reference.update({"clusters": documents, "clientOverrides": []})
+        return doc.id
+
+    ref = db.collection(CLUSTERS_COLLECTION).document()
+    ref.set({
+        "clusters": documents,
+        "docId": ref.id,
+        "date": datetime(delivery_date.year, delivery_date.month, delivery_date.day, tzinfo=timezone.utc),
+        "clientOverrides": [],
+    })
+    return ref.id
+
+
+def precomputed(db, key: str) -> Optional[dict]:
+    """The ``PRECOMPUTED_COLLECTION`` document ``key``, or None."""
+    snapshot = db.collection(PRECOMPUTED_COLLECTION).document(key).get()
+    if not snapshot.exists:
+        return None
+    return snapshot.to_dict() or {}
+
+
+def save_precomputed(db, key: str, data: dict) -> None:
+    db.collection(PRECOMPUTED_COLLECTION).document(key).set({**data, "computedAt": firestore.SERVER_TIMESTAMP})
@@ -0,0 +1,268 @@
+"""Per-day pairwise distance matrices, persisted as memory-mapped float32 files.
+
+Each delivery date and metric gets a directory under the store root:
+
+- ``matrix.f32``: a (capacity, capacity) float32 C-order matrix in km; only the
+  leading (size, size) block is in use
+- ``meta.json``: capacity, metric, and the client id and coordinate of each
+  row in use
+
+Opening a matrix maps the file, so later requests read only the pages they
+touch. When deliveries are added, only the new rows and columns are computed;
+the file is reallocated (doubling its capacity) only when it runs out of room.
+A client whose coordinates changed has its row and column recomputed in place.
+
+The store usually lives on tmpfs, which counts against the instance's memory,
+so capacity is capped at ``max_bytes`` per matrix. After each write, days
+unused for ``max_age_seconds`` are removed, then the least recently used ones
+until the store fits in ``max_bytes``. Writers (threads and solve-pool
+processes alike) take an exclusive ``fcntl`` lock on the store root.
+"""
+import fcntl
+import json
+import math
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from datetime import date
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+import geo
+
+METRICS = ("haversine", "road")
+MATRIX_FILE = "matrix.f32"
+META_FILE = "meta.json"
+MIN_CAPACITY = 64
+# Rows copied per step when reallocating, to bound memory.
+COPY_ROWS = 1024
+COORD_TOLERANCE = 1e-7
+LOCK_FILE = ".lock"
+FLOAT32_BYTES = 4
+
+
+class StoreFull(ValueError):
+    """The day has more clients than a matrix within the store's byte budget can hold."""
+
+
+def haversine_km(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Great-circle km between every row of ``a`` and every row of ``b``, shape (len(a), len(b))."""
+    lat_a, lon_a = np.radians(a[:, 0])[:, None], np.radians(a[:, 1])[:, None]
+    lat_b, lon_b = np.radians(b[:, 0])[None, :], np.radians(b[:, 1])[None, :]
+    h = np.sin((lat_b - lat_a) / 2) ** 2 + np.cos(lat_a) * np.cos(lat_b) * np.sin((lon_b - lon_a) / 2) ** 2
+    return 2 * geo.EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+
+
+class DayMatrix:
+    """An opened per-day matrix; ``matrix`` is a view of the mapped file."""
+
+    def __init__(self, path: str, meta: Dict, mapped: np.ndarray):
+        self.path = path
+        self.metric: str = meta["metric"]
+        self.client_ids: List[str] = meta["client_ids"]
+        self.coords = np.asarray(meta["coords"], dtype=np.float64).reshape(-1, 2)
+        self.capacity: int = meta["capacity"]
+        self.index = {client_id: row for row, client_id in enumerate(self.client_ids)}
+        self._mapped = mapped
+
+    @property
+    def size(self) -> int:
+        return len(self.client_ids)
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self._mapped[:self.size, :self.size]
+
+    def rows(self, client_ids: Sequence[str]) -> np.ndarray:
+        """Matrix row of each client id; KeyError for an id the matrix does not hold."""
+        return np.fromiter((self.index[client_id] for client_id in client_ids), dtype=np.int64, count=len(client_ids))
+
+    def block(self, rows: np.ndarray) -> np.ndarray:
+        """Distances among ``rows`` as a float64 (len(rows), len(rows)) array."""
+        rows = np.asarray(rows, dtype=np.int64)
+        return np.asarray(self._mapped[np.ix_(rows, rows)], dtype=np.float64)
+
+
+class DistanceStore:
+    def __init__(
+        self,
+        root: str,
+        road_graph=None,
+        max_bytes: Optional[int] = None,
+        max_age_seconds: Optional[float] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.root = root
+        self.road_graph = road_graph
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self._clock = clock
+        self.computed_cells = 0
+        self.evicted = 0
+
+    @property
+    def max_capacity(self) -> Optional[int]:
+        """Most rows a matrix may have within ``max_bytes``."""
+        if self.max_bytes is None:
+            return None
+        return math.isqrt(self.max_bytes // FLOAT32_BYTES)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, LOCK_FILE), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _directory(self, delivery_date: date, metric: str) -> str:
+        return os.path.join(self.root, f"{delivery_date.isoformat()}-{metric}")
+
+    def distances(self, metric: str, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        self.computed_cells += len(a) * len(b)
+        if metric == "haversine":
+            return haversine_km(a, b)
+        if metric == "road":
+            if self.road_graph is None:
+                raise ValueError("Road distances need a road graph.")
+            nodes_a, offsets_a = self.road_graph.snap(self.road_graph.project(a))
+            nodes_b, offsets_b = self.road_graph.snap(self.road_graph.project(b))
+            return self.road_graph.distances_from(nodes_a)[:, nodes_b] + offsets_a[:, None] + offsets_b[None, :]
+        raise ValueError(f"Unknown distance metric: {metric}")
+
+    def open(self, delivery_date: date, metric: str = "haversine") -> Optional[DayMatrix]:
+        directory = self._directory(delivery_date, metric)
+        if not os.path.exists(os.path.join(directory, META_FILE)):
+            return None
+        return self._open_directory(directory)
+
+    @staticmethod
+    def _open_directory(directory: str) -> DayMatrix:
+        with open(os.path.join(directory, META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        mapped = np.memmap(
+            os.path.join(directory, MATRIX_FILE),
+            dtype=np.float32,
+            mode="r+",
+            shape=(meta["capacity"], meta["capacity"]),
+        )
+        return DayMatrix(directory, meta, mapped)
+
+    def ensure(
+        self,
+        delivery_date: date,
+        client_ids: Sequence[str],
+        coords,
+        metric: str = "haversine",
+    ) -> DayMatrix:
+        """The day's matrix, extended with any new ``client_ids`` and updated for moved ones."""
+        if metric not in METRICS:
+            raise ValueError(f"Unknown distance metric: {metric}")
+        latlon = geo.latlon_array(coords)
+        wanted: Dict[str, np.ndarray] = {}
+        for client_id, point in zip(client_ids, latlon):
+            wanted.setdefault(client_id, point)
+        max_capacity = self.max_capacity
+        with self._locked():
+            day = self.open(delivery_date, metric)
+            if day is None:
+                if max_capacity is not None and len(wanted) > max_capacity:
+                    raise StoreFull(f"{len(wanted)} clients exceed the store capacity of {max_capacity}.")
+                capacity = max(MIN_CAPACITY, len(wanted))
+                day = self._create(delivery_date, metric, capacity if max_capacity is None else min(capacity, max_capacity))
+            os.utime(os.path.join(day.path, META_FILE))
+
+            moved = [
+                day.index[client_id] for client_id, point in wanted.items()
+                if client_id in day.index
+                and not np.allclose(day.coords[day.index[client_id]], point, rtol=0.0, atol=COORD_TOLERANCE)
+            ]
+            added = [client_id for client_id in wanted if client_id not in day.index]
+            if not moved and not added:
+                self._evict(keep=day.path)
+                return day
+
+            coords_all = np.vstack([day.coords, np.array([wanted[c] for c in added]).reshape(-1, 2)])
+            for row in moved:
+                coords_all[row] = wanted[day.client_ids[row]]
+            size = len(coords_all)
+            if max_capacity is not None and size > max_capacity:
+                raise StoreFull(f"{size} clients exceed the store capacity of {max_capacity}.")
+            if size > day.capacity:
+                capacity = max(size, 2 * day.capacity)
+                day = self._grow(day, capacity if max_capacity is None else min(capacity, max_capacity))
+
+            mapped = day._mapped
+            changed = np.array(moved + list(range(day.size, size)), dtype=np.int64)
+            mapped[changed, :size] = self.distances(metric, coords_all[changed], coords_all)
+            if metric == "haversine":
+                mapped[:size, changed] = mapped[changed, :size].T
+            else:
+                mapped[:size, changed] = self.distances(metric, coords_all, coords_all[changed])
+            mapped.flush()
+            self._write_meta(day.path, metric, day.capacity, day.client_ids + added, coords_all)
+            self._evict(keep=day.path)
+            return self._open_directory(day.path)
+
+    def _evict(self, keep: str) -> None:
+        """Remove stale days, then least recently used ones past ``max_bytes``; never ``keep``."""
+        days = []
+        for name in os.listdir(self.root):
+            directory = os.path.join(self.root, name)
+            try:
+                used_at = os.stat(os.path.join(directory, META_FILE)).st_mtime
+                size = os.stat(os.path.join(directory, MATRIX_FILE)).st_size
+            except OSError:
+                continue
+            days.append((used_at, size, directory))
+        days.sort()
+        total = sum(size for _, size, _ in days)
+        now = self._clock()
+        for used_at, size, directory in days:
+            if directory == keep:
+                continue
+            stale = self.max_age_seconds is not None and now - used_at > self.max_age_seconds
+            over = self.max_bytes is not None and total > self.max_bytes
+            if not stale and not over:
+                continue
+            # Processes still mapping the files keep reading them until they unmap.
+            shutil.rmtree(directory, ignore_errors=True)
+            total -= size
+            self.evicted += 1
+
+    def _write_meta(self, directory: str, metric: str, capacity: int, client_ids: List[str], coords: np.ndarray) -> None:
+        meta = {
+            "metric": metric,
+            "capacity": capacity,
+            "client_ids": list(client_ids),
+            "coords": np.asarray(coords, dtype=np.float64).tolist(),
+        }
+        path = os.path.join(directory, META_FILE)
+        # Readers only ever see a complete sidecar.
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(f"{path}.tmp", path)
+
+    def _create(self, delivery_date: date, metric: str, capacity: int) -> DayMatrix:
+        directory = self._directory(delivery_date, metric)
+        os.makedirs(directory, exist_ok=True)
+        np.memmap(os.path.join(directory, MATRIX_FILE), dtype=np.float32, mode="w+", shape=(capacity, capacity)).flush()
+        self._write_meta(directory, metric, capacity, [], np.empty((0, 2)))
+        return self._open_directory(directory)
+
+    def _grow(self, day: DayMatrix, capacity: int) -> DayMatrix:
+        path = os.path.join(day.path, MATRIX_FILE)
+        grown = np.memmap(f"{path}.tmp", dtype=np.float32, mode="w+", shape=(capacity, capacity))
+        for start in range(0, day.size, COPY_ROWS):
+            stop = min(day.size, start + COPY_ROWS)
+            grown[start:stop, :day.size] = day._mapped[start:stop, :day.size]
+        grown.flush()
+        del grown
+        # Requests still holding the old mapping keep reading the old file.
+        os.replace(f"{path}.tmp", path)
+        self._write_meta(day.path, day.metric, capacity, day.client_ids, day.coords)
+        return self._open_directory(day.path)
@@ -0,0 +1,227 @@
+"""Offline DC address gazetteer: the first geocoding tier before Google.
+
+Loads an address-point file such as DC's Master Address Repository (MAR)
+export into sorted arrays of 64-bit key hashes with their coordinates and ZIP
+codes, so lookups are a binary search with no per-address Python objects
+kept around. Keys are ``address_keys.address_key`` (street + quadrant, unit
+dropped) with spelled-out ordinals ("First St") written as numbers.
+
+A lookup tries, in order: the exact key, the key without a house-number
+suffix ("1234A" / "1234 1/2"), and the key without its street type ("1234
+Main NW" for "1234 Main St NW") when that is unambiguous in the file. The
+first counts as a hit and the others as near hits in ``stats()``.
+"""
+import csv
+import hashlib
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from address_keys import STREET_SUFFIXES, address_key
+
+Match = Tuple[float, float, str]
+
+ADDRESS_COLUMNS = ("FULLADDRESS", "ADDRESS", "FULL_ADDRESS")
+LATITUDE_COLUMNS = ("LATITUDE", "LAT")
+LONGITUDE_COLUMNS = ("LONGITUDE", "LON", "LNG")
+ZIP_COLUMNS = ("ZIPCODE", "ZIP", "ZIP_CODE")
+
+ORDINALS = {
+    "FIRST": "1ST", "SECOND": "2ND", "THIRD": "3RD", "FOURTH": "4TH", "FIFTH": "5TH",
+    "SIXTH": "6TH", "SEVENTH": "7TH", "EIGHTH": "8TH", "NINTH": "9TH", "TENTH": "10TH",
+    "ELEVENTH": "11TH", "TWELFTH": "12TH", "THIRTEENTH": "13TH", "FOURTEENTH": "14TH",
+    "FIFTEENTH": "15TH", "SIXTEENTH": "16TH", "SEVENTEENTH": "17TH", "EIGHTEENTH": "18TH",
+    "NINETEENTH": "19TH", "TWENTIETH": "20TH",
+}
+
+_ORDINAL = re.compile(r"\b(" + "|".join(ORDINALS) + r")\b")
+_DC_KEY = re.compile(r"^\d+\S*\s.+\s(?:NE|NW|SE|SW)$")
+_HOUSE_NUMBER_SUFFIX = re.compile(r"^(\d+)(?:[A-Z]\b|\s+1/2\b|-\w+\b)")
+_STREET_TYPE = re.compile(r"\s(?:" + "|".join(sorted(set(STREET_SUFFIXES.values()))) + r")(?= (?:NE|NW|SE|SW)$)")
+# Addresses whose locality names another state are never in the DC file.
+_OTHER_STATE = re.compile(r",.*\b(?:MD|VA|MARYLAND|VIRGINIA)\b", re.IGNORECASE)
+
+
+def gazetteer_key(address: str) -> str:
+    """Canonical DC key for ``address``, or "" when it cannot be a DC address point."""
+    if not address or _OTHER_STATE.search(address):
+        return ""
+    key = _ORDINAL.sub(lambda m: ORDINALS[m.group(1)], address_key(address))
+    return key if _DC_KEY.match(key) else ""
+
+
+def _without_house_number_suffix(key: str) -> str:
+    stripped = _HOUSE_NUMBER_SUFFIX.sub(r"\1", key, count=1)
+    return stripped if stripped != key else ""
+
+
+def _loose_key(key: str) -> str:
+    return _STREET_TYPE.sub("", key, count=1)
+
+
+def _untyped_key(key: str) -> str:
+    # Only keys that have no street type may match loosely; "Main Ave" must not find "Main St".
+    return "" if _STREET_TYPE.search(key) else key
+
+
+def key_hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _first_column(header: List[str], candidates: Tuple[str, ...]) -> str:
+    upper = {name.strip().upper(): name for name in header}
+    for candidate in candidates:
+        if candidate in upper:
+            return upper[candidate]
+    raise ValueError(f"Address-point file has none of the columns {', '.join(candidates)}.")
+
+
+class _HashTable:
+    """Sorted uint64 hashes with a row number per hash."""
+
+    def __init__(self, hashes: np.ndarray, rows: np.ndarray):
+        order = np.argsort(hashes, kind="stable")
+        self.hashes = hashes[order]
+        self.rows = rows[order]
+
+    def find(self, hashes: np.ndarray) -> np.ndarray:
+        """Row for each hash, -1 where absent."""
+        if not len(self.hashes):
+            return np.full(len(hashes), -1, dtype=np.int64)
+        position = np.searchsorted(self.hashes, hashes).clip(0, len(self.hashes) - 1)
+        found = self.hashes[position] == hashes
+        return np.where(found, self.rows[position], -1)
+
+
+class Gazetteer:
+    def __init__(self, keys: List[str], lat: np.ndarray, lng: np.ndarray, zip_codes: np.ndarray):
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lng = np.asarray(lng, dtype=np.float64)
+        self.zip_codes = np.asarray(zip_codes, dtype=np.int32)
+        hashes = np.fromiter((key_hash(key) for key in keys), dtype=np.uint64, count=len(keys))
+        # The first point wins when a file lists one address more than once.
+        hashes, rows = np.unique(hashes, return_index=True)
+        self._exact = _HashTable(hashes, rows)
+        loose = np.fromiter((key_hash(_loose_key(keys[row])) for row in rows), dtype=np.uint64, count=len(rows))
+        unique_loose, counts = np.unique(loose, return_counts=True)
+        keep = np.isin(loose, unique_loose[counts == 1])
+        self._loose = _HashTable(loose[keep], rows[keep])
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.near_hits = 0
+        self.lookup_seconds = 0.0
+
+    def __len__(self) -> int:
+        return len(self._exact.hashes)
+
+    @classmethod
+    def from_csv(cls, path: str) -> "Gazetteer":
+        """Load a MAR-style CSV with address, latitude, longitude and (optional) ZIP columns."""
+        keys, lat, lng, zip_codes = [], [], [], []
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            reader = csv.DictReader(f)
+            header = reader.fieldnames or []
+            address_column = _first_column(header, ADDRESS_COLUMNS)
+            lat_column = _first_column(header, LATITUDE_COLUMNS)
+            lng_column = _first_column(header, LONGITUDE_COLUMNS)
+            try:
+                zip_column = _first_column(header, ZIP_COLUMNS)
+            except ValueError:
+                zip_column = None
+            for row in reader:
+                key = gazetteer_key(row.get(address_column) or "")
+                try:
+                    point = float(row[lat_column]), float(row[lng_column])
+                except (TypeError, ValueError):
+                    continue
+                if not key:
+                    continue
+                zip_text = (row.get(zip_column) or "").strip()[:5] if zip_column else ""
+                keys.append(key)
+                lat.append(point[0])
+                lng.append(point[1])
+                zip_codes.append(int(zip_text) if zip_text.isdigit() else 0)
+        return cls(keys, np.array(lat), np.array(lng), np.array(zip_codes))
+
+    @classmethod
+    def load(cls, path: str) -> "Gazetteer":
+        if path.endswith(".npz"):
+            with np.load(path) as data:
+                gazetteer = cls.__new__(cls)
+                gazetteer._restore(data)
+                return gazetteer
+        return cls.from_csv(path)
+
+    def save(self, path: str) -> None:
+        """Write the built index as .npz so later loads skip parsing and hashing the CSV."""
+        np.savez(
+            path,
+            lat=self.lat,
+            lng=self.lng,
+            zip_codes=self.zip_codes,
+            exact_hashes=self._exact.hashes,
+            exact_rows=self._exact.rows,
+            loose_hashes=self._loose.hashes,
+            loose_rows=self._loose.rows,
+        )
+
+    def _restore(self, data) -> None:
+        self.lat, self.lng, self.zip_codes = data["lat"], data["lng"], data["zip_codes"]
+        self._exact = _HashTable(data["exact_hashes"], data["exact_rows"])
+        self._loose = _HashTable(data["loose_hashes"], data["loose_rows"])
+        self._lock = threading.Lock()
+        self.lookups = self.hits = self.near_hits = 0
+        self.lookup_seconds = 0.0
+
+    def lookup_many(self, addresses: Iterable[str]) -> Dict[str, Match]:
+        """(lat, lng, zip) for each address the file contains, keyed by the address as given."""
+        started = time.perf_counter()
+        addresses = list(dict.fromkeys(addresses))
+        keys = [gazetteer_key(address) for address in addresses]
+        rows = np.full(len(addresses), -1, dtype=np.int64)
+        exact = 0
+        for tier, (table, transform) in enumerate((
+            (self._exact, lambda key: key),
+            (self._exact, _without_house_number_suffix),
+            (self._loose, _untyped_key),
+        )):
+            # Each tier's transform returns "" when it does not apply to a key.
+            pending = [(i, transform(key)) for i, key in enumerate(keys) if key and rows[i] < 0]
+            pending = [(i, key) for i, key in pending if key]
+            if pending:
+                hashes = np.fromiter((key_hash(key) for _, key in pending), dtype=np.uint64, count=len(pending))
+                rows[[i for i, _ in pending]] = table.find(hashes)
+            if tier == 0:
+                exact = int((rows >= 0).sum())
+
+        found: Dict[str, Match] = {}
+        for address, row in zip(addresses, rows):
+            if row >= 0:
+                zip_code = int(self.zip_codes[row])
+                found[address] = (float(self.lat[row]), float(self.lng[row]), f"{zip_code:05d}" if zip_code else "")
+        with self._lock:
+            self.lookups += len(addresses)
+            self.hits += exact
+            self.near_hits += len(found) - exact
+            self.lookup_seconds += time.perf_counter() - started
+        return found
+
+    def lookup(self, address: str) -> Optional[Match]:
+        return self.lookup_many([address]).get(address)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            misses = self.lookups - self.hits - self.near_hits
+            return {
+                "addresses": len(self),
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "misses": misses,
+                "hit_rate": round((self.hits + self.near_hits) / self.lookups, 3) if self.lookups else 0.0,
+                "mean_lookup_us": round(self.lookup_seconds * 1e6 / self.lookups, 1) if self.lookups else 0.0,
+            }
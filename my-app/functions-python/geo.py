@@ -0,0 +1,86 @@
+"""Vectorized coordinate helpers for clustering and the ETL.
+
+Only NumPy is imported here so the ETL scripts can reuse these helpers without
+pulling in the Firebase or scikit-learn stacks.
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+PROJECTIONS = ("cartesian", "planar")
+
+
+def latlon_array(coords) -> np.ndarray:
+    """Return (lat, lon) pairs as a C-contiguous (n, 2) float64 array.
+
+    NumPy input that is already float64 and contiguous is returned without a copy.
+    """
+    array = np.asarray(coords, dtype=np.float64)
+    if array.size == 0:
+        return np.empty((0, 2), dtype=np.float64)
+    if array.ndim != 2 or array.shape[1] != 2:
+        raise ValueError("Coordinates must be a list of (latitude, longitude) pairs.")
+    return np.ascontiguousarray(array)
+
+
+def valid_coordinate_mask(latlon: np.ndarray) -> np.ndarray:
+    """Flag finite, in-range coordinates that are not the (0, 0) geocoding placeholder."""
+    lat = latlon[:, 0]
+    lon = latlon[:, 1]
+    return (
+        np.isfinite(lat)
+        & np.isfinite(lon)
+        & (np.abs(lat) <= 90.0)
+        & (np.abs(lon) <= 180.0)
+        & ~((lat == 0.0) & (lon == 0.0))
+    )
+
+
+def to_cartesian(latlon: np.ndarray, radius: float = EARTH_RADIUS_KM) -> np.ndarray:
+    """Project (lat, lon) degrees onto a sphere, returning (n, 3) x/y/z in km."""
+    lat = np.radians(latlon[:, 0])
+    lon = np.radians(latlon[:, 1])
+    cos_lat = np.cos(lat)
+
+    points = np.empty((latlon.shape[0], 3), dtype=np.float64)
+    np.multiply(cos_lat, np.cos(lon), out=points[:, 0])
+    np.multiply(cos_lat, np.sin(lon), out=points[:, 1])
+    np.sin(lat, out=points[:, 2])
+    points *= radius
+    return points
+
+
+def to_local_planar(
+    latlon: np.ndarray,
+    origin: Optional[Tuple[float, float]] = None,
+    radius: float = EARTH_RADIUS_KM,
+) -> np.ndarray:
+    """Equirectangular projection to (n, 2) east/north km around ``origin``.
+
+    Distortion stays well under 0.1% across a metro area the size of DC, and it
+    skips the extra trig of the 3D projection. ``origin`` defaults to the mean
+    of the input points.
+    """
+    if origin is None:
+        origin_lat, origin_lon = latlon.mean(axis=0) if len(latlon) else (0.0, 0.0)
+    else:
+        origin_lat, origin_lon = origin
+
+    scale = np.radians(1.0) * radius
+    points = np.empty((latlon.shape[0], 2), dtype=np.float64)
+    np.subtract(latlon[:, 1], origin_lon, out=points[:, 0])
+    points[:, 0] *= scale * np.cos(np.radians(origin_lat))
+    np.subtract(latlon[:, 0], origin_lat, out=points[:, 1])
+    points[:, 1] *= scale
+    return points
+
+
+def project(latlon: np.ndarray, projection: str = "cartesian") -> np.ndarray:
+    """Project (lat, lon) pairs with one of the names in ``PROJECTIONS``."""
+    if projection == "cartesian":
+        return to_cartesian(latlon)
+    if projection == "planar":
+        return to_local_planar(latlon)
+    raise ValueError(f"Unknown projection: {projection}")
+
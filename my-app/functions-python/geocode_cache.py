@@ -0,0 +1,194 @@
+"""Persistent geocode cache shared by the geocoding endpoint and the ETL.
+
+Entries are keyed by the normalized address and record where the answer came
+from (``source``), when it was cached, and when it expires. Addresses Google
+could not geocode are cached too, with a much shorter TTL, so a bad address is
+not retried on every run. Failed lookups (errors, timeouts, quota or key
+problems) say nothing about the address and are never cached.
+
+Two stores implement ``get_many``/``put_many``: ``SQLiteGeocodeStore`` for a
+local file (the ETL default) and ``FirestoreGeocodeStore`` for a collection
+every function instance can read. Only the standard library is imported here
+so the ETL can load this module directly.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from geocoding import STATUS_FAILED, STATUS_NOT_FOUND, STATUS_OK, normalize_address
+
+DEFAULT_TTL_SECONDS = 180 * 24 * 3600
+DEFAULT_NEGATIVE_TTL_SECONDS = 24 * 3600
+CACHEABLE_STATUSES = (STATUS_OK, STATUS_NOT_FOUND)
+
+Entry = Dict[str, Any]
+
+
+def cache_key(address: str) -> str:
+    return normalize_address(address)
+
+
+class SQLiteGeocodeStore:
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS geocode_cache (
+                    key TEXT PRIMARY KEY,
+                    address TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    lat REAL,
+                    lng REAL,
+                    zip_code TEXT,
+                    source TEXT NOT NULL,
+                    cached_at REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+                """
+            )
+
+    _COLUMNS = ("key", "address", "status", "lat", "lng", "zip_code", "source", "cached_at", "expires_at")
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Entry]:
+        keys = list(keys)
+        found: Dict[str, Entry] = {}
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit.
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = self._connection.execute(
+                    f"SELECT {', '.join(self._COLUMNS)} FROM geocode_cache WHERE key IN ({', '.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for row in rows:
+                    entry = dict(zip(self._COLUMNS, row))
+                    found[entry["key"]] = entry
+        return found
+
+    def put_many(self, entries: List[Entry]) -> None:
+        with self._lock, self._connection:
+            self._connection.executemany(
+                f"INSERT OR REPLACE INTO geocode_cache ({', '.join(self._COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(self._COLUMNS))})",
+                [tuple(entry.get(column) for column in self._COLUMNS) for entry in entries],
+            )
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+class FirestoreGeocodeStore:
+    """One document per address; ids are hashes because keys may contain ``/``."""
+
+    def __init__(self, collection_name: str, client_factory: Callable[[], Any]):
+        self.collection_name = collection_name
+        self._client_factory = client_factory
+
+    @staticmethod
+    def document_id(key: str) -> str:
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Entry]:
+        client = self._client_factory()
+        collection = client.collection(self.collection_name)
+        references = [collection.document(self.document_id(key)) for key in keys]
+        found: Dict[str, Entry] = {}
+        for start in range(0, len(references), 300):
+            for snapshot in client.get_all(references[start:start + 300]):
+                if snapshot.exists:
+                    entry = snapshot.to_dict()
+                    found[entry["key"]] = entry
+        return found
+
+    def put_many(self, entries: List[Entry]) -> None:
+        client = self._client_factory()
+        collection = client.collection(self.collection_name)
+        # Firestore batches are limited to 500 writes.
+        for start in range(0, len(entries), 500):
+            batch = client.batch()
+            for entry in entries[start:start + 500]:
+                batch.set(collection.document(self.document_id(entry["key"])), entry)
+            batch.commit()
+
+
+class GeocodeCache:
+    def __init__(
+        self,
+        store,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        negative_ttl_seconds: float = DEFAULT_NEGATIVE_TTL_SECONDS,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._clock = clock
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get_many(self, addresses: Iterable[str]) -> Dict[str, Entry]:
+        """Unexpired entries for ``addresses``, keyed by the address as given."""
+        keys = {address: cache_key(address) for address in addresses}
+        stored = self.store.get_many(set(keys.values()))
+        now = self._clock()
+        found = {
+            address: stored[key]
+            for address, key in keys.items()
+            # Failed entries written before they were excluded still read as misses.
+            if key in stored and stored[key]["expires_at"] > now and stored[key]["status"] in CACHEABLE_STATUSES
+        }
+        with self._lock:
+            self.negative_hits += sum(1 for entry in found.values() if entry["status"] != STATUS_OK)
+            self.hits += sum(1 for entry in found.values() if entry["status"] == STATUS_OK)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def get(self, address: str) -> Optional[Entry]:
+        return self.get_many([address]).get(address)
+
+    def entry(
+        self,
+        address: str,
+        status: str,
+        source: str,
+        lat: Optional[float] = None,
+        lng: Optional[float] = None,
+        zip_code: Optional[str] = None,
+    ) -> Entry:
+        now = self._clock()
+        ttl = self.ttl_seconds if status == STATUS_OK else self.negative_ttl_seconds
+        return {
+            "key": cache_key(address),
+            "address": address,
+            "status": status,
+            "lat": lat,
+            "lng": lng,
+            "zip_code": zip_code,
+            "source": source,
+            "cached_at": now,
+            "expires_at": now + ttl,
+        }
+
+    def put_many(self, entries: List[Entry]) -> None:
+        """Store ``entries``, skipping failed lookups."""
+        entries = [entry for entry in entries if entry["status"] in CACHEABLE_STATUSES]
+        if entries:
+            self.store.put_many(entries)
+
+    def put(self, entry: Entry) -> None:
+        self.put_many([entry])
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "negative_hits": self.negative_hits, "misses": self.misses}
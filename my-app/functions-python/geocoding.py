@@ -0,0 +1,174 @@
+"""Batch geocoding: collapse equivalent addresses, then geocode the rest concurrently.
+
+Addresses found in the optional offline ``gazetteer.Gazetteer`` are answered
+locally, then those already in the optional ``geocode_cache.GeocodeCache``.
+Provider calls go through a bounded thread pool and a shared token-bucket rate
+limiter, and results are fanned back out to the caller's original order.
+"""
+import logging
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from address_keys import geocode_key
+
+Coordinate = Tuple[float, float]
+NOT_FOUND: Coordinate = (0.0, 0.0)
+STATUS_OK = "ok"
+STATUS_NOT_FOUND = "not_found"
+STATUS_FAILED = "failed"
+
+
+def normalize_address(address: str) -> str:
+    """Key under which spelling and unit-only variants of one address collapse together."""
+    return geocode_key(unicodedata.normalize("NFKC", address))
+
+
+class RateLimiter:
+    """Token bucket shared by every worker thread."""
+
+    def __init__(self, rate_per_second: float, burst: Optional[float] = None, clock=time.monotonic, sleep=time.sleep):
+        self._rate = rate_per_second
+        self._capacity = burst if burst is not None else max(1.0, rate_per_second)
+        self._tokens = self._capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self._rate
+            self._sleep(wait)
+
+
+@dataclass
+class BatchStats:
+    addresses: int = 0
+    unique: int = 0
+    gazetteer: int = 0
+    cached: int = 0
+    failed: int = 0
+    max_concurrency: int = 0
+    latencies_ms: List[float] = field(default_factory=list)
+
+    def summary(self) -> Dict[str, float]:
+        latencies = sorted(self.latencies_ms)
+
+        def percentile(p: float) -> float:
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 1) if latencies else 0.0
+
+        return {
+            "addresses": self.addresses,
+            "unique": self.unique,
+            "gazetteer": self.gazetteer,
+            "cached": self.cached,
+            "failed": self.failed,
+            "max_concurrency": self.max_concurrency,
+            "latency_p50_ms": percentile(0.5),
+            "latency_p95_ms": percentile(0.95),
+            "latency_max_ms": percentile(1.0),
+        }
+
+
+def geocode_batch(
+    addresses: List[str],
+    geocode_one: Callable[[str], Optional[Coordinate]],
+    max_workers: int,
+    limiter: Optional[RateLimiter] = None,
+    cache=None,
+    source: str = "google-geocoding",
+    gazetteer=None,
+) -> Tuple[List[Coordinate], BatchStats]:
+    """Geocode ``addresses`` in order, calling ``geocode_one`` once per distinct uncached address.
+
+    ``geocode_one`` returns None for an address the provider does not know;
+    both that and an exception map to ``NOT_FOUND`` as before. With ``cache``,
+    new answers (including misses) are written back tagged with ``source``;
+    gazetteer answers are not cached since they are already local.
+    """
+    stats = BatchStats(addresses=len(addresses))
+    first_spelling: Dict[str, str] = {}
+    keys = []
+    for address in addresses:
+        key = normalize_address(address)
+        first_spelling.setdefault(key, address)
+        keys.append(key)
+    stats.unique = len(first_spelling)
+
+    resolved: Dict[str, Coordinate] = {}
+    if gazetteer is not None:
+        local = gazetteer.lookup_many(first_spelling.values())
+        for key, address in first_spelling.items():
+            if address in local:
+                resolved[key] = local[address][:2]
+        stats.gazetteer = len(resolved)
+    if cache is not None and len(resolved) < len(first_spelling):
+        unresolved = [address for key, address in first_spelling.items() if key not in resolved]
+        try:
+            cached = cache.get_many(unresolved)
+        except Exception as e:
+            logging.warning("Geocode cache read failed: %s", e)
+            cached = {}
+        for key, address in first_spelling.items():
+            entry = cached.get(address)
+            if entry is not None:
+                resolved[key] = (entry["lat"], entry["lng"]) if entry["status"] == STATUS_OK else NOT_FOUND
+        stats.cached = len(resolved) - stats.gazetteer
+    pending = {key: address for key, address in first_spelling.items() if key not in resolved}
+
+    active = 0
+    lock = threading.Lock()
+
+    def lookup(address: str) -> Tuple[Optional[Coordinate], str]:
+        nonlocal active
+        if limiter is not None:
+            limiter.acquire()
+        with lock:
+            active += 1
+            stats.max_concurrency = max(stats.max_concurrency, active)
+        started = time.perf_counter()
+        try:
+            coordinate = geocode_one(address)
+            if coordinate is None:
+                logging.warning("Address not found: %s", address)
+                return None, STATUS_NOT_FOUND
+            return coordinate, STATUS_OK
+        except Exception as e:
+            logging.error("Geocoding failed for %s: %s", address, e, exc_info=True)
+            with lock:
+                stats.failed += 1
+            return None, STATUS_FAILED
+        finally:
+            with lock:
+                active -= 1
+                stats.latencies_ms.append((time.perf_counter() - started) * 1000)
+
+    if pending:
+        workers = max(1, min(max_workers, len(pending)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="geocode") as pool:
+            outcomes = dict(zip(pending, pool.map(lookup, pending.values())))
+        for key, (coordinate, _) in outcomes.items():
+            resolved[key] = coordinate if coordinate is not None else NOT_FOUND
+        if cache is not None:
+            # Failures are transient or instance-wide (quota, key); only answers about the address are cached.
+            entries = [
+                cache.entry(pending[key], status, source, *(coordinate or (None, None)))
+                for key, (coordinate, status) in outcomes.items()
+                if status != STATUS_FAILED
+            ]
+            try:
+                cache.put_many(entries)
+            except Exception as e:
+                logging.warning("Geocode cache write failed: %s", e)
+    return [resolved[key] for key in keys], stats
@@ -0,0 +1,140 @@
+"""Divide-and-conquer clustering for delivery days too large for one solve.
+
+Points are split by recursive bisection along their principal axis. Every split
+divides the drivers between the halves and picks the split point so that both
+halves can still meet ``size_min``/``size_max``. Each leaf region is then a
+small KMeansConstrained problem, and the leaves are solved in worker processes.
+With a deadline, the worker pool is terminated when it passes.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+import constrained_kmeans
+import worker_pool
+
+DEFAULT_REGION_POINTS = 600
+# Leaves are small and numerous, so fewer random starts per leaf keeps the total
+# work close to a single standard solve.
+REGION_N_INIT = 3
+
+
+@dataclass
+class Region:
+    indices: np.ndarray
+    n_clusters: int
+
+
+@dataclass
+class HierarchicalResult:
+    labels: np.ndarray
+    inertia: float
+    n_iter: int
+    regions: int
+
+
+def _principal_order(points: np.ndarray) -> np.ndarray:
+    centered = points - points.mean(axis=0)
+    # The leading right-singular vector is the direction of largest spread.
+    _, _, vt = np.linalg.svd(centered, full_matrices=False)
+    return np.argsort(centered @ vt[0], kind="stable")
+
+
+def partition_regions(
+    points: np.ndarray,
+    n_clusters: int,
+    size_min: int,
+    size_max: int,
+    max_region_points: int = DEFAULT_REGION_POINTS,
+) -> List[Region]:
+    """Split points into regions, each with a driver share it can satisfy."""
+    if size_min * n_clusters > len(points) or size_max * n_clusters < len(points):
+        raise ValueError("Deliveries cannot be split into clusters within the size limits.")
+
+    regions = []
+    stack = [Region(np.arange(len(points)), n_clusters)]
+    while stack:
+        region = stack.pop()
+        n = len(region.indices)
+        if n <= max_region_points or region.n_clusters == 1:
+            regions.append(region)
+            continue
+
+        k_left = region.n_clusters // 2
+        k_right = region.n_clusters - k_left
+        lowest = max(k_left * size_min, n - k_right * size_max)
+        highest = min(k_left * size_max, n - k_right * size_min)
+        split = min(max(round(n * k_left / region.n_clusters), lowest), highest)
+
+        order = region.indices[_principal_order(points[region.indices])]
+        stack.append(Region(order[split:], k_right))
+        stack.append(Region(order[:split], k_left))
+    return regions
+
+
+def _solve_region(args) -> Tuple[np.ndarray, float, int]:
+    points, n_clusters, size_min, size_max, random_state = args
+    if n_clusters == 1:
+        labels = np.zeros(len(points), dtype=np.int32)
+        return labels, float(((points - points.mean(axis=0)) ** 2).sum()), 0
+    result = constrained_kmeans.solve(
+        points, n_clusters, size_min, size_max, random_state=random_state, n_init=REGION_N_INIT
+    )
+    return result.labels, result.inertia, result.n_iter
+
+
+def _solve_regions_by_deadline(tasks, workers: int, deadline_seconds: float) -> list:
+    pool = worker_pool.mp_context().Pool(processes=workers)
+    try:
+        return pool.map_async(_solve_region, tasks).get(timeout=deadline_seconds)
+    except multiprocessing.TimeoutError:
+        raise TimeoutError(f"Regions still running after {deadline_seconds:g} seconds.") from None
+    finally:
+        # terminate() also stops regions that are still running past the deadline.
+        pool.terminate()
+        pool.join()
+
+
+def solve(
+    points: np.ndarray,
+    n_clusters: int,
+    size_min: int,
+    size_max: int,
+    max_region_points: int = DEFAULT_REGION_POINTS,
+    max_workers: Optional[int] = None,
+    random_state: int = constrained_kmeans.DEFAULT_RANDOM_STATE,
+    deadline_seconds: Optional[float] = None,
+) -> HierarchicalResult:
+    """Cluster ``points`` region by region and merge the labels.
+
+    Raises ``TimeoutError`` when the regions are not all solved within ``deadline_seconds``.
+    """
+    regions = partition_regions(points, n_clusters, size_min, size_max, max_region_points)
+    tasks = [
+        (points[region.indices], region.n_clusters, size_min, size_max, random_state)
+        for region in regions
+    ]
+
+    workers = min(max_workers or worker_pool.worker_count(), len(tasks))
+    if deadline_seconds is not None:
+        # Even one region runs in a worker, so the deadline can stop it.
+        solved = _solve_regions_by_deadline(tasks, workers, deadline_seconds)
+    elif workers <= 1:
+        solved = [_solve_region(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=worker_pool.mp_context()) as executor:
+            solved = list(executor.map(_solve_region, tasks))
+
+    labels = np.empty(len(points), dtype=np.int32)
+    offset = 0
+    inertia = 0.0
+    n_iter = 0
+    for region, (region_labels, region_inertia, region_iter) in zip(regions, solved):
+        labels[region.indices] = region_labels + offset
+        offset += region.n_clusters
+        inertia += region_inertia
+        n_iter += region_iter
+    return HierarchicalResult(labels=labels, inertia=inertia, n_iter=n_iter, regions=len(regions))
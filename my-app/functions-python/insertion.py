@@ -0,0 +1,123 @@
+"""Place late-added deliveries into an existing clustering without re-solving it.
+
+Each new point goes to the nearest cluster centroid (KD-tree over centroids)
+that still has room under ``size_max``. Only when none of its
+``CANDIDATE_CLUSTERS`` nearest clusters has room does a bounded repair run: the
+point joins one of those full clusters and that cluster hands its cheapest
+member to a nearby cluster with room, so one existing delivery moves instead of
+the whole day being re-clustered. Points that not even a repair can place are
+reported as unplaced rather than dropped. Centroids are not moved, so results do not
+depend on the order of earlier insertions beyond capacity.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+CANDIDATE_CLUSTERS = 8
+
+
+class InsertionInfeasible(ValueError):
+    """No cluster near the point can make room for it."""
+
+    def __init__(self, message: str, unplaced: Optional[Sequence[int]] = None):
+        super().__init__(message)
+        # Indices of the points that could not be placed, when known.
+        self.unplaced = list(unplaced or [])
+
+
+@dataclass
+class InsertionResult:
+    labels: np.ndarray
+    # Existing point index -> new label, for points moved by a repair.
+    moved: Dict[int, int] = field(default_factory=dict)
+    repairs: int = 0
+    # New point indices no nearby cluster could make room for; their label stays -1.
+    unplaced: List[int] = field(default_factory=list)
+
+
+class _Inserter:
+    def __init__(self, points: np.ndarray, labels: np.ndarray, n_clusters: int, size_max: int):
+        self.points = points
+        self.labels = np.asarray(labels, dtype=np.int64).copy()
+        self.size_max = size_max
+        assigned = self.labels >= 0
+        self.sizes = np.bincount(self.labels[assigned], minlength=n_clusters)
+        sums = np.zeros((n_clusters, points.shape[1]))
+        np.add.at(sums, self.labels[assigned], points[assigned])
+        self.live = np.flatnonzero(self.sizes > 0)
+        if not len(self.live):
+            raise InsertionInfeasible("The existing clustering has no assigned points.")
+        self.centers = np.zeros_like(sums)
+        self.centers[self.live] = sums[self.live] / self.sizes[self.live, None]
+        self.tree = cKDTree(self.centers[self.live])
+        self.k = min(CANDIDATE_CLUSTERS, len(self.live))
+        self.moved: Dict[int, int] = {}
+
+    def nearest(self, query: np.ndarray):
+        """Distances to, and labels of, the ``k`` nearest centroids of each query point."""
+        distances, slots = self.tree.query(query, k=self.k)
+        return np.atleast_2d(distances), self.live[np.atleast_2d(slots)]
+
+    def repair(self, clusters: np.ndarray, distances: np.ndarray) -> int:
+        """Put the point into one of its full ``clusters`` and move that cluster's cheapest member out.
+
+        Cost is the point's distance to the cluster plus the moved member's extra
+        distance to its new cluster; every member of the candidate clusters is
+        considered against its own nearest clusters with room.
+        """
+        members = np.flatnonzero(np.isin(self.labels, clusters))
+        member_distances, member_targets = self.nearest(self.points[members])
+        own = np.linalg.norm(self.points[members] - self.centers[self.labels[members]], axis=1)
+        has_room = self.sizes[member_targets] < self.size_max
+        if not has_room.any():
+            raise InsertionInfeasible("No nearby cluster has spare capacity; re-cluster the day instead.")
+        extra = np.where(has_room, member_distances - own[:, None], np.inf)
+        best_target = extra.argmin(axis=1)
+        insertion_cost = np.zeros(len(self.centers))
+        insertion_cost[clusters] = distances
+        total = extra[np.arange(len(members)), best_target] + insertion_cost[self.labels[members]]
+        choice = int(np.argmin(total))
+        member = int(members[choice])
+        source = int(self.labels[member])
+        target = int(member_targets[choice, best_target[choice]])
+        self.labels[member] = target
+        self.sizes[source] -= 1
+        self.sizes[target] += 1
+        self.moved[member] = target
+        return source
+
+
+def insert_points(
+    points: np.ndarray,
+    labels: np.ndarray,
+    new_points: np.ndarray,
+    n_clusters: int,
+    size_max: int,
+) -> InsertionResult:
+    """Labels for ``new_points`` given planar ``points`` already labelled ``labels`` (-1 = unassigned).
+
+    Clusters without members have no centroid and receive no new points. A
+    point whose nearby clusters cannot make room keeps label -1 and is listed
+    in ``unplaced``; the others are still placed.
+    """
+    inserter = _Inserter(points, labels, n_clusters, size_max)
+    result = InsertionResult(labels=np.full(len(new_points), -1, dtype=np.int64))
+    candidate_distances, candidate_clusters = inserter.nearest(new_points)
+    for i in range(len(new_points)):
+        clusters = candidate_clusters[i]
+        open_slots = np.flatnonzero(inserter.sizes[clusters] < size_max)
+        if len(open_slots):
+            label = int(clusters[open_slots[0]])
+        else:
+            try:
+                label = inserter.repair(clusters, candidate_distances[i])
+            except InsertionInfeasible:
+                result.unplaced.append(i)
+                continue
+            result.repairs += 1
+        result.labels[i] = label
+        inserter.sizes[label] += 1
+    result.moved = inserter.moved
+    return result
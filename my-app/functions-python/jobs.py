@@ -0,0 +1,173 @@
+"""Job documents for clustering requests that run longer than one HTTP call.
+
+A job is a document with a ``status`` (queued, running, succeeded, failed), a
+``progress`` stage, timestamps, and either ``result`` or ``error``. The request
+payload is stored gzip-compressed because large coordinate lists would exceed
+Firestore's document size limit and nested arrays are not allowed there.
+
+``FirestoreJobStore`` is used in production; ``InMemoryJobStore`` has the same
+interface for the emulator and tests.
+"""
+import gzip
+import json
+import logging
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+
+def new_job_id() -> str:
+    return uuid.uuid4().hex
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def encode_request(payload: str) -> bytes:
+    return gzip.compress(payload.encode("utf-8"))
+
+
+def decode_request(blob: bytes) -> Dict[str, Any]:
+    return json.loads(gzip.decompress(blob).decode("utf-8"))
+
+
+def new_job(request_json: str) -> Dict[str, Any]:
+    now = _now()
+    return {
+        "status": JOB_QUEUED,
+        "progress": "queued",
+        "request": encode_request(request_json),
+        "result": None,
+        "error": None,
+        "createdAt": now,
+        "updatedAt": now,
+    }
+
+
+class InMemoryJobStore:
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def create(self, job_id: str, job: Dict[str, Any]) -> None:
+        with self._lock:
+            self._jobs[job_id] = dict(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def update(self, job_id: str, fields: Dict[str, Any]) -> None:
+        with self._lock:
+            self._jobs[job_id].update(fields, updatedAt=_now())
+
+    def claim(self, job_id: str) -> bool:
+        """Move a queued job to running; False if another worker already has it."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] != JOB_QUEUED:
+                return False
+            job.update(status=JOB_RUNNING, progress="starting", startedAt=_now(), updatedAt=_now())
+            return True
+
+
+class FirestoreJobStore:
+    def __init__(self, collection_name: str, client_factory: Callable[[], Any]):
+        self.collection_name = collection_name
+        self._client_factory = client_factory
+
+    def _document(self, job_id: str):
+        return self._client_factory().collection(self.collection_name).document(job_id)
+
+    def create(self, job_id: str, job: Dict[str, Any]) -> None:
+        self._document(job_id).create(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        snapshot = self._document(job_id).get()
+        return snapshot.to_dict() if snapshot.exists else None
+
+    def update(self, job_id: str, fields: Dict[str, Any]) -> None:
+        self._document(job_id).update({**fields, "updatedAt": _now()})
+
+    def claim(self, job_id: str) -> bool:
+        # Firestore triggers are delivered at least once, so claim in a transaction.
+        from google.cloud import firestore as gcp_firestore
+
+        client = self._client_factory()
+        document = client.collection(self.collection_name).document(job_id)
+
+        @gcp_firestore.transactional
+        def claim_in_transaction(transaction) -> bool:
+            snapshot = document.get(transaction=transaction)
+            if not snapshot.exists or snapshot.get("status") != JOB_QUEUED:
+                return False
+            transaction.update(document, {
+                "status": JOB_RUNNING,
+                "progress": "starting",
+                "startedAt": _now(),
+                "updatedAt": _now(),
+            })
+            return True
+
+        return claim_in_transaction(client.transaction())
+
+
+def run_job(
+    store,
+    job_id: str,
+    solve: Callable[[Dict[str, Any], Callable[[str], None]], Dict[str, Any]],
+) -> None:
+    """Claim ``job_id`` and run ``solve(request, report_progress)`` into the job document.
+
+    ``solve`` returns the response dict; any exception marks the job failed
+    with its message.
+    """
+    if not store.claim(job_id):
+        return
+    job = store.get(job_id)
+
+    def report_progress(stage: str) -> None:
+        store.update(job_id, {"progress": stage})
+
+    try:
+        result = solve(decode_request(job["request"]), report_progress)
+    except Exception as e:
+        logging.error("Clustering job %s failed: %s", job_id, e, exc_info=True)
+        store.update(job_id, {
+            "status": JOB_FAILED,
+            "progress": "failed",
+            "error": str(e) or e.__class__.__name__,
+            "finishedAt": _now(),
+        })
+        return
+    store.update(job_id, {
+        "status": JOB_SUCCEEDED,
+        "progress": "done",
+        "result": result,
+        "finishedAt": _now(),
+    })
+
+
+def job_status(job_id: str, job: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON-safe view of a job document for the poll endpoint."""
+    status = {
+        "job_id": job_id,
+        "status": job["status"],
+        "progress": job.get("progress"),
+    }
+    for field in ("createdAt", "startedAt", "finishedAt"):
+        if job.get(field) is not None:
+            status[field] = job[field].isoformat()
+    if job["status"] == JOB_SUCCEEDED:
+        status["result"] = job["result"]
+    if job["status"] == JOB_FAILED:
+        status["error"] = job["error"]
+    return status
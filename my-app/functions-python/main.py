@@ -5,15 +5,24 @@ import firebase_admin
 from firebase_functions import https_fn, options, scheduler_fn
 from firebase_admin import auth, firestore
 from typing import Optional
+
+import delivery_queries
 from clustering import (
     cluster_deliveries_k_means,
+    cluster_deliveries_k_means_job,
+    run_cluster_job,
     geocode_addresses_endpoint,
+    insert_deliveries,
+    cluster_deliveries_batch,
+    cluster_deliveries_for_date,
+    precluster_upcoming_dates,
+    refresh_zone_history,
 )
 
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 
-CLIENTS_COLLECTION = "client-profile2"
+CLIENTS_COLLECTION = delivery_queries.CLIENTS_COLLECTION
 logger = logging.getLogger(__name__)
 
 # Initialize Firebase Admin SDK only once
@@ -295,38 +304,12 @@ def deleteUserAccount(req: https_fn.CallableRequest):
 
 def query_today_client_ids(tz_name: str = "America/New_York"):
     """Return clientIds for events whose deliveryDate is ‘today’ in the given timezone."""
-    tz = ZoneInfo(tz_name)
-    now_ny = datetime.now(tz)
-    db = firestore.client()
-
-    start_of_day_ny = datetime(
-        year=now_ny.year, month=now_ny.month, day=now_ny.day,
-        hour=0, minute=0, second=0, tzinfo=tz
-    )
-    start_of_next_day_ny = start_of_day_ny + timedelta(days=1)
-
-    # Convert to UTC datetimes for Firestore timestamp comparisons
-    start_utc = start_of_day_ny.astimezone(ZoneInfo("UTC"))
-    end_utc = start_of_next_day_ny.astimezone(ZoneInfo("UTC"))
-
-    q = (
-        db.collection("events")
-          .where(filter=firestore.FieldFilter("deliveryDate", ">=", start_utc))
-          .where(filter=firestore.FieldFilter("deliveryDate", "<", end_utc))
-    )
-
-    client_ids = []
-    event_count = 0
-    for doc in q.stream():
-        event_count += 1
-        data = doc.to_dict() or {}
-        cid = data.get("clientId")
-        if cid:
-            client_ids.append(cid)
+    today = datetime.now(ZoneInfo(tz_name)).date()
+    client_ids, event_count = delivery_queries.event_client_ids(firestore.client(), today, tz_name)
 
     return {
         "success": True,
-        "delivery_date": str(start_of_day_ny.date()),
+        "delivery_date": str(today),
         "event_count": event_count,
         "client_ids": client_ids,
         "unique_client_count": len(set(client_ids))
@@ -409,3 +392,31 @@ def updateDeliveriesDaily(event: scheduler_fn.ScheduledEvent) -> None:
         print(f"updateDeliveriesDaily error: {e}")
         # Let it raise to mark the execution as failed (so retries/alerts can happen if configured)
         raise
+
+
+@scheduler_fn.on_schedule(
+    # Runs at 22:00 every day in America/New_York, once the next days' events are known.
+    schedule="every day 22:00",
+    timezone=scheduler_fn.Timezone("America/New_York"),
+    region="us-central1",
+    memory=1024,
+    timeout_sec=540,
+)
+def preclusterDeliveriesNightly(event: scheduler_fn.ScheduledEvent) -> None:
+    """
+    Cron job: precompute candidate clusters for the upcoming delivery dates, so
+    cluster_deliveries_for_date can return them at once while the events are unchanged,
+    and store the recent deliveries that zones mode learns from.
+    """
+    try:
+        print(f"preclusterDeliveriesNightly zone history: {refresh_zone_history(firestore.client())} days")
+    except Exception as e:
+        # Zones mode keeps the previous history; the candidate clusters do not need it.
+        print(f"preclusterDeliveriesNightly zone history error: {e}")
+    try:
+        tomorrow = datetime.now(ZoneInfo("America/New_York")).date() + timedelta(days=1)
+        outcomes = precluster_upcoming_dates(firestore.client(), tomorrow)
+        print(f"preclusterDeliveriesNightly summary: {json.dumps(outcomes)}")
+    except Exception as e:
+        print(f"preclusterDeliveriesNightly error: {e}")
+        raise
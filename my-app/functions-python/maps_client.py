@@ -0,0 +1,135 @@
+"""Process-wide Google Maps client for the geocoding endpoint.
+
+The Maps API key is read from Secret Manager once per instance and the
+``googlemaps.Client`` (with its pooled HTTP session) is reused by later
+requests. The key is re-read after ``MAPS_KEY_TTL_SECONDS`` or as soon as
+Google rejects it, so a rotated key takes effect without a redeploy.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+import googlemaps
+import requests
+from google.cloud import secretmanager
+
+MAPS_SECRET_NAME = "projects/251910218620/secrets/MAPS_API_KEY/versions/latest"
+AUTH_ERROR_STATUSES = {"REQUEST_DENIED"}
+
+T = TypeVar("T")
+
+
+def _env_int(name: str, default: int) -> int:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        return default
+    return value if value > 0 else default
+
+
+MAPS_KEY_TTL_SECONDS = _env_int("MAPS_KEY_TTL_SECONDS", 3600)
+MAPS_HTTP_POOL_SIZE = _env_int("MAPS_HTTP_POOL_SIZE", 16)
+
+
+def is_auth_error(error: Exception) -> bool:
+    return isinstance(error, googlemaps.exceptions.ApiError) and error.status in AUTH_ERROR_STATUSES
+
+
+class MapsClientHolder:
+    """Caches a client built from a secret key; rebuilds it on expiry or auth failure."""
+
+    def __init__(
+        self,
+        key_loader: Callable[[], str],
+        client_factory: Callable[[str], Any],
+        ttl_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._key_loader = key_loader
+        self._client_factory = client_factory
+        self._ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._client = None
+        self._loaded_at = 0.0
+        self.hits = 0
+        self.refreshes = 0
+        self.auth_refreshes = 0
+
+    def client(self):
+        with self._lock:
+            if self._client is not None and self._clock() - self._loaded_at < self._ttl_seconds:
+                self.hits += 1
+                return self._client
+            return self._refresh_locked()
+
+    def _refresh_locked(self):
+        client = self._client_factory(self._key_loader())
+        self._client = client
+        self._loaded_at = self._clock()
+        self.refreshes += 1
+        return client
+
+    def _refresh_after_auth_error(self, rejected):
+        with self._lock:
+            # Another thread may already have replaced the rejected client.
+            if self._client is not rejected:
+                return self._client
+            self.auth_refreshes += 1
+            logging.warning("Maps API key was rejected; reloading it from Secret Manager.")
+            return self._refresh_locked()
+
+    def call(self, fn: Callable[[Any], T]) -> T:
+        """Run ``fn(client)``, retrying once with a reloaded key if Google rejects the key."""
+        client = self.client()
+        try:
+            return fn(client)
+        except Exception as e:
+            if not is_auth_error(e):
+                raise
+            return fn(self._refresh_after_auth_error(client))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            age = self._clock() - self._loaded_at if self._client is not None else None
+            return {
+                "hits": self.hits,
+                "refreshes": self.refreshes,
+                "auth_refreshes": self.auth_refreshes,
+                "key_age_seconds": None if age is None else int(age),
+            }
+
+
+_secret_client: Optional[secretmanager.SecretManagerServiceClient] = None
+
+
+def load_api_key() -> str:
+    global _secret_client
+    if _secret_client is None:
+        _secret_client = secretmanager.SecretManagerServiceClient()
+    response = _secret_client.access_secret_version(request={"name": MAPS_SECRET_NAME})
+    return response.payload.data.decode("UTF-8")
+
+
+def new_client(api_key: str) -> googlemaps.Client:
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=MAPS_HTTP_POOL_SIZE)
+    session.mount("https://", adapter)
+    return googlemaps.Client(key=api_key, requests_session=session)
+
+
+_default_holder: Optional[MapsClientHolder] = None
+_default_holder_lock = threading.Lock()
+
+
+def default_holder() -> MapsClientHolder:
+    global _default_holder
+    with _default_holder_lock:
+        if _default_holder is None:
+            _default_holder = MapsClientHolder(load_api_key, new_client, MAPS_KEY_TTL_SECONDS)
+        return _default_holder
@@ -0,0 +1,83 @@
+"""Concurrent seeded starts of the constrained solve with a wall-clock deadline.
+
+Each start is a single KMeansConstrained run with its own seed. Starts run in a
+worker pool; the lowest-inertia result seen before the deadline wins, and the
+pool is terminated at the deadline so stragglers stop consuming CPU.
+"""
+import logging
+import queue
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+import constrained_kmeans
+import worker_pool
+
+
+@dataclass
+class MultiStartResult:
+    result: Optional[constrained_kmeans.ClusteringResult]
+    starts_requested: int
+    starts_completed: int
+    timed_out: bool
+
+
+def _solve_start(points: np.ndarray, n_clusters: int, size_min: int, size_max: int, seed: int):
+    return constrained_kmeans.solve(points, n_clusters, size_min, size_max, random_state=seed, n_init=1)
+
+
+def solve(
+    points: np.ndarray,
+    n_clusters: int,
+    size_min: int,
+    size_max: int,
+    starts: int,
+    deadline_seconds: float,
+    max_workers: Optional[int] = None,
+    base_seed: int = constrained_kmeans.DEFAULT_RANDOM_STATE,
+) -> MultiStartResult:
+    """Run ``starts`` seeded solves and keep the best one finished by the deadline."""
+    deadline = time.monotonic() + deadline_seconds
+    finished: "queue.Queue" = queue.Queue()
+    workers = min(max_workers or worker_pool.worker_count(), starts)
+
+    best = None
+    completed = 0
+    received = 0
+    pool = worker_pool.mp_context().Pool(processes=workers)
+    try:
+        for offset in range(starts):
+            pool.apply_async(
+                _solve_start,
+                (points, n_clusters, size_min, size_max, base_seed + offset),
+                callback=finished.put,
+                error_callback=finished.put,
+            )
+        while received < starts:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                outcome = finished.get(timeout=remaining)
+            except queue.Empty:
+                break
+            received += 1
+            if isinstance(outcome, BaseException):
+                logging.warning("multistart clustering start failed: %s", outcome)
+                continue
+            completed += 1
+            if best is None or outcome.inertia < best.inertia:
+                best = outcome
+    finally:
+        # terminate() also stops starts that are still running past the deadline.
+        pool.terminate()
+        pool.join()
+
+    return MultiStartResult(
+        result=best,
+        starts_requested=starts,
+        starts_completed=completed,
+        timed_out=received < starts,
+    )
@@ -0,0 +1,102 @@
+"""Binary request/response bodies for the clustering and geocoding endpoints.
+
+Requests send coordinates as packed little-endian float64 ``(lat, lon)`` pairs
+(optionally gzip-compressed); clustering responses are one little-endian int32
+label per coordinate. Decoding wraps the body with ``np.frombuffer`` instead of
+building per-point Python objects.
+"""
+import gzip
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+BINARY_CONTENT_TYPE = "application/octet-stream"
+COORD_DTYPE = np.dtype("<f8")
+LABEL_DTYPE = np.dtype("<i4")
+COORD_BYTES = 2 * COORD_DTYPE.itemsize
+# Below this size gzip costs more than it saves.
+MIN_GZIP_BYTES = 1024
+
+
+class PayloadError(ValueError):
+    """A binary body that cannot be decoded into coordinates."""
+
+
+def is_binary(mimetype: Optional[str]) -> bool:
+    return (mimetype or "").split(";")[0].strip().lower() == BINARY_CONTENT_TYPE
+
+
+def accepts_binary(accept: Optional[str]) -> bool:
+    return BINARY_CONTENT_TYPE in (accept or "").lower()
+
+
+def _gunzip(body: bytes, max_bytes: int) -> bytes:
+    # Bound the output so a small compressed body cannot expand without limit.
+    decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+    try:
+        data = decompressor.decompress(body, max_bytes + 1)
+    except zlib.error as e:
+        raise PayloadError("Body is not valid gzip.") from e
+    if len(data) > max_bytes:
+        raise PayloadError("Too many coordinates in request.")
+    return data
+
+
+def decode_coords(body: bytes, content_encoding: Optional[str], max_points: int) -> np.ndarray:
+    """Read-only (n, 2) float64 view of a packed coordinate body."""
+    if (content_encoding or "").strip().lower() == "gzip":
+        body = _gunzip(body, max_points * COORD_BYTES)
+    if len(body) % COORD_BYTES:
+        raise PayloadError(f"Body length must be a multiple of {COORD_BYTES} bytes.")
+    if len(body) // COORD_BYTES > max_points:
+        raise PayloadError("Too many coordinates in request.")
+    latlon = np.frombuffer(body, dtype=COORD_DTYPE).reshape(-1, 2)
+    # Little-endian float64 is the native layout on the hosts we run on, so this is not a copy.
+    return latlon.astype(np.float64, copy=False)
+
+
+def coordinate_error(latlon: np.ndarray) -> Optional[str]:
+    """Vectorized range check; (0, 0) placeholders are allowed as in the JSON path."""
+    valid = (
+        np.isfinite(latlon).all(axis=1)
+        & (np.abs(latlon[:, 0]) <= 90.0)
+        & (np.abs(latlon[:, 1]) <= 180.0)
+    )
+    if valid.all():
+        return None
+    first = int(np.argmin(valid))
+    return f"Invalid coordinate at index {first}; latitude must be in [-90, 90] and longitude in [-180, 180]."
+
+
+def encode_coords(coords: Sequence[Tuple[float, float]]) -> bytes:
+    return np.asarray(coords, dtype=COORD_DTYPE).reshape(-1, 2).tobytes()
+
+
+def encode_clusters(
+    clusters: Dict[str, List[int]],
+    n_points: int,
+    sequences: Optional[Dict[str, List[int]]] = None,
+) -> Tuple[bytes, List[str]]:
+    """Pack a clustering response as int32 labels, plus visit order when sequenced.
+
+    Label ``i`` refers to the ``i``-th returned key. With ``sequences`` the labels
+    are followed by every point index, cluster by cluster in key order, each
+    cluster in visiting order.
+    """
+    keys = list(clusters)
+    labels = np.full(n_points, -1, dtype=LABEL_DTYPE)
+    for label, key in enumerate(keys):
+        labels[np.asarray(clusters[key], dtype=np.int64)] = label
+    body = labels.tobytes()
+    if sequences is not None:
+        order = [np.asarray(sequences.get(key, []), dtype=LABEL_DTYPE) for key in keys]
+        body += np.concatenate(order).astype(LABEL_DTYPE, copy=False).tobytes() if order else b""
+    return body, keys
+
+
+def compress(body: bytes, accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+    """Gzip ``body`` when the client accepts it and it is worth compressing."""
+    if len(body) < MIN_GZIP_BYTES or "gzip" not in (accept_encoding or "").lower():
+        return body, None
+    return gzip.compress(body, compresslevel=5), "gzip"
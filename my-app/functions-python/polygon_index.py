@@ -0,0 +1,163 @@
+"""Vectorized point-in-polygon lookup over a small set of named GeoJSON polygons.
+
+Built for boundary layers such as DC wards: the polygons are loaded once and a
+uniform grid over their extent records, per feature, which cells are fully
+inside, fully outside, or crossed by an edge, and which edges span each grid
+row. ``lookup`` answers a whole array of points at once; only points in
+edge-crossed cells run the even-odd ray test, and only against the edges in
+their row. Only numpy is required, so the ETL can load this module as well.
+"""
+import json
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_CELL_DEGREES = 0.0025
+# Cap on the (points x edges) matrix evaluated at once by the ray test.
+MAX_TEST_CELLS = 4_000_000
+
+_OUTSIDE, _INSIDE, _BOUNDARY = 0, 1, 2
+
+
+def _feature_rings(geometry: Dict[str, Any]) -> List[np.ndarray]:
+    """Every ring of a Polygon or MultiPolygon as an (n, 2) lng/lat array."""
+    if geometry is None:
+        return []
+    if geometry.get("type") == "Polygon":
+        polygons = [geometry["coordinates"]]
+    elif geometry.get("type") == "MultiPolygon":
+        polygons = geometry["coordinates"]
+    else:
+        return []
+    return [np.asarray(ring, dtype=np.float64)[:, :2] for polygon in polygons for ring in polygon if len(ring) >= 3]
+
+
+def _ring_edges(rings: List[np.ndarray]) -> np.ndarray:
+    """(k, 4) array of x1, y1, x2, y2; holes and extra parts work under the even-odd rule."""
+    edges = [np.hstack([ring, np.roll(ring, -1, axis=0)]) for ring in rings]
+    return np.vstack(edges) if edges else np.empty((0, 4))
+
+
+def points_in_edges(x: np.ndarray, y: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """Even-odd ray test of points against one feature's edges, chunked to bound memory."""
+    inside = np.zeros(len(x), dtype=bool)
+    if not len(x) or not len(edges):
+        return inside
+    x1, y1, x2, y2 = (edges[:, i] for i in range(4))
+    dy = np.where(y1 == y2, 1.0, y2 - y1)
+    chunk = max(1, MAX_TEST_CELLS // len(edges))
+    for start in range(0, len(x), chunk):
+        px = x[start:start + chunk, None]
+        py = y[start:start + chunk, None]
+        straddles = (y1 > py) != (y2 > py)
+        crossing_x = x1 + (py - y1) * (x2 - x1) / dy
+        crossings = np.count_nonzero(straddles & (px < crossing_x), axis=1)
+        inside[start:start + chunk] = crossings % 2 == 1
+    return inside
+
+
+class PolygonIndex:
+    def __init__(self, names: Sequence[str], rings: Sequence[List[np.ndarray]], cell_degrees: float = DEFAULT_CELL_DEGREES):
+        if not names:
+            raise ValueError("PolygonIndex needs at least one polygon.")
+        self.names = list(names)
+        self._edges = [_ring_edges(list(feature_rings)) for feature_rings in rings]
+        all_points = np.vstack([ring for feature_rings in rings for ring in feature_rings])
+        self._min = all_points.min(axis=0)
+        self._cell = cell_degrees
+        span = all_points.max(axis=0) - self._min
+        self.shape = (int(span[1] // cell_degrees) + 1, int(span[0] // cell_degrees) + 1)
+        self._row_edges = [self._band_edges(edges) for edges in self._edges]
+        self._cells = np.stack([self._classify_cells(feature) for feature in range(len(self.names))])
+
+    @classmethod
+    def from_geojson(
+        cls,
+        geojson: Dict[str, Any],
+        name_of: Callable[[Dict[str, Any]], str],
+        cell_degrees: float = DEFAULT_CELL_DEGREES,
+    ) -> "PolygonIndex":
+        """Index a FeatureCollection; ``name_of(properties)`` names each feature, "" skips it."""
+        names, rings = [], []
+        for feature in geojson.get("features", []):
+            name = name_of(feature.get("properties") or {})
+            feature_rings = _feature_rings(feature.get("geometry"))
+            if name and feature_rings:
+                names.append(name)
+                rings.append(feature_rings)
+        return cls(names, rings, cell_degrees)
+
+    @classmethod
+    def from_file(cls, path: str, name_of: Callable[[Dict[str, Any]], str], **kwargs) -> "PolygonIndex":
+        with open(path, encoding="utf-8") as f:
+            return cls.from_geojson(json.load(f), name_of, **kwargs)
+
+    def _cell_of(self, x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        col = np.floor((x - self._min[0]) / self._cell).astype(np.int64)
+        row = np.floor((y - self._min[1]) / self._cell).astype(np.int64)
+        on_grid = (row >= 0) & (row < self.shape[0]) & (col >= 0) & (col < self.shape[1])
+        return row.clip(0, self.shape[0] - 1), col.clip(0, self.shape[1] - 1), on_grid
+
+    def _band_edges(self, edges: np.ndarray) -> List[np.ndarray]:
+        """Per grid row, the edges a horizontal ray inside that row can cross."""
+        bottoms = self._min[1] + np.arange(self.shape[0]) * self._cell
+        low = np.minimum(edges[:, 1], edges[:, 3])
+        high = np.maximum(edges[:, 1], edges[:, 3])
+        return [np.flatnonzero((low <= bottom + self._cell) & (high >= bottom)) for bottom in bottoms]
+
+    def _contains(self, feature: int, x: np.ndarray, y: np.ndarray, row: np.ndarray) -> np.ndarray:
+        """Ray test of points in grid rows ``row``, each against its row's edges only."""
+        inside = np.zeros(len(x), dtype=bool)
+        edges = self._edges[feature]
+        for band in np.unique(row):
+            in_band = np.flatnonzero(row == band)
+            inside[in_band] = points_in_edges(x[in_band], y[in_band], edges[self._row_edges[feature][band]])
+        return inside
+
+    def _classify_cells(self, feature: int) -> np.ndarray:
+        edges = self._edges[feature]
+        cells = np.zeros(self.shape, dtype=np.int8)
+        # Any cell overlapping an edge's bounding box may be split by that edge.
+        lo_row, lo_col, _ = self._cell_of(np.minimum(edges[:, 0], edges[:, 2]), np.minimum(edges[:, 1], edges[:, 3]))
+        hi_row, hi_col, _ = self._cell_of(np.maximum(edges[:, 0], edges[:, 2]), np.maximum(edges[:, 1], edges[:, 3]))
+        boundary = np.zeros(self.shape, dtype=bool)
+        for r0, r1, c0, c1 in zip(lo_row, hi_row, lo_col, hi_col):
+            boundary[r0:r1 + 1, c0:c1 + 1] = True
+        # Cells no edge touches are entirely inside or outside; their centre decides which.
+        rows, cols = np.nonzero(~boundary)
+        centres_inside = self._contains(
+            feature,
+            self._min[0] + (cols + 0.5) * self._cell,
+            self._min[1] + (rows + 0.5) * self._cell,
+            rows,
+        )
+        cells[rows[centres_inside], cols[centres_inside]] = _INSIDE
+        cells[boundary] = _BOUNDARY
+        return cells
+
+    def lookup(self, lat, lng) -> np.ndarray:
+        """Name of the polygon containing each point, or "" where none does."""
+        y = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        x = np.atleast_1d(np.asarray(lng, dtype=np.float64))
+        result = np.full(len(x), "", dtype=object)
+        unresolved = np.isfinite(x) & np.isfinite(y)
+        row, col, on_grid = self._cell_of(np.nan_to_num(x), np.nan_to_num(y))
+        unresolved &= on_grid
+        for feature, name in enumerate(self.names):
+            state = self._cells[feature, row, col]
+            inside = unresolved & (state == _INSIDE)
+            candidates = np.flatnonzero(unresolved & (state == _BOUNDARY))
+            inside[candidates] = self._contains(feature, x[candidates], y[candidates], row[candidates])
+            result[inside] = name
+            unresolved &= ~inside
+            if not unresolved.any():
+                break
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "features": len(self.names),
+            "edges": int(sum(len(edges) for edges in self._edges)),
+            "grid": list(self.shape),
+            "boundary_cells": int((self._cells == _BOUNDARY).sum()),
+        }
@@ -0,0 +1,180 @@
+"""Content-addressed cache for clustering results.
+
+Requests are keyed by a SHA-256 of their canonical parameters and coordinate
+bytes. Results live in a bounded in-process LRU with a TTL, optionally backed
+by a Firestore document per key, and concurrent identical requests share one
+computation.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional, Tuple
+
+HIT = "HIT"
+MISS = "MISS"
+COALESCED = "COALESCED"
+
+
+def request_fingerprint(latlon, params: Dict[str, Any]) -> str:
+    # Imported here so constructing a cache at module load does not pull in NumPy.
+    import numpy as np
+
+    digest = hashlib.sha256()
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode("utf-8"))
+    digest.update(np.ascontiguousarray(latlon, dtype="<f8").tobytes())
+    return digest.hexdigest()
+
+
+class TTLCache:
+    def __init__(self, max_entries: int, ttl_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (self._clock() + self._ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Run one computation per key at a time; concurrent callers wait for its result."""
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, compute: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Return ``(value, shared)``; ``shared`` is True for callers that waited."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+
+        try:
+            call.value = compute()
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.value, False
+
+
+class FirestoreResultStore:
+    """Second-level cache: one document per key with an ``expiresAt`` timestamp."""
+
+    def __init__(self, collection_name: str, ttl_seconds: float, client_factory: Callable[[], Any]):
+        self._collection_name = collection_name
+        self._ttl_seconds = ttl_seconds
+        self._client_factory = client_factory
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        snapshot = self._client_factory().collection(self._collection_name).document(key).get()
+        if not snapshot.exists:
+            return None
+        data = snapshot.to_dict() or {}
+        expires_at = data.get("expiresAt")
+        if expires_at is None or expires_at <= datetime.now(timezone.utc):
+            return None
+        return data.get("result")
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        self._client_factory().collection(self._collection_name).document(key).set({
+            "result": value,
+            "expiresAt": datetime.now(timezone.utc) + timedelta(seconds=self._ttl_seconds),
+        })
+
+
+class ResultCache:
+    def __init__(self, memory: TTLCache, store: Optional[FirestoreResultStore] = None):
+        self.memory = memory
+        self.store = store
+        self.single_flight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _lookup_or_compute(self, key: str, compute: Callable[[], Tuple[Any, bool]]) -> Tuple[Any, str]:
+        if self.store is not None:
+            try:
+                stored = self.store.get(key)
+            except Exception as e:
+                logging.warning("Cluster result cache read failed: %s", e)
+                stored = None
+            if stored is not None:
+                self.memory.put(key, stored)
+                return stored, HIT
+
+        value, cacheable = compute()
+        if cacheable:
+            self.memory.put(key, value)
+            if self.store is not None:
+                try:
+                    self.store.put(key, value)
+                except Exception as e:
+                    logging.warning("Cluster result cache write failed: %s", e)
+        return value, MISS
+
+    def get_or_compute(self, key: str, compute: Callable[[], Tuple[Any, bool]]) -> Tuple[Any, str]:
+        """Return ``(value, status)`` where status is HIT, MISS or COALESCED.
+
+        ``compute`` returns ``(value, cacheable)`` so partial results can be
+        shared with waiting callers without being stored.
+        """
+        value = self.memory.get(key)
+        if value is not None:
+            self._count(True)
+            return value, HIT
+
+        (value, status), shared = self.single_flight.do(key, lambda: self._lookup_or_compute(key, compute))
+        if shared:
+            status = COALESCED
+        self._count(status != MISS)
+        return value, status
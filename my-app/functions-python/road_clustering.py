@@ -0,0 +1,60 @@
+"""Size-constrained clustering on road distances instead of straight lines."""
+import numpy as np
+from sklearn.cluster import kmeans_plusplus
+
+import assignment
+import constrained_kmeans
+from road_network import RoadGraph
+
+DEFAULT_MAX_ITER = 30
+
+
+def _road_costs(graph: RoadGraph, point_nodes, point_offsets, centers: np.ndarray) -> np.ndarray:
+    center_nodes, center_offsets = graph.snap(centers)
+    # Off-graph gaps are added so points far from any street are not treated as on it.
+    return (
+        graph.distances_from(center_nodes)[:, point_nodes].T
+        + point_offsets[:, None]
+        + center_offsets[None, :]
+    )
+
+
+def solve(
+    latlon: np.ndarray,
+    graph: RoadGraph,
+    n_clusters: int,
+    size_min: int,
+    size_max: int,
+    max_iter: int = DEFAULT_MAX_ITER,
+    random_state: int = constrained_kmeans.DEFAULT_RANDOM_STATE,
+) -> constrained_kmeans.ClusteringResult:
+    """Lloyd iterations whose assignment step uses road distance to each centroid.
+
+    Centroids are averaged in planar space and snapped to the nearest graph node
+    before the next shortest-path lookup.
+    """
+    planar = graph.project(latlon)
+    point_nodes, point_offsets = graph.snap(planar)
+    centers, _ = kmeans_plusplus(planar, n_clusters, random_state=random_state)
+
+    labels = None
+    costs = None
+    n_iter = 0
+    for n_iter in range(1, max_iter + 1):
+        costs = _road_costs(graph, point_nodes, point_offsets, centers)
+        new_labels = assignment.constrained_assignment(costs, size_min, size_max)
+        if labels is not None and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        counts = np.bincount(labels, minlength=n_clusters)[:, None]
+        sums = np.zeros_like(centers)
+        np.add.at(sums, labels, planar)
+        centers = np.where(counts > 0, sums / np.maximum(counts, 1), centers)
+
+    return constrained_kmeans.ClusteringResult(
+        labels=labels,
+        centers=centers,
+        inertia=float(costs[np.arange(len(labels)), labels].sum()),
+        n_iter=n_iter,
+        n_init=1,
+    )
@@ -0,0 +1,113 @@
+"""Street-graph distances for road-aware clustering.
+
+A graph is a directory of four ``.npy`` files, written by ``build_graph``:
+
+- ``nodes.npy``: (n, 2) float64 node latitude/longitude
+- ``indptr.npy``, ``indices.npy``: int32 CSR adjacency
+- ``weights.npy``: float32 edge lengths in km
+
+The arrays are memory-mapped, so loading a graph only touches the pages that
+are used. Shortest-path rows are cached per source node because consecutive
+clustering iterations mostly reuse the same centroid nodes.
+"""
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from scipy.spatial import cKDTree
+
+import geo
+
+GRAPH_FILES = ("nodes.npy", "indptr.npy", "indices.npy", "weights.npy")
+DEFAULT_ROW_CACHE_SIZE = 256
+
+
+def build_graph(path: str, node_latlon: np.ndarray, edges: np.ndarray, directed: bool = False) -> None:
+    """Write a graph directory from node coordinates and ``(u, v, km)`` edge rows."""
+    node_latlon = geo.latlon_array(node_latlon)
+    edges = np.asarray(edges, dtype=np.float64).reshape(-1, 3)
+    tails = edges[:, 0].astype(np.int64)
+    heads = edges[:, 1].astype(np.int64)
+    lengths = edges[:, 2]
+    if not directed:
+        tails, heads = np.concatenate([tails, heads]), np.concatenate([heads, tails])
+        lengths = np.concatenate([lengths, lengths])
+
+    # Keep the shortest of any parallel edges.
+    order = np.lexsort((lengths, heads, tails))
+    tails, heads, lengths = tails[order], heads[order], lengths[order]
+    first = np.ones(len(tails), dtype=bool)
+    first[1:] = (tails[1:] != tails[:-1]) | (heads[1:] != heads[:-1])
+    tails, heads, lengths = tails[first], heads[first], lengths[first]
+
+    indptr = np.zeros(len(node_latlon) + 1, dtype=np.int32)
+    np.cumsum(np.bincount(tails, minlength=len(node_latlon)), out=indptr[1:])
+
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, "nodes.npy"), node_latlon)
+    np.save(os.path.join(path, "indptr.npy"), indptr)
+    np.save(os.path.join(path, "indices.npy"), heads.astype(np.int32))
+    np.save(os.path.join(path, "weights.npy"), lengths.astype(np.float32))
+
+
+def graph_exists(path: Optional[str]) -> bool:
+    return bool(path) and all(os.path.isfile(os.path.join(path, name)) for name in GRAPH_FILES)
+
+
+class RoadGraph:
+    def __init__(self, path: str, row_cache_size: int = DEFAULT_ROW_CACHE_SIZE):
+        arrays = {name: np.load(os.path.join(path, name), mmap_mode="r") for name in GRAPH_FILES}
+        self.nodes = arrays["nodes.npy"]
+        self.node_count = len(self.nodes)
+        self._csr = (arrays["weights.npy"], arrays["indices.npy"], arrays["indptr.npy"])
+        self._matrix = None
+        self._tree = None
+        self.origin: Tuple[float, float] = tuple(np.asarray(self.nodes).mean(axis=0))
+
+        self._rows: "OrderedDict[int, np.ndarray]" = OrderedDict()
+        self._row_cache_size = row_cache_size
+        self._lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def project(self, latlon: np.ndarray) -> np.ndarray:
+        """Planar km coordinates in this graph's fixed frame."""
+        return geo.to_local_planar(geo.latlon_array(latlon), origin=self.origin)
+
+    def snap(self, planar: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Nearest graph node for each planar point, and the straight-line gap to it in km."""
+        if self._tree is None:
+            self._tree = cKDTree(self.project(self.nodes))
+        offsets, nodes = self._tree.query(planar)
+        return nodes.astype(np.int64), offsets
+
+    def distances_from(self, sources: np.ndarray) -> np.ndarray:
+        """Shortest-path km from each source node to every node, shape (len(sources), n)."""
+        sources = np.asarray(sources, dtype=np.int64)
+        with self._lock:
+            missing = [int(node) for node in np.unique(sources) if int(node) not in self._rows]
+            self.cache_hits += len(np.unique(sources)) - len(missing)
+            self.cache_misses += len(missing)
+            if missing:
+                if self._matrix is None:
+                    self._matrix = csr_matrix(self._csr, shape=(self.node_count, self.node_count))
+                # One multi-source call fills every missing row.
+                rows = dijkstra(self._matrix, directed=True, indices=missing).astype(np.float32)
+                for node, row in zip(missing, rows):
+                    self._rows[node] = row
+            for node in sources:
+                self._rows.move_to_end(int(node))
+            result = np.stack([self._rows[int(node)] for node in sources])
+            while len(self._rows) > self._row_cache_size:
+                self._rows.popitem(last=False)
+        return result
+
+
+@lru_cache(maxsize=2)
+def load_graph(path: str) -> RoadGraph:
+    return RoadGraph(path)
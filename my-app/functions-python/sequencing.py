@@ -0,0 +1,216 @@
+"""Stop ordering within each cluster.
+
+Every cluster is sequenced as an open route: nearest-neighbour construction
+followed by 2-opt and Or-opt improvement. Clusters of similar size are padded
+into one (clusters, stops, stops) distance block so each improvement step
+evaluates every candidate move of every cluster in a single NumPy expression.
+
+Open routes are handled by adding a "free" node at distance zero from every
+stop, which turns the problem into a closed tour; the route is the tour cut at
+that node. Padding slots are copies of a cluster's first stop, so they cost
+nothing to visit next to it and are dropped afterwards.
+"""
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+
+DEFAULT_MAX_MOVES = 500
+BUCKET_SIZE = 8
+OR_OPT_SEGMENTS = (1, 2, 3)
+
+
+def distance_block(points: np.ndarray) -> np.ndarray:
+    """Pairwise straight-line distances between the rows of ``points``."""
+    points = np.asarray(points, dtype=np.float64)
+    diff = points[:, None, :] - points[None, :, :]
+    return np.sqrt((diff * diff).sum(axis=-1))
+
+
+def route_length(block: np.ndarray, order: Sequence[int]) -> float:
+    order = np.asarray(order, dtype=np.int64)
+    if len(order) < 2:
+        return 0.0
+    return float(block[order[:-1], order[1:]].sum())
+
+
+def _padded_blocks(blocks: List[np.ndarray], size: int) -> np.ndarray:
+    """Stack blocks into (len(blocks), size + 1, size + 1); the last node is the free node."""
+    batch = np.zeros((len(blocks), size + 1, size + 1))
+    for b, block in enumerate(blocks):
+        m = len(block)
+        # Padding slots duplicate stop 0.
+        source = np.concatenate([np.arange(m), np.zeros(size - m, dtype=np.int64)])
+        batch[b, :size, :size] = block[np.ix_(source, source)]
+    return batch
+
+
+def _nearest_neighbor(dist: np.ndarray) -> np.ndarray:
+    """Greedy tours for every block at once, starting from the free node."""
+    n_blocks, n, _ = dist.shape
+    rows = np.arange(n_blocks)
+    tours = np.empty((n_blocks, n), dtype=np.int64)
+    visited = np.zeros((n_blocks, n), dtype=bool)
+    # Every stop is at zero from the free node, so begin at the stop farthest
+    # from the rest of its cluster rather than an arbitrary one.
+    spread = dist[:, :-1, :-1].sum(axis=2)
+    current = np.full(n_blocks, n - 1)
+    tours[:, 0] = current
+    visited[rows, current] = True
+    for step in range(1, n):
+        if step == 1:
+            current = spread.argmax(axis=1)
+        else:
+            current = np.where(visited, np.inf, dist[rows, current]).argmin(axis=1)
+        tours[:, step] = current
+        visited[rows, current] = True
+    return tours
+
+
+def _edge_costs(dist: np.ndarray, tours: np.ndarray) -> np.ndarray:
+    """Cost of edge (tour[i], tour[i + 1]) for every position, wrapping around."""
+    rows = np.arange(len(tours))[:, None]
+    return dist[rows, tours, np.roll(tours, -1, axis=1)]
+
+
+def _best_two_opt(dist: np.ndarray, tours: np.ndarray):
+    """Best 2-opt move per tour: reverse tour[i + 1 .. j]."""
+    n_blocks, n = tours.shape
+    rows = np.arange(n_blocks)[:, None, None]
+    a = tours[:, :, None]
+    b = np.roll(tours, -1, axis=1)[:, :, None]
+    c = tours[:, None, :]
+    d = np.roll(tours, -1, axis=1)[:, None, :]
+    delta = dist[rows, a, c] + dist[rows, b, d] - dist[rows, a, b] - dist[rows, c, d]
+    i, j = np.indices((n, n))
+    delta[:, ~(j > i + 1)] = np.inf
+    delta[:, 0, n - 1] = np.inf
+    flat = delta.reshape(n_blocks, -1).argmin(axis=1)
+    best = delta.reshape(n_blocks, -1)[np.arange(n_blocks), flat]
+    return best, flat // n, flat % n
+
+
+def _best_or_opt(dist: np.ndarray, tours: np.ndarray, length: int):
+    """Best move of a ``length``-stop segment to another edge, in either direction."""
+    n_blocks, n = tours.shape
+    rows = np.arange(n_blocks)[:, None, None]
+    positions = np.arange(n)
+    prev = tours[:, (positions - 1) % n]
+    first = tours
+    last = tours[:, (positions + length - 1) % n]
+    nxt = tours[:, (positions + length) % n]
+    removal = (
+        dist[rows[:, :, 0], prev, nxt]
+        - dist[rows[:, :, 0], prev, first]
+        - dist[rows[:, :, 0], last, nxt]
+    )[:, :, None]
+    u = tours[:, None, :]
+    v = np.roll(tours, -1, axis=1)[:, None, :]
+    forward = dist[rows, u, first[:, :, None]] + dist[rows, last[:, :, None], v] - dist[rows, u, v]
+    reverse = dist[rows, u, last[:, :, None]] + dist[rows, first[:, :, None], v] - dist[rows, u, v]
+    delta = removal + np.minimum(forward, reverse)
+
+    # The target edge (tour[j], tour[j + 1]) must not touch the segment.
+    i, j = np.indices((n, n))
+    offset = (j - i) % n
+    delta[:, (offset >= n - 1) | (offset < length)] = np.inf
+    flat = delta.reshape(n_blocks, -1).argmin(axis=1)
+    best = delta.reshape(n_blocks, -1)[np.arange(n_blocks), flat]
+    flipped = (reverse < forward).reshape(n_blocks, -1)[np.arange(n_blocks), flat]
+    return best, flat // n, flat % n, flipped
+
+
+def _apply_or_opt(tour: np.ndarray, i: int, j: int, length: int, flipped: bool) -> np.ndarray:
+    n = len(tour)
+    rotated = np.roll(tour, -i)
+    segment = rotated[:length]
+    rest = rotated[length:]
+    insert_after = (j - i) % n - length
+    if flipped:
+        segment = segment[::-1]
+    return np.concatenate([rest[: insert_after + 1], segment, rest[insert_after + 1:]])
+
+
+def _improve(dist: np.ndarray, tours: np.ndarray, max_moves: int) -> np.ndarray:
+    tours = tours.copy()
+    active = np.arange(len(tours))
+    for _ in range(max_moves):
+        if len(active) == 0:
+            break
+        sub_dist, sub_tours = dist[active], tours[active]
+        two_gain, two_i, two_j = _best_two_opt(sub_dist, sub_tours)
+        best_gain = two_gain.copy()
+        best_move = np.zeros(len(active), dtype=np.int64)
+        or_moves = []
+        for option, length in enumerate(OR_OPT_SEGMENTS, start=1):
+            if sub_tours.shape[1] < length + 3:
+                or_moves.append(None)
+                continue
+            move = _best_or_opt(sub_dist, sub_tours, length)
+            or_moves.append(move)
+            better = move[0] < best_gain
+            best_gain[better] = move[0][better]
+            best_move[better] = option
+
+        improving = best_gain < -1e-9
+        for row in np.flatnonzero(improving):
+            tour = sub_tours[row]
+            if best_move[row] == 0:
+                i, j = two_i[row], two_j[row]
+                tour[i + 1:j + 1] = tour[i + 1:j + 1][::-1]
+            else:
+                _, oi, oj, flipped = or_moves[best_move[row] - 1]
+                tour[:] = _apply_or_opt(
+                    tour, oi[row], oj[row], OR_OPT_SEGMENTS[best_move[row] - 1], flipped[row]
+                )
+        tours[active] = sub_tours
+        active = active[improving]
+    return tours
+
+
+def sequence_blocks(blocks: List[np.ndarray], max_moves: int = DEFAULT_MAX_MOVES) -> List[np.ndarray]:
+    """Visiting order (indices into each block) for a list of square distance blocks."""
+    orders: List[np.ndarray] = [np.arange(len(block)) for block in blocks]
+    sizes = np.array([len(block) for block in blocks], dtype=np.int64)
+
+    # Bucket by padded size so small clusters are not padded up to the largest one.
+    padded = -(-sizes // BUCKET_SIZE) * BUCKET_SIZE
+    for size in np.unique(padded[sizes > 2]):
+        members = np.flatnonzero((padded == size) & (sizes > 2))
+        dist = _padded_blocks([blocks[b] for b in members], int(size))
+        tours = _improve(dist, _nearest_neighbor(dist), max_moves)
+        free = int(size)
+        for b, tour in zip(members, tours):
+            start = int(np.flatnonzero(tour == free)[0])
+            route = np.roll(tour, -start)[1:]
+            orders[b] = _drop_padding(route, sizes[b])
+    return orders
+
+
+def _drop_padding(route: np.ndarray, m: int) -> np.ndarray:
+    """Map padding slots back to stop 0 and keep its first visit only."""
+    route = np.where(route >= m, 0, route)
+    keep = np.ones(len(route), dtype=bool)
+    zeros = np.flatnonzero(route == 0)
+    keep[zeros[1:]] = False
+    return route[keep]
+
+
+def sequence_clusters(
+    points: np.ndarray,
+    labels: np.ndarray,
+    n_clusters: int,
+    block_of: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+) -> List[np.ndarray]:
+    """Point indices of each cluster in visiting order.
+
+    Distances are straight-line between ``points`` unless ``block_of(indices)``
+    supplies the distance block for those point indices (e.g. from a stored
+    day matrix).
+    """
+    labels = np.asarray(labels)
+    members = [np.flatnonzero(labels == label) for label in range(n_clusters)]
+    if block_of is None:
+        blocks = [distance_block(points[indices]) for indices in members]
+    else:
+        blocks = [block_of(indices) for indices in members]
+    return [indices[order] for indices, order in zip(members, sequence_blocks(blocks))]
@@ -0,0 +1,49 @@
+import unittest
+
+import address_keys
+
+
+class SplitAddressTests(unittest.TestCase):
+    def test_street_ends_at_quadrant_and_unit_is_split_off(self):
+        parts = address_keys.split_address("1600 Pennsylvania Ave Northwest Apt 2")
+        self.assertEqual(parts, address_keys.AddressParts("1600 Pennsylvania Ave NW", "NW", "Apt 2"))
+
+    def test_without_quadrant_street_ends_at_first_comma_or_unit(self):
+        parts = address_keys.split_address("45 K Street, Unit 3B")
+        self.assertEqual(parts, address_keys.AddressParts("45 K Street", "", "Unit 3B"))
+
+    def test_quadrant_hint_is_appended_to_street_addresses_only(self):
+        self.assertEqual(address_keys.split_address("45 K Street", "NE").street, "45 K Street NE")
+        self.assertEqual(address_keys.split_address("DECEASED", "NE").street, "DECEASED")
+
+    def test_missing_values_are_empty(self):
+        self.assertEqual(address_keys.split_address(float("nan")), address_keys.AddressParts("", "", ""))
+        self.assertEqual(address_keys.extract_quadrant(None), "")
+
+
+class AddressKeyTests(unittest.TestCase):
+    def test_spelling_variants_share_a_key(self):
+        variants = [
+            "1600 Pennsylvania Avenue Northwest, Apt 2",
+            "1600 pennsylvania ave. NW",
+            "  1600 PENNSYLVANIA  AVE NW #2 ",
+            "1600 Pennsylvania Ave Apt 2 NW",
+        ]
+        self.assertEqual({address_keys.address_key(v) for v in variants}, {"1600 PENNSYLVANIA AVE NW"})
+
+    def test_quadrant_distinguishes_addresses(self):
+        self.assertNotEqual(address_keys.address_key("100 M St NE"), address_keys.address_key("100 M St SE"))
+
+    def test_geocode_key_keeps_locality_and_drops_unit(self):
+        self.assertEqual(
+            address_keys.geocode_key("45 K Street NE Apt. 3, Washington, DC 20002"),
+            "45 K ST NE WASHINGTON DC 20002",
+        )
+        self.assertNotEqual(
+            address_keys.geocode_key("1 Main St, Springfield, IL"),
+            address_keys.geocode_key("1 Main St, Springfield, MA"),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import threading
+import unittest
+
+import admission
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class AdmissionControllerTests(unittest.TestCase):
+    def test_sheds_when_slots_and_queue_are_full(self):
+        controller = admission.AdmissionController(max_running=1, max_queued=0, max_work=1e9, queue_timeout_seconds=5)
+        with controller.admit(100):
+            with self.assertRaises(admission.Overloaded) as raised:
+                with controller.admit(100):
+                    pass
+        self.assertGreaterEqual(raised.exception.retry_after, 1)
+        self.assertEqual((controller.running, controller.work, controller.rejected), (0, 0, 1))
+
+    def test_work_budget_sheds_large_requests_but_admits_one_when_idle(self):
+        controller = admission.AdmissionController(max_running=4, max_queued=4, max_work=1000, queue_timeout_seconds=5)
+        with controller.admit(5000):
+            self.assertEqual(controller.work, 5000)
+        with controller.admit(600):
+            with self.assertRaises(admission.Overloaded):
+                with controller.admit(600):
+                    pass
+            with controller.admit(400):
+                self.assertEqual(controller.running, 2)
+
+    def test_queued_request_runs_when_a_slot_frees(self):
+        controller = admission.AdmissionController(max_running=1, max_queued=1, max_work=1e9, queue_timeout_seconds=30)
+        release = threading.Event()
+        order = []
+
+        def first():
+            with controller.admit(10):
+                order.append("first")
+                release.wait(5)
+
+        thread = threading.Thread(target=first)
+        thread.start()
+        while controller.running == 0:
+            pass
+        def second():
+            with controller.admit(10):
+                order.append("second")
+
+        waiter = threading.Thread(target=second)
+        waiter.start()
+        while controller.queued == 0:
+            pass
+        release.set()
+        thread.join(5)
+        waiter.join(5)
+        self.assertEqual(order, ["first", "second"])
+
+    def test_queue_timeout_sheds_the_waiting_request(self):
+        clock = FakeClock()
+        controller = admission.AdmissionController(
+            max_running=1, max_queued=1, max_work=1e9, queue_timeout_seconds=0, clock=clock
+        )
+        with controller.admit(10):
+            with self.assertRaises(admission.Overloaded):
+                with controller.admit(10):
+                    pass
+            self.assertEqual((controller.queued, controller.work), (0, 10))
+
+    def test_multi_worker_solve_holds_a_slot_per_worker(self):
+        clock = FakeClock()
+        controller = admission.AdmissionController(
+            max_running=4, max_queued=1, max_work=1e9, queue_timeout_seconds=60, clock=clock
+        )
+        with controller.admit(10):
+            self.assertEqual(controller.running, 1)
+            # Three of four slots are free, and the caller will not wait past its own timeout.
+            with self.assertRaises(admission.Overloaded):
+                with controller.admit(40, slots=4, timeout=0):
+                    pass
+        with controller.admit(40, slots=4):
+            self.assertEqual(controller.running, 4)
+            with self.assertRaises(admission.Overloaded):
+                with controller.admit(10, timeout=0):
+                    pass
+        # More slots than exist are capped at all of them.
+        with controller.admit(10, slots=9):
+            self.assertEqual(controller.running, 4)
+        self.assertEqual((controller.running, controller.work), (0, 0))
+
+    def test_acquired_slots_are_released_once(self):
+        controller = admission.AdmissionController(max_running=1, max_queued=0, max_work=1e9, queue_timeout_seconds=5)
+        release = controller.acquire(10)
+        release()
+        release()
+        self.assertEqual((controller.running, controller.work), (0, 0))
+
+    def test_retry_after_uses_the_measured_rate(self):
+        clock = FakeClock()
+        controller = admission.AdmissionController(
+            max_running=2, max_queued=0, max_work=1e9, queue_timeout_seconds=5, clock=clock
+        )
+        with controller.admit(1000):
+            clock.now += 10
+        # 10s per 1000 units of work; 3000 admitted over 2 slots is 15s.
+        with controller.admit(1000), controller.admit(2000):
+            with self.assertRaises(admission.Overloaded) as raised:
+                with controller.admit(1):
+                    pass
+        self.assertEqual(raised.exception.retry_after, 15)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,410 @@
+import gzip
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from unittest.mock import patch
+
+import numpy as np
+from flask import Request
+from werkzeug.test import EnvironBuilder
+
+import admission
+import clustering
+
+PROBLEM = {
+    "coords": [[38.9, -77.0], [38.91, -77.01], [38.92, -77.02], [38.93, -77.03]],
+    "drivers_count": 2,
+    "min_deliveries": 1,
+    "max_deliveries": 3,
+}
+
+
+def _request(method="POST", headers=None, **kwargs):
+    builder = EnvironBuilder(
+        method=method,
+        headers={"Authorization": "Bearer token", "Origin": "http://localhost:3000", **(headers or {})},
+        **kwargs,
+    )
+    return Request(builder.get_environ())
+
+
+def _batch_request(problems):
+    return _request(json={"problems": problems})
+
+
+def _slow_region(task):
+    time.sleep(5)
+
+
+class ClusterDeliveriesTests(unittest.TestCase):
+    def setUp(self):
+        auth = patch.object(clustering.admin_auth, "verify_id_token", return_value={"uid": "user"})
+        auth.start()
+        self.addCleanup(auth.stop)
+
+    def _post(self, headers=None):
+        return clustering.cluster_deliveries_k_means(_request(json=PROBLEM, headers=headers))
+
+    def test_solved_clusters_are_returned_as_json(self):
+        response = self._post()
+
+        self.assertEqual((response.status_code, response.mimetype), (201, "application/json"))
+        self.assertIn(response.headers["X-Cache"], ("MISS", "HIT"))
+        clusters = json.loads(response.get_data())["clusters"]
+        self.assertEqual(len(clusters), PROBLEM["drivers_count"])
+        self.assertEqual(sorted(index for members in clusters.values() for index in members), [0, 1, 2, 3])
+        for members in clusters.values():
+            self.assertTrue(PROBLEM["min_deliveries"] <= len(members) <= PROBLEM["max_deliveries"])
+
+    def test_binary_clients_get_gzipped_labels_and_the_cluster_keys(self):
+        result = {"clusters": {"7": [1, 2], "9": [0, 3]}, "solver": {"status": "ok"}}
+        with patch.object(clustering, "_solve_cached", return_value=(result, "MISS")), \
+                patch.object(clustering.payloads, "MIN_GZIP_BYTES", 0):
+            response = self._post({
+                "Accept": clustering.payloads.BINARY_CONTENT_TYPE,
+                "Accept-Encoding": "gzip",
+            })
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.mimetype, clustering.payloads.BINARY_CONTENT_TYPE)
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(response.headers["X-Cluster-Keys"], "7,9")
+        self.assertEqual(json.loads(response.headers["X-Solver"]), {"status": "ok"})
+        self.assertIn("X-Cluster-Keys", response.headers["Access-Control-Expose-Headers"])
+        labels = np.frombuffer(gzip.decompress(response.get_data()), dtype=clustering.payloads.LABEL_DTYPE)
+        self.assertEqual(labels.tolist(), [1, 0, 0, 1])
+
+    def test_overload_is_a_429_with_retry_after(self):
+        with patch.object(clustering, "_solve_cached", side_effect=admission.Overloaded(7)):
+            response = self._post()
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers["Retry-After"], "7")
+        self.assertIn("Retry-After", response.headers["Access-Control-Expose-Headers"])
+        self.assertEqual(json.loads(response.get_data())["retry_after"], 7)
+
+    def test_deadline_exceeded_is_a_504(self):
+        error = clustering.ClusteringDeadlineExceeded("Clustering did not finish within 5s.")
+        with patch.object(clustering, "_solve_cached", side_effect=error):
+            response = self._post()
+
+        self.assertEqual(response.status_code, 504)
+        self.assertEqual(
+            json.loads(response.get_data()),
+            {"error": "Clustering did not finish within 5s.", "timed_out": True},
+        )
+
+
+class BatchClusteringTests(unittest.TestCase):
+    def setUp(self):
+        auth = patch.object(clustering.admin_auth, "verify_id_token", return_value={"uid": "user"})
+        auth.start()
+        self.addCleanup(auth.stop)
+
+    def _post(self, problems):
+        return clustering.cluster_deliveries_batch(_batch_request(problems))
+
+    def test_invalid_problems_are_listed_by_date(self):
+        response = self._post({
+            "2026-03-14": PROBLEM,
+            "2026-03-15": {**PROBLEM, "drivers_count": 0},
+            "2026-03-16": {**PROBLEM, "mode": "multistart"},
+        })
+
+        self.assertEqual(response.status_code, 400)
+        body = json.loads(response.get_data())
+        self.assertEqual(body["error"], "Invalid batch problems.")
+        self.assertEqual(sorted(body["details"]), ["2026-03-15", "2026-03-16"])
+
+    def test_batch_wide_limits_reject_the_whole_batch(self):
+        problems = {f"2026-03-{day:02d}": PROBLEM for day in range(1, clustering.MAX_BATCH_PROBLEMS + 2)}
+        response = self._post(problems)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            json.loads(response.get_data()),
+            {"error": f"At most {clustering.MAX_BATCH_PROBLEMS} dates per batch."},
+        )
+
+    def test_lines_stream_as_dates_finish_and_failures_stay_per_date(self):
+        release = threading.Event()
+
+        def solve(problem):
+            day = problem.delivery_date
+            if day == date(2026, 3, 14):
+                release.wait(5)
+                return {"clusters": {"1": [0, 1], "2": [2, 3]}}, "MISS"
+            if day == date(2026, 3, 15):
+                raise RuntimeError("solver crashed")
+            raise admission.Overloaded(7)
+
+        with patch.object(clustering, "_solve_cached", side_effect=solve), \
+                patch.object(clustering.worker_pool, "worker_count", return_value=3):
+            response = self._post({"2026-03-14": PROBLEM, "2026-03-15": PROBLEM, "2026-03-16": PROBLEM})
+            self.assertEqual((response.status_code, response.mimetype), (200, clustering.NDJSON_CONTENT_TYPE))
+            chunks = iter(response.response)
+            # The blocked date has not finished, yet the others are already readable.
+            early = [json.loads(next(chunks)) for _ in range(2)]
+            release.set()
+            rest = [json.loads(chunk) for chunk in chunks]
+
+        self.assertEqual(
+            sorted((line["date"], line["status"]) for line in early),
+            [("2026-03-15", 500), ("2026-03-16", 429)],
+        )
+        self.assertEqual(next(line for line in early if line["status"] == 429)["retry_after"], 7)
+        self.assertEqual(rest[0]["date"], "2026-03-14")
+        self.assertEqual(rest[0]["result"]["clusters"], {"1": [0, 1], "2": [2, 3]})
+        self.assertEqual(rest[-1]["done"], True)
+        self.assertEqual((rest[-1]["dates"], rest[-1]["failed"]), (3, 2))
+
+    def test_large_problems_share_the_solve_pool_under_admission_control(self):
+        pool = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(pool.shutdown)
+        controller = clustering._get_admission()
+        with patch.object(clustering, "ADMISSION_FAST_PATH_WORK", 0), \
+                patch.object(clustering, "_get_solve_pool", return_value=pool), \
+                patch.object(pool, "submit", wraps=pool.submit) as submit, \
+                patch.object(controller, "acquire", wraps=controller.acquire) as acquire:
+            response = self._post({"2026-03-14": PROBLEM, "2026-03-15": {**PROBLEM, "max_deliveries": 2}})
+            lines = [json.loads(chunk) for chunk in response.response]
+
+        self.assertEqual((submit.call_count, acquire.call_count), (2, 2))
+        self.assertEqual([line["status"] for line in lines[:-1]], [201, 201])
+        self.assertEqual(controller.running, 0)
+
+
+class SolveAdmittedTests(unittest.TestCase):
+    def setUp(self):
+        self.admission = admission.AdmissionController(
+            max_running=4, max_queued=4, max_work=1e9, queue_timeout_seconds=60
+        )
+        for patcher in (
+            patch.object(clustering, "_admission", self.admission),
+            patch.object(clustering, "ADMISSION_FAST_PATH_WORK", 0),
+            patch.object(clustering.worker_pool, "worker_count", return_value=4),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_solve_past_the_deadline_times_out_but_keeps_its_slot(self):
+        release = threading.Event()
+        pool = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(pool.shutdown)
+        self.addCleanup(release.set)
+
+        def solve(request, coords):
+            release.wait(5)
+            return {"clusters": {}}, True
+
+        request_body = clustering.KMeansClusterDeliveriesRequest(**PROBLEM)
+        with patch.object(clustering, "DEFAULT_CLUSTER_DEADLINE_SECONDS", 0.05), \
+                patch.object(clustering, "_get_solve_pool", return_value=pool), \
+                patch.object(clustering, "_solve_in_worker", side_effect=solve):
+            with self.assertRaises(clustering.ClusteringDeadlineExceeded):
+                clustering._solve_admitted(request_body)
+
+        # The worker is still busy, so its slot is not handed to the next request yet.
+        self.assertEqual(self.admission.running, 1)
+        release.set()
+        pool.shutdown(wait=True)
+        self.assertEqual((self.admission.running, self.admission.work), (0, 0))
+
+    def test_hierarchical_solve_past_the_deadline_stops_its_workers(self):
+        request_body = clustering.KMeansClusterDeliveriesRequest(**PROBLEM, mode="hierarchical")
+        started = time.monotonic()
+        with patch.object(clustering, "DEFAULT_CLUSTER_DEADLINE_SECONDS", 0.5), \
+                patch.object(clustering.worker_pool, "mp_context", return_value=multiprocessing.get_context("fork")), \
+                patch.object(clustering.hierarchical, "_solve_region", _slow_region):
+            with self.assertRaises(clustering.ClusteringDeadlineExceeded):
+                clustering._solve_admitted(request_body)
+
+        # The regions' workers were terminated, so the slots are free again right away.
+        self.assertLess(time.monotonic() - started, 4)
+        self.assertEqual((self.admission.running, self.admission.work), (0, 0))
+
+    def test_modes_with_their_own_workers_hold_a_slot_per_worker(self):
+        held = {}
+
+        def solve(request_body):
+            held[request_body.mode] = (self.admission.running, self.admission.work, request_body.deadline_seconds)
+            return {"clusters": {}}, True
+
+        work = len(PROBLEM["coords"]) * PROBLEM["drivers_count"]
+        with patch.object(clustering, "_solve_for_cache", side_effect=solve):
+            clustering._solve_admitted(clustering.KMeansClusterDeliveriesRequest(**PROBLEM, mode="hierarchical"))
+            clustering._solve_admitted(
+                clustering.KMeansClusterDeliveriesRequest(**PROBLEM, mode="multistart", starts=2, deadline_seconds=30)
+            )
+
+        self.assertEqual(held["hierarchical"][:2], (4, 4 * work))
+        self.assertEqual(held["multistart"][:2], (2, 2 * work))
+        # Multistart gets what is left of its deadline after queueing.
+        self.assertLessEqual(held["multistart"][2], 30)
+        self.assertEqual(self.admission.running, 0)
+
+
+class PreclusterTests(unittest.TestCase):
+    def setUp(self):
+        self.store = {}
+        self.solved = []
+        located = [f"client-{index}" for index in range(len(PROBLEM["coords"]))]
+        coordinates = dict(zip(located, map(tuple, PROBLEM["coords"])))
+
+        def solve(cluster_request):
+            self.solved.append(cluster_request.drivers_count)
+            clusters = {str(cluster + 1): [] for cluster in range(cluster_request.drivers_count)}
+            for index in range(len(cluster_request.coords)):
+                clusters[str(index % cluster_request.drivers_count + 1)].append(index)
+            return {"clusters": clusters, "solver": None}, "MISS"
+
+        for patcher in (
+            patch.object(clustering, "_read_date", return_value=(located, coordinates, [], len(located))),
+            patch.object(clustering, "_solve_cached", side_effect=solve),
+            patch.object(clustering.delivery_queries, "precomputed", side_effect=lambda db, key: self.store.get(key)),
+            patch.object(clustering.delivery_queries, "save_precomputed", side_effect=self._save),
+            patch.object(clustering.delivery_queries, "save_day_clusters", return_value="doc"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _save(self, db, key, data):
+        self.store[key] = data
+
+    def test_night_solve_with_a_fitted_driver_count_serves_the_requested_parameters(self):
+        # Four deliveries at one to three per driver cannot use the five drivers asked for.
+        params = {**{key: PROBLEM[key] for key in ("min_deliveries", "max_deliveries")}, "drivers_count": 5}
+        self.store[clustering.delivery_queries.LAST_REQUEST_DOC] = {"params": params}
+
+        outcomes = clustering.precluster_upcoming_dates(None, date(2026, 3, 14), days=1)
+        body, status = clustering.cluster_date(
+            None, clustering.ClusterDateRequest(**params, delivery_date=date(2026, 3, 14))
+        )
+
+        self.assertEqual(outcomes, {"2026-03-14": "computed"})
+        self.assertEqual(self.solved, [4])
+        self.assertEqual((status, body["precomputed"]), (201, True))
+        self.assertEqual(len(body["clusters"]), 4)
+
+
+class ZoneHistoryTests(unittest.TestCase):
+    def setUp(self):
+        self.store = {}
+        for patcher in (
+            patch.object(clustering.delivery_queries, "precomputed", side_effect=lambda db, key: self.store.get(key)),
+            patch.object(clustering.delivery_queries, "save_precomputed", side_effect=self._save),
+            patch.object(clustering.firestore, "client", return_value=None),
+            patch.object(clustering, "_zone_history", None),
+            patch.object(clustering, "_zone_history_loaded_at", None),
+            patch.object(clustering, "_zone_models", {}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _save(self, db, key, data):
+        self.store[key] = {**data, "computedAt": len(self.store)}
+
+    def test_requests_read_the_history_the_nightly_job_stored(self):
+        self.assertIsNone(clustering._get_zone_model(2))
+
+        day = PROBLEM["coords"]
+        with patch.object(
+            clustering, "_load_zone_history", return_value=[clustering.geo.latlon_array(day)] * 3
+        ) as load:
+            self.assertEqual(clustering.refresh_zone_history(None), 3)
+            with patch.object(clustering, "ZONE_MODEL_TTL_SECONDS", -1):
+                model = clustering._get_zone_model(2)
+
+        # Only the nightly job scanned the clusters collection.
+        load.assert_called_once()
+        self.assertEqual(len(model), 2)
+        self.assertEqual(model.capacities.sum(), len(day))
+
+
+class ClusterJobTests(unittest.TestCase):
+    def test_polling_does_not_wait_for_the_solver_imports(self):
+        job = {"status": clustering.jobs.JOB_RUNNING, "progress": "solving"}
+        with patch.object(clustering.admin_auth, "verify_id_token", return_value={"uid": "user"}), \
+                patch.object(clustering._get_cluster_job_store(), "get", return_value=job), \
+                patch.object(clustering, "_finish_imports") as finish_imports:
+            response = clustering.cluster_deliveries_k_means_job(_request("GET", query_string={"job_id": "job-1"}))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.get_data())["job_id"], "job-1")
+        finish_imports.assert_not_called()
+
+
+class InsertDeliveriesTests(unittest.TestCase):
+    def setUp(self):
+        auth = patch.object(clustering.admin_auth, "verify_id_token", return_value={"uid": "user"})
+        auth.start()
+        self.addCleanup(auth.stop)
+
+    def _post(self, clusters, **overrides):
+        body = {
+            "coords": PROBLEM["coords"],
+            "clusters": clusters,
+            "new_coords": [[38.905, -77.005]],
+            "max_deliveries": 3,
+            **overrides,
+        }
+        response = clustering.insert_deliveries(_request(json=body))
+        return response.status_code, json.loads(response.get_data())
+
+    def test_indices_outside_coords_or_listed_twice_are_rejected(self):
+        cases = {
+            "out of range": {"1": [0, 1], "2": [2, 4]},
+            "negative": {"1": [-1, 0], "2": [2, 3]},
+            "duplicate": {"1": [0, 1], "2": [1, 2, 3]},
+        }
+        for name, clusters in cases.items():
+            with self.subTest(name):
+                status, body = self._post(clusters)
+                self.assertEqual(status, 400)
+                self.assertIn("index", body["error"].lower())
+
+    def test_existing_points_no_cluster_lists_stay_unassigned(self):
+        status, body = self._post({"1": [0, 1], "2": [3]})
+
+        self.assertEqual(status, 200)
+        self.assertEqual(body["unassigned"], [2])
+        self.assertEqual(body["clusters"], {"1": [0, 1, 4], "2": [3]})
+
+    def test_new_points_without_room_are_a_409_that_lists_them(self):
+        # The first new delivery takes the last free slot; the second has nowhere to go.
+        new_coords = [[38.905, -77.005], [38.925, -77.025]]
+        status, body = self._post({"1": [0, 1], "2": [2]}, new_coords=new_coords, max_deliveries=2)
+
+        self.assertEqual(status, 409)
+        self.assertEqual(body["unplaced"], [5])
+
+
+class ColdStartTests(unittest.TestCase):
+    def test_import_builds_no_shared_state(self):
+        probe = (
+            "import sys, clustering\n"
+            "state = (clustering._admission, clustering._cluster_job_store, clustering._cluster_result_cache,"
+            " clustering._geocode_cache, clustering._geocode_rate_limiter)\n"
+            "loaded = [name for name in ('admission', 'geocoding', 'geocode_cache', 'jobs', 'result_cache')"
+            " if type(sys.modules[name]).__name__ == 'module']\n"
+            "print(state == (None,) * 5, loaded)"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", probe],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        self.assertEqual(output.strip(), "True []")
+
+
+if __name__ == "__main__":
+    unittest.main()
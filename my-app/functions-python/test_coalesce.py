@@ -0,0 +1,45 @@
+import unittest
+
+import numpy as np
+
+import constrained_kmeans
+from coalesce import coalesce
+
+
+class CoalesceTests(unittest.TestCase):
+    def test_co_located_points_merge_and_placeholders_are_quarantined(self):
+        latlon = np.array([
+            [38.90000, -77.00000],
+            [0.0, 0.0],
+            [38.90001, -76.99999],  # about 1.4 m from the first
+            [38.95000, -77.05000],
+            [38.90000, -77.00000],
+        ])
+        merged = coalesce(latlon, tolerance_km=0.015, projection="planar")
+
+        self.assertEqual(sorted(merged.weights.tolist()), [1, 3])
+        self.assertEqual(merged.quarantined.tolist(), [1])
+        building = int(np.argmax(merged.weights))
+        labels = np.repeat(np.arange(len(merged.weights)), merged.weights)
+        expanded = merged.expand(labels)
+        self.assertEqual(expanded[1], -1)
+        self.assertTrue((expanded[[0, 2, 4]] == building).all())
+        self.assertEqual(expanded[3], 1 - building)
+
+    def test_weighted_solve_counts_every_delivery_towards_the_limits(self):
+        rng = np.random.default_rng(5)
+        points = np.vstack([rng.normal((0, 0), 0.5, (10, 2)), rng.normal((20, 0), 0.5, (10, 2))])
+        weights = np.ones(20, dtype=np.int64)
+        # One building with 14 deliveries: more than a driver may take.
+        weights[0] = 14
+        result = constrained_kmeans.sparse_solve(points, 3, 5, 12, n_init=2, weights=weights)
+
+        self.assertEqual(len(result.labels), 33)
+        sizes = np.bincount(result.labels, minlength=3)
+        self.assertTrue(((sizes >= 5) & (sizes <= 12)).all())
+        # The building is split across drivers only as far as the limit requires.
+        self.assertEqual(len(set(result.labels[:14].tolist())), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
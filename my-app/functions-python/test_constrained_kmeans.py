@@ -0,0 +1,94 @@
+import unittest
+
+import numpy as np
+
+import assignment
+import constrained_kmeans
+
+
+def _blobs(centers, per_blob, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.vstack([rng.normal(center, 0.3, size=(per_blob, 2)) for center in centers])
+
+
+class WarmStartTests(unittest.TestCase):
+    def setUp(self):
+        self.points = _blobs([(0, 0), (10, 0), (0, 10)], per_blob=20)
+
+    def test_prior_labels_ignore_out_of_range_indices(self):
+        labels, ids = constrained_kmeans.prior_labels_from_clusters(
+            {"7": [0, 1, 99], "2": [], "3": [2]}, n_points=4
+        )
+
+        self.assertEqual(labels.tolist(), [0, 0, 1, -1])
+        self.assertEqual(ids, ["7", "3"])
+
+    def test_warm_start_fills_missing_seeds_with_farthest_points(self):
+        labels = np.full(len(self.points), -1)
+        labels[:20] = 0
+        centers, seed_ids = constrained_kmeans.warm_start_centers(self.points, labels, ["4"], 3)
+
+        self.assertEqual(seed_ids, ["4", None, None])
+        np.testing.assert_allclose(centers[0], self.points[:20].mean(axis=0))
+        self.assertEqual(constrained_kmeans.cluster_keys(seed_ids, 3), ["4", "1", "2"])
+
+    def test_warm_start_returns_none_without_prior_assignment(self):
+        centers, seed_ids = constrained_kmeans.warm_start_centers(
+            self.points, np.full(len(self.points), -1), [], 3
+        )
+
+        self.assertIsNone(centers)
+        self.assertEqual(constrained_kmeans.cluster_keys(seed_ids, 2), ["1", "2"])
+
+    def test_warm_solve_keeps_prior_areas_and_respects_sizes(self):
+        cold = constrained_kmeans.solve(self.points, 3, 15, 25)
+        labels, ids = constrained_kmeans.prior_labels_from_clusters(
+            {f"{label + 1}": np.flatnonzero(cold.labels == label).tolist() for label in range(3)},
+            len(self.points),
+        )
+        centers, seed_ids = constrained_kmeans.warm_start_centers(self.points, labels, ids, 3)
+
+        warm = constrained_kmeans.solve(self.points, 3, 15, 25, init=centers)
+
+        self.assertTrue(warm.warm_started)
+        self.assertEqual(warm.n_init, 1)
+        self.assertLessEqual(warm.n_iter, cold.n_iter)
+        keys = constrained_kmeans.cluster_keys(seed_ids, 3)
+        self.assertEqual(
+            [keys[label] for label in warm.labels], [f"{label + 1}" for label in cold.labels]
+        )
+        self.assertTrue(all(15 <= size <= 25 for size in np.bincount(warm.labels)))
+
+    def test_size_bounds_widen_max_to_fit_all_points(self):
+        self.assertEqual(constrained_kmeans.size_bounds(100, 3, 5, 20), (5, 34))
+        self.assertEqual(constrained_kmeans.size_bounds(30, 3, 5, 20), (5, 20))
+
+
+class SparseAssignmentTests(unittest.TestCase):
+    def test_sparse_solve_matches_dense_quality_within_size_limits(self):
+        points = _blobs([(x, y) for x in range(0, 50, 10) for y in range(0, 30, 10)], per_blob=12, seed=3)
+        dense = constrained_kmeans.solve(points, 15, 8, 14, n_init=3)
+        sparse = constrained_kmeans.sparse_solve(points, 15, 8, 14, n_init=3, candidates=3)
+
+        self.assertLessEqual(sparse.inertia, dense.inertia * 1.05)
+        self.assertTrue(all(8 <= size <= 14 for size in np.bincount(sparse.labels, minlength=15)))
+        self.assertGreaterEqual(sparse.candidates, 3)
+
+    def test_candidates_widen_until_the_limits_can_be_met(self):
+        costs = np.array([[0.0, 1.0, 2.0, 3.0]] * 8)
+        requested = []
+
+        def candidates_for(m):
+            requested.append(m)
+            return np.tile(np.arange(m), (8, 1)), costs[:, :m]
+
+        labels, used = assignment.sparse_assignment(candidates_for, 8, 4, 2, 2, candidates=1)
+
+        self.assertEqual(requested, [1, 2, 4])
+        self.assertEqual(used, 4)
+        np.testing.assert_array_equal(np.bincount(labels), [2, 2, 2, 2])
+        np.testing.assert_array_equal(labels, assignment.constrained_assignment(costs, 2, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
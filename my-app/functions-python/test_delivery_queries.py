@@ -0,0 +1,100 @@
+import unittest
+from datetime import date, datetime, timezone
+from unittest.mock import Mock
+
+import delivery_queries
+
+
+def _snapshot(doc_id, data, exists=True):
+    return Mock(id=doc_id, exists=exists, to_dict=Mock(return_value=data))
+
+
+class CoordinatePairTests(unittest.TestCase):
+    def test_accepts_lists_and_lat_lng_maps(self):
+        self.assertEqual(delivery_queries.coordinate_pair([38.9, -77.0]), (38.9, -77.0))
+        self.assertEqual(delivery_queries.coordinate_pair({"lat": "38.9", "lng": -77}), (38.9, -77.0))
+
+    def test_rejects_missing_malformed_and_placeholder_values(self):
+        for value in (None, [], [38.9], {"lat": 38.9}, ["a", "b"], [0, 0]):
+            self.assertIsNone(delivery_queries.coordinate_pair(value), value)
+
+
+class DeliveryQueriesTests(unittest.TestCase):
+    def setUp(self):
+        self.db = Mock()
+
+    def test_day_bounds_follow_the_local_timezone(self):
+        start, end = delivery_queries.day_bounds_utc(date(2025, 3, 9))
+        self.assertEqual(start, datetime(2025, 3, 9, 5, tzinfo=timezone.utc))
+        # Daylight saving time starts that night.
+        self.assertEqual(end, datetime(2025, 3, 10, 4, tzinfo=timezone.utc))
+
+    def test_event_client_ids_skip_events_without_a_client(self):
+        query = self.db.collection.return_value.where.return_value.where.return_value
+        query.stream.return_value = [
+            _snapshot("e1", {"clientId": "c1"}),
+            _snapshot("e2", {}),
+            _snapshot("e3", {"clientId": "c1"}),
+        ]
+        self.assertEqual(delivery_queries.event_client_ids(self.db, date(2025, 3, 9)), (["c1", "c1"], 3))
+
+    def test_client_coordinates_are_read_in_batches_of_the_coordinates_field(self):
+        client_ids = [f"c{i:04d}" for i in range(delivery_queries.GET_ALL_BATCH + 5)]
+
+        def get_all(refs, field_paths):
+            self.assertEqual(field_paths, ["coordinates"])
+            return [_snapshot(ref, {"coordinates": [38.9, -77.0]}) for ref in refs]
+
+        self.db.collection.return_value.document.side_effect = lambda client_id: client_id
+        self.db.get_all.side_effect = get_all
+        coordinates = delivery_queries.client_coordinates(self.db, client_ids + client_ids[:3])
+
+        self.assertEqual(self.db.get_all.call_count, 2)
+        self.assertEqual(sorted(coordinates), client_ids)
+
+    def test_client_coordinates_leave_out_unlocated_clients(self):
+        self.db.collection.return_value.document.side_effect = lambda client_id: client_id
+        self.db.get_all.return_value = [
+            _snapshot("c1", {"coordinates": {"lat": 38.9, "lng": -77.0}}),
+            _snapshot("c2", {"coordinates": [0, 0]}),
+            _snapshot("c3", None, exists=False),
+        ]
+        self.assertEqual(delivery_queries.client_coordinates(self.db, ["c1", "c2", "c3"]), {"c1": (38.9, -77.0)})
+
+    def test_save_day_clusters_replaces_an_existing_document(self):
+        existing = Mock(id="doc1")
+        self.db.collection.return_value.where.return_value.where.return_value.limit.return_value.stream.return_value = [
+            existing
+        ]
+        doc_id = delivery_queries.save_day_clusters(self.db, date(2025, 3, 9), {"1": ["c1", "c2", "c1"]})
+
+        self.assertEqual(doc_id, "doc1")
+        existing.reference.update.assert_called_once_with({
+            "clusters": [{"id": "1", "deliveries": ["c1", "c2"], "driver": "", "time": ""}],
+            "clientOverrides": [],
+        })
+
+    def test_save_day_clusters_creates_a_document_dated_at_utc_midnight(self):
+        self.db.collection.return_value.where.return_value.where.return_value.limit.return_value.stream.return_value = []
+        ref = self.db.collection.return_value.document.return_value
+        ref.id = "new"
+        doc_id = delivery_queries.save_day_clusters(self.db, date(2025, 3, 9), {"1": ["c1"]})
+
+        self.assertEqual(doc_id, "new")
+        saved = ref.set.call_args.args[0]
+        self.assertEqual(saved["docId"], "new")
+        self.assertEqual(saved["date"], datetime(2025, 3, 9, tzinfo=timezone.utc))
+        self.assertEqual(saved["clusters"][0]["deliveries"], ["c1"])
+
+    def test_precomputed_reads_one_document_per_key(self):
+        documents = self.db.collection.return_value.document
+        documents.return_value.get.return_value = _snapshot("2025-03-09", {"fingerprint": "abc"})
+        self.assertEqual(delivery_queries.precomputed(self.db, "2025-03-09"), {"fingerprint": "abc"})
+        documents.assert_called_with("2025-03-09")
+
+        documents.return_value.get.return_value = _snapshot("2025-03-10", None, exists=False)
+        self.assertIsNone(delivery_queries.precomputed(self.db, "2025-03-10"))
+
+
+if __name__ == "__main__":
+    unittest.main()
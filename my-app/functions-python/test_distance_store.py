@@ -0,0 +1,159 @@
+import multiprocessing
+import os
+import tempfile
+import unittest
+from datetime import date
+
+import numpy as np
+
+import distance_store
+import sequencing
+from distance_store import DistanceStore, haversine_km
+
+DAY = date(2026, 3, 14)
+
+
+def _points(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([rng.uniform(38.85, 38.95, n), rng.uniform(-77.08, -76.95, n)])
+
+
+def _ensure_in_process(root, prefix):
+    for step in range(5):
+        ids = [f"{prefix}{i}" for i in range(step * 20, step * 20 + 20)]
+        DistanceStore(root).ensure(DAY, ids, _points(20, seed=step))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class DistanceStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.store = DistanceStore(self.tempdir.name)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_haversine_matches_known_distance(self):
+        # White House to the Capitol is about 2.5 km.
+        km = haversine_km(np.array([[38.8977, -77.0365]]), np.array([[38.8899, -77.0091]]))
+        self.assertAlmostEqual(float(km[0, 0]), 2.54, places=1)
+
+    def test_matrix_persists_and_reopens_as_a_memory_map(self):
+        points = _points(10)
+        ids = [f"c{i}" for i in range(10)]
+        self.store.ensure(DAY, ids, points)
+
+        reopened = DistanceStore(self.tempdir.name).open(DAY)
+        self.assertIsInstance(reopened.matrix.base, np.memmap)
+        self.assertEqual(reopened.client_ids, ids)
+        np.testing.assert_allclose(reopened.matrix, haversine_km(points, points), rtol=1e-5, atol=1e-5)
+        self.assertIsNone(self.store.open(date(2026, 3, 15)))
+
+    def test_added_clients_only_compute_new_rows_and_columns(self):
+        points = _points(70)
+        ids = [f"c{i}" for i in range(70)]
+        self.store.ensure(DAY, ids[:40], points[:40])
+        self.assertEqual(self.store.computed_cells, 40 * 40)
+
+        # Past the 64-row initial capacity, so the file is reallocated too.
+        day = self.store.ensure(DAY, ids[30:], points[30:])
+        self.assertEqual(self.store.computed_cells, 40 * 40 + 30 * 70)
+        self.assertEqual(day.capacity, 128)
+        np.testing.assert_allclose(day.matrix, haversine_km(points, points), rtol=1e-5, atol=1e-5)
+
+        unchanged = self.store.ensure(DAY, ids[:10], points[:10])
+        self.assertEqual(self.store.computed_cells, 40 * 40 + 30 * 70)
+        self.assertEqual(unchanged.size, 70)
+
+    def test_moved_client_is_recomputed_in_place(self):
+        points = _points(5)
+        ids = ["a", "b", "c", "d", "e"]
+        self.store.ensure(DAY, ids, points)
+        points[2] = [38.99, -77.1]
+        day = self.store.ensure(DAY, ["c"], points[2:3])
+        self.assertEqual(day.size, 5)
+        np.testing.assert_allclose(day.matrix, haversine_km(points, points), rtol=1e-5, atol=1e-5)
+
+    def test_blocks_drive_stop_sequencing(self):
+        points = _points(12, seed=4)
+        ids = [f"c{i}" for i in range(12)]
+        day = self.store.ensure(DAY, ids, points)
+        rows = day.rows(ids)
+        labels = np.repeat([0, 1], 6)
+        stored = sequencing.sequence_clusters(points, labels, 2, lambda indices: day.block(rows[indices]))
+        self.assertEqual(sorted(stored[0].tolist()), list(range(6)))
+        self.assertEqual(sorted(stored[1].tolist()), list(range(6, 12)))
+
+    def test_unknown_metric_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.store.ensure(DAY, ["a"], [[38.9, -77.0]], metric="manhattan")
+        self.assertIn("road", distance_store.METRICS)
+
+
+class DistanceStoreLimitTests(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.root = self.tempdir.name
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def _days(self):
+        return sorted(name for name in os.listdir(self.root) if not name.startswith("."))
+
+    def test_capacity_stops_at_the_byte_budget(self):
+        # 100 x 100 float32 matrices at most.
+        store = DistanceStore(self.root, max_bytes=100 * 100 * 4)
+        ids = [f"c{i}" for i in range(101)]
+        points = _points(101)
+        store.ensure(DAY, ids[:40], points[:40])
+        # Doubling from 64 would pass the budget.
+        self.assertEqual(store.ensure(DAY, ids[:70], points[:70]).capacity, 100)
+        with self.assertRaises(distance_store.StoreFull):
+            store.ensure(DAY, ids, points)
+        with self.assertRaises(distance_store.StoreFull):
+            store.ensure(date(2026, 3, 15), ids, points)
+
+    def test_least_recently_used_days_are_evicted_past_the_budget(self):
+        clock = FakeClock()
+        store = DistanceStore(self.root, max_bytes=3 * 64 * 64 * 4, clock=clock)
+        for day in range(1, 4):
+            store.ensure(date(2026, 3, day), ["a"], [[38.9, -77.0]])
+        store.ensure(date(2026, 3, 1), ["a"], [[38.9, -77.0]])
+        store.ensure(date(2026, 3, 4), ["a"], [[38.9, -77.0]])
+
+        self.assertEqual(self._days(), ["2026-03-01-haversine", "2026-03-03-haversine", "2026-03-04-haversine"])
+        self.assertEqual(store.evicted, 1)
+
+    def test_days_unused_past_the_max_age_are_evicted(self):
+        store = DistanceStore(self.root, max_age_seconds=3600)
+        store.ensure(date(2026, 3, 1), ["a"], [[38.9, -77.0]])
+        meta = os.path.join(self.root, "2026-03-01-haversine", distance_store.META_FILE)
+        os.utime(meta, (store._clock() - 7200,) * 2)
+        store.ensure(DAY, ["a"], [[38.9, -77.0]])
+
+        self.assertEqual(self._days(), ["2026-03-14-haversine"])
+
+    def test_concurrent_writer_processes_keep_every_row(self):
+        context = multiprocessing.get_context("fork")
+        workers = [context.Process(target=_ensure_in_process, args=(self.root, prefix)) for prefix in "ab"]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(30)
+            self.assertEqual(worker.exitcode, 0)
+
+        day = DistanceStore(self.root).open(DAY)
+        self.assertEqual(day.size, 200)
+        np.testing.assert_allclose(day.matrix, haversine_km(day.coords, day.coords), rtol=1e-5, atol=1e-5)
+
+
+if __name__ == "__main__":
+    unittest.main()
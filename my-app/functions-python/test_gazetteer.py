@@ -0,0 +1,86 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+import geocoding
+from gazetteer import Gazetteer, gazetteer_key
+
+MAR_CSV = """\
+ADDRESS_ID,FULLADDRESS,LATITUDE,LONGITUDE,ZIPCODE
+1,1600 PENNSYLVANIA AVENUE NW,38.8977,-77.0365,20500
+2,1234 MAIN STREET NW,38.9100,-77.0300,20001
+3,1234 MAIN STREET NE,38.9100,-76.9900,20002
+4,450 FIRST STREET SE,38.8830,-77.0070,20003
+5,77 K STREET NE,38.9020,-77.0080,20002
+6,77 K PLACE NE,38.9025,-77.0085,20002
+7,,38.0,-77.0,
+"""
+
+
+class GazetteerTests(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.csv_path = os.path.join(self.tempdir.name, "address_points.csv")
+        with open(self.csv_path, "w", encoding="utf-8") as f:
+            f.write(MAR_CSV)
+        self.gazetteer = Gazetteer.from_csv(self.csv_path)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_keys_require_a_dc_street_address(self):
+        self.assertEqual(gazetteer_key("450 First Street Southeast, Washington, DC"), "450 1ST ST SE")
+        self.assertEqual(gazetteer_key("1234 Main St, Silver Spring, MD 20910"), "")
+        self.assertEqual(gazetteer_key("DECEASED"), "")
+
+    def test_exact_and_near_matches(self):
+        found = self.gazetteer.lookup_many([
+            "1600 Pennsylvania Ave NW, Washington, DC 20500",
+            "450 1st St SE Apt 2",
+            "1234A Main St NE",
+            "1600 Pennsylvania NW",
+            "77 K NE",
+            "1234 Main Ave NW",
+            "99 Nowhere St NW",
+        ])
+        self.assertEqual(found["1600 Pennsylvania Ave NW, Washington, DC 20500"], (38.8977, -77.0365, "20500"))
+        self.assertEqual(found["450 1st St SE Apt 2"][2], "20003")
+        self.assertEqual(found["1234A Main St NE"][:2], (38.91, -76.99))
+        self.assertIn("1600 Pennsylvania NW", found)
+        # Ambiguous ("K St" or "K Pl") and wrong street type do not match loosely.
+        self.assertNotIn("77 K NE", found)
+        self.assertNotIn("1234 Main Ave NW", found)
+        stats = self.gazetteer.stats()
+        self.assertEqual((stats["lookups"], stats["hits"], stats["near_hits"], stats["misses"]), (7, 2, 2, 3))
+        self.assertAlmostEqual(stats["hit_rate"], 0.571)
+
+    def test_saved_index_answers_the_same(self):
+        path = os.path.join(self.tempdir.name, "gazetteer.npz")
+        self.gazetteer.save(path)
+        loaded = Gazetteer.load(path)
+        self.assertEqual(len(loaded), 6)
+        self.assertEqual(loaded.lookup("77 K Place NE"), self.gazetteer.lookup("77 K Place NE"))
+
+    def test_batch_geocoding_only_sends_gazetteer_misses_to_the_provider(self):
+        calls = []
+
+        def geocode_one(address):
+            calls.append(address)
+            return (39.0, -77.1)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            coords, stats = geocoding.geocode_batch(
+                ["1234 Main Street NW", "10 Elm St, Bethesda, MD", "1234 main st nw"],
+                geocode_one,
+                max_workers=2,
+                gazetteer=self.gazetteer,
+            )
+        self.assertEqual(calls, ["10 Elm St, Bethesda, MD"])
+        self.assertEqual(coords, [(38.91, -77.03), (39.0, -77.1), (38.91, -77.03)])
+        self.assertEqual(stats.gazetteer, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+from math import cos, radians, sin
+
+import numpy as np
+
+import geo
+
+
+class GeoProjectionTests(unittest.TestCase):
+    def setUp(self):
+        self.coords = [(38.9072, -77.0369), (38.8462, -76.9750), (38.9847, -77.0947)]
+
+    def test_cartesian_matches_scalar_formula(self):
+        points = geo.to_cartesian(geo.latlon_array(self.coords))
+
+        for (lat, lon), point in zip(self.coords, points):
+            expected = (
+                6371 * cos(radians(lat)) * cos(radians(lon)),
+                6371 * cos(radians(lat)) * sin(radians(lon)),
+                6371 * sin(radians(lat)),
+            )
+            np.testing.assert_allclose(point, expected)
+
+    def test_planar_distances_match_cartesian_at_dc_scale(self):
+        latlon = geo.latlon_array(self.coords)
+        cartesian = geo.project(latlon, "cartesian")
+        planar = geo.project(latlon, "planar")
+
+        chord = np.linalg.norm(cartesian[0] - cartesian[1])
+        flat = np.linalg.norm(planar[0] - planar[1])
+
+        self.assertAlmostEqual(chord, flat, delta=chord * 0.001)
+
+    def test_latlon_array_reuses_contiguous_float_input(self):
+        source = np.array(self.coords, dtype=np.float64)
+
+        self.assertIs(geo.latlon_array(source), source)
+        self.assertEqual(geo.latlon_array([]).shape, (0, 2))
+        with self.assertRaises(ValueError):
+            geo.latlon_array([(38.9, -77.0, 1.0)])
+
+    def test_valid_mask_rejects_placeholder_and_out_of_range(self):
+        latlon = geo.latlon_array([(38.9, -77.0), (0.0, 0.0), (91.0, -77.0), (np.nan, 1.0)])
+
+        self.assertEqual(geo.valid_coordinate_mask(latlon).tolist(), [True, False, False, False])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+
+import geocode_cache
+import geocoding
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class GeocodeCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.store = geocode_cache.SQLiteGeocodeStore(os.path.join(self.tempdir.name, "cache", "geocode.sqlite3"))
+        self.clock = FakeClock()
+        self.cache = geocode_cache.GeocodeCache(
+            self.store, ttl_seconds=3600, negative_ttl_seconds=60, clock=self.clock
+        )
+
+    def tearDown(self):
+        self.store.close()
+        self.tempdir.cleanup()
+
+    def test_entries_expire_on_their_own_ttl(self):
+        self.cache.put_many([
+            self.cache.entry("1 Main St NW", geocode_cache.STATUS_OK, "test", 38.9, -77.0),
+            self.cache.entry("Nowhere", geocode_cache.STATUS_NOT_FOUND, "test"),
+        ])
+
+        self.assertEqual(self.cache.get("1 main st. nw")["lat"], 38.9)
+        self.assertEqual(self.cache.get("nowhere")["status"], geocode_cache.STATUS_NOT_FOUND)
+        self.clock.now += 61
+        self.assertIsNone(self.cache.get("Nowhere"))
+        self.assertIsNotNone(self.cache.get("1 Main St NW"))
+        self.assertEqual(self.cache.stats(), {"hits": 2, "negative_hits": 1, "misses": 1})
+
+    def test_failed_lookups_are_never_cached(self):
+        calls = []
+
+        def geocode_one(address):
+            calls.append(address)
+            raise RuntimeError("OVER_QUERY_LIMIT")
+
+        with self.assertLogs(level="ERROR"):
+            geocoding.geocode_batch(["1 Main St"], geocode_one, 1, cache=self.cache)
+            coords, stats = geocoding.geocode_batch(["1 Main St"], geocode_one, 1, cache=self.cache)
+
+        self.assertEqual((coords, stats.failed, len(calls)), ([(0.0, 0.0)], 1, 2))
+        # Entries from before failures were excluded are ignored as well.
+        self.store.put_many([self.cache.entry("2 Main St", geocode_cache.STATUS_FAILED, "test")])
+        self.cache.put_many([self.cache.entry("3 Main St", geocode_cache.STATUS_FAILED, "test")])
+        self.assertEqual(self.cache.get_many(["1 Main St", "2 Main St", "3 Main St"]), {})
+
+    def test_batch_geocoding_reads_through_the_cache(self):
+        calls = []
+
+        def geocode_one(address):
+            calls.append(address)
+            return None if address == "Nowhere" else (38.9, -77.0)
+
+        with self.assertLogs(level="WARNING"):
+            first, _ = geocoding.geocode_batch(["1 Main St", "Nowhere"], geocode_one, 2, cache=self.cache)
+            second, stats = geocoding.geocode_batch(["1 MAIN ST", "Nowhere"], geocode_one, 2, cache=self.cache)
+
+        self.assertEqual(first, second)
+        self.assertEqual(second, [(38.9, -77.0), (0.0, 0.0)])
+        self.assertEqual(sorted(calls), ["1 Main St", "Nowhere"])
+        self.assertEqual(stats.cached, 2)
+        self.assertEqual(self.cache.get("1 Main St")["source"], "google-geocoding")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import threading
+import unittest
+
+import geocoding
+
+
+class GeocodeBatchTests(unittest.TestCase):
+    def test_equivalent_addresses_are_geocoded_once_and_fanned_out(self):
+        calls = []
+
+        def geocode_one(address):
+            calls.append(address)
+            return {"1 MAIN ST NW": (38.9, -77.0), "2 OAK ST": None}.get(geocoding.normalize_address(address))
+
+        addresses = ["1 Main St NW", "2 Oak St", "1 main st., NW", "  1  MAIN ST NW ", "2 oak st"]
+        with self.assertLogs(level="WARNING"):
+            coords, stats = geocoding.geocode_batch(addresses, geocode_one, max_workers=4)
+
+        self.assertEqual(sorted(calls), ["1 Main St NW", "2 Oak St"])
+        self.assertEqual(coords, [(38.9, -77.0), (0.0, 0.0), (38.9, -77.0), (38.9, -77.0), (0.0, 0.0)])
+        self.assertEqual((stats.addresses, stats.unique), (5, 2))
+
+    def test_unique_addresses_run_concurrently_and_failures_map_to_placeholder(self):
+        barrier = threading.Barrier(3, timeout=5)
+
+        def geocode_one(address):
+            barrier.wait()
+            if address == "bad":
+                raise RuntimeError("provider error")
+            return (1.0, 2.0)
+
+        with self.assertLogs(level="ERROR"):
+            coords, stats = geocoding.geocode_batch(["a", "b", "bad"], geocode_one, max_workers=3)
+
+        self.assertEqual(coords, [(1.0, 2.0), (1.0, 2.0), (0.0, 0.0)])
+        self.assertEqual((stats.max_concurrency, stats.failed), (3, 1))
+        self.assertEqual(stats.summary()["unique"], 3)
+
+
+class RateLimiterTests(unittest.TestCase):
+    def test_waits_once_the_burst_is_spent(self):
+        now = [0.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+
+        limiter = geocoding.RateLimiter(2, burst=2, clock=lambda: now[0], sleep=sleep)
+        for _ in range(4):
+            limiter.acquire()
+
+        self.assertEqual(sleeps, [0.5, 0.5])
+
+
+if __name__ == "__main__":
+    unittest.main()
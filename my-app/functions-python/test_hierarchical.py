@@ -0,0 +1,48 @@
+import unittest
+
+import numpy as np
+
+import hierarchical
+
+
+class HierarchicalClusteringTests(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.points = rng.normal(0.0, 5.0, size=(900, 2))
+
+    def test_partition_gives_every_region_a_feasible_driver_share(self):
+        regions = hierarchical.partition_regions(self.points, 45, 10, 30, max_region_points=120)
+
+        self.assertEqual(sum(region.n_clusters for region in regions), 45)
+        self.assertEqual(
+            sorted(np.concatenate([region.indices for region in regions]).tolist()),
+            list(range(len(self.points))),
+        )
+        for region in regions:
+            self.assertLessEqual(len(region.indices), 120)
+            self.assertGreaterEqual(len(region.indices), region.n_clusters * 10)
+            self.assertLessEqual(len(region.indices), region.n_clusters * 30)
+
+    def test_partition_rejects_infeasible_sizes(self):
+        with self.assertRaises(ValueError):
+            hierarchical.partition_regions(self.points, 10, 100, 120)
+
+    def test_solve_merges_region_labels_within_size_limits(self):
+        result = hierarchical.solve(self.points, 45, 10, 30, max_region_points=200, max_workers=1)
+
+        sizes = np.bincount(result.labels, minlength=45)
+        self.assertEqual(len(sizes), 45)
+        self.assertTrue(((sizes >= 10) & (sizes <= 30)).all())
+        self.assertGreater(result.regions, 1)
+
+    def test_deadline_only_bounds_the_solve(self):
+        expected = hierarchical.solve(self.points, 45, 10, 30, max_region_points=200, max_workers=1)
+        result = hierarchical.solve(self.points, 45, 10, 30, max_region_points=200, max_workers=1, deadline_seconds=60)
+        np.testing.assert_array_equal(result.labels, expected.labels)
+
+        with self.assertRaises(TimeoutError):
+            hierarchical.solve(self.points, 45, 10, 30, max_region_points=200, max_workers=1, deadline_seconds=1e-6)
+
+
+if __name__ == "__main__":
+    unittest.main()
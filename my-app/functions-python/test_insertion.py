@@ -0,0 +1,59 @@
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+import insertion
+from insertion import InsertionInfeasible, insert_points
+
+
+def _line_of_clusters(sizes, spacing=10.0):
+    """Clusters of tight points centred at 0, spacing, 2 * spacing, ... along the x axis."""
+    points = np.array([[label * spacing + 0.01 * i, 0.0] for label, size in enumerate(sizes) for i in range(size)])
+    labels = np.repeat(np.arange(len(sizes)), sizes)
+    return points, labels
+
+
+class InsertPointsTests(unittest.TestCase):
+    def test_points_join_the_nearest_cluster_with_room(self):
+        points, labels = _line_of_clusters([3, 3, 3])
+        result = insert_points(points, labels, np.array([[19.0, 0.5], [1.0, -0.5]]), 3, size_max=4)
+        self.assertEqual(result.labels.tolist(), [2, 0])
+        self.assertEqual((result.moved, result.repairs), ({}, 0))
+
+    def test_full_nearest_cluster_spills_to_the_next_one(self):
+        points, labels = _line_of_clusters([3, 3, 3])
+        result = insert_points(points, labels, np.array([[0.5, 0.0], [0.6, 0.0]]), 3, size_max=4)
+        self.assertEqual(result.labels.tolist(), [0, 1])
+        self.assertEqual(result.repairs, 0)
+
+    def test_repair_moves_one_member_when_every_candidate_is_full(self):
+        points, labels = _line_of_clusters([3, 3, 1])
+        with patch.object(insertion, "CANDIDATE_CLUSTERS", 2):
+            result = insert_points(points, labels, np.array([[0.5, 0.0]]), 3, size_max=3)
+        # Cluster 1 hands its member nearest to cluster 2 over and takes the new point.
+        self.assertEqual(result.labels.tolist(), [1])
+        self.assertEqual(result.moved, {5: 2})
+        self.assertEqual(result.repairs, 1)
+        self.assertEqual(labels.tolist(), [0, 0, 0, 1, 1, 1, 2])
+
+    def test_points_without_room_nearby_are_reported_unplaced(self):
+        points, labels = _line_of_clusters([2, 1])
+        result = insert_points(points, labels, np.array([[10.0, 1.0], [0.0, 1.0]]), 2, size_max=2)
+        self.assertEqual(result.labels.tolist(), [1, -1])
+        self.assertEqual(result.unplaced, [1])
+
+    def test_no_assigned_points_is_infeasible(self):
+        points, labels = _line_of_clusters([2, 2])
+        with self.assertRaises(InsertionInfeasible):
+            insert_points(points, np.full(len(points), -1), np.array([[0.0, 1.0]]), 2, size_max=2)
+
+    def test_unassigned_points_and_empty_clusters_are_ignored(self):
+        points, labels = _line_of_clusters([2, 2])
+        labels[1] = -1
+        result = insert_points(points, labels, np.array([[30.0, 0.0]]), 3, size_max=5)
+        self.assertEqual(result.labels.tolist(), [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
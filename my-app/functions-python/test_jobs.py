@@ -0,0 +1,49 @@
+import json
+import unittest
+
+import jobs
+
+
+class JobStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.store = jobs.InMemoryJobStore()
+        self.store.create("job-1", jobs.new_job(json.dumps({"drivers_count": 2})))
+
+    def test_job_runs_once_and_records_result(self):
+        stages = []
+
+        def solve(request, report_progress):
+            report_progress("solving")
+            stages.append(self.store.get("job-1")["progress"])
+            return {"clusters": {"1": [0]}, "drivers": request["drivers_count"]}
+
+        jobs.run_job(self.store, "job-1", solve)
+        jobs.run_job(self.store, "job-1", solve)
+
+        status = jobs.job_status("job-1", self.store.get("job-1"))
+        self.assertEqual(stages, ["solving"])
+        self.assertEqual(status["status"], jobs.JOB_SUCCEEDED)
+        self.assertEqual(status["result"], {"clusters": {"1": [0]}, "drivers": 2})
+        self.assertIn("finishedAt", status)
+
+    def test_failed_job_reports_error(self):
+        def solve(request, report_progress):
+            raise ValueError("min_deliveries cannot be greater than max_deliveries.")
+
+        with self.assertLogs(level="ERROR"):
+            jobs.run_job(self.store, "job-1", solve)
+
+        status = jobs.job_status("job-1", self.store.get("job-1"))
+        self.assertEqual(status["status"], jobs.JOB_FAILED)
+        self.assertEqual(status["error"], "min_deliveries cannot be greater than max_deliveries.")
+        self.assertNotIn("result", status)
+
+    def test_queued_job_status_has_no_result(self):
+        status = jobs.job_status("job-1", self.store.get("job-1"))
+
+        self.assertEqual((status["status"], status["progress"]), (jobs.JOB_QUEUED, "queued"))
+        self.assertNotIn("result", status)
+
+
+if __name__ == "__main__":
+    unittest.main()
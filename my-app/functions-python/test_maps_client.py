@@ -0,0 +1,53 @@
+import unittest
+
+import googlemaps
+
+import maps_client
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class MapsClientHolderTests(unittest.TestCase):
+    def setUp(self):
+        self.keys = iter(["key-1", "key-2", "key-3"])
+        self.clock = FakeClock()
+        self.holder = maps_client.MapsClientHolder(
+            lambda: next(self.keys), lambda key: {"key": key}, ttl_seconds=60, clock=self.clock
+        )
+
+    def test_client_is_reused_until_the_ttl(self):
+        first = self.holder.client()
+        self.assertIs(self.holder.client(), first)
+
+        self.clock.now = 61
+        self.assertEqual(self.holder.client(), {"key": "key-2"})
+        self.assertEqual(self.holder.stats()["hits"], 1)
+        self.assertEqual(self.holder.stats()["refreshes"], 2)
+
+    def test_rejected_key_is_reloaded_and_the_call_retried(self):
+        def geocode(client):
+            if client["key"] == "key-1":
+                raise googlemaps.exceptions.ApiError("REQUEST_DENIED", "The provided API key is invalid.")
+            return client["key"]
+
+        with self.assertLogs(level="WARNING"):
+            self.assertEqual(self.holder.call(geocode), "key-2")
+        self.assertEqual(self.holder.stats()["auth_refreshes"], 1)
+
+    def test_other_errors_do_not_reload_the_key(self):
+        def geocode(client):
+            raise googlemaps.exceptions.ApiError("OVER_QUERY_LIMIT")
+
+        with self.assertRaises(googlemaps.exceptions.ApiError):
+            self.holder.call(geocode)
+        self.assertEqual(self.holder.stats()["refreshes"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,30 @@
+import unittest
+
+import numpy as np
+
+import multistart
+
+
+class MultiStartTests(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.points = rng.normal(0.0, 5.0, size=(120, 2))
+
+    def test_keeps_best_feasible_start_when_all_finish(self):
+        outcome = multistart.solve(self.points, 4, 20, 40, starts=3, deadline_seconds=60, max_workers=2)
+
+        self.assertFalse(outcome.timed_out)
+        self.assertEqual(outcome.starts_completed, 3)
+        sizes = np.bincount(outcome.result.labels, minlength=4)
+        self.assertTrue(((sizes >= 20) & (sizes <= 40)).all())
+
+    def test_reports_timeout_when_deadline_passes_first(self):
+        outcome = multistart.solve(self.points, 4, 20, 40, starts=2, deadline_seconds=1e-6, max_workers=1)
+
+        self.assertTrue(outcome.timed_out)
+        self.assertIsNone(outcome.result)
+        self.assertEqual(outcome.starts_completed, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import gzip
+import unittest
+
+import numpy as np
+
+import payloads
+
+
+class PayloadTests(unittest.TestCase):
+    def setUp(self):
+        self.latlon = np.array([[38.9, -77.0], [38.85, -76.95], [0.0, 0.0]])
+
+    def test_decode_is_a_view_of_the_body(self):
+        body = self.latlon.astype("<f8").tobytes()
+
+        decoded = payloads.decode_coords(body, None, 10)
+
+        np.testing.assert_array_equal(decoded, self.latlon)
+        self.assertFalse(decoded.flags.owndata)
+        self.assertIsNone(payloads.coordinate_error(decoded))
+
+    def test_decode_gzip_and_limits(self):
+        body = gzip.compress(self.latlon.astype("<f8").tobytes())
+
+        np.testing.assert_array_equal(payloads.decode_coords(body, "gzip", 3), self.latlon)
+        with self.assertRaisesRegex(payloads.PayloadError, "Too many"):
+            payloads.decode_coords(body, "gzip", 2)
+        with self.assertRaisesRegex(payloads.PayloadError, "multiple of 16"):
+            payloads.decode_coords(b"\0" * 20, None, 10)
+
+    def test_coordinate_error_reports_first_bad_row(self):
+        latlon = np.vstack([self.latlon, [[91.0, 0.0], [np.nan, 1.0]]])
+
+        self.assertIn("index 3", payloads.coordinate_error(latlon))
+
+    def test_encode_clusters_round_trip(self):
+        clusters = {"b": [1, 3], "a": [0, 2, 4]}
+        sequences = {"b": [3, 1], "a": [2, 0, 4]}
+
+        body, keys = payloads.encode_clusters(clusters, 5, sequences)
+
+        values = np.frombuffer(body, dtype=payloads.LABEL_DTYPE)
+        self.assertEqual(keys, ["b", "a"])
+        self.assertEqual(values[:5].tolist(), [1, 0, 1, 0, 1])
+        self.assertEqual(values[5:].tolist(), [3, 1, 2, 0, 4])
+
+    def test_compress_only_when_accepted_and_large(self):
+        large = bytes(4096)
+
+        self.assertEqual(payloads.compress(large, "gzip, deflate")[1], "gzip")
+        self.assertEqual(payloads.compress(large, None), (large, None))
+        self.assertIsNone(payloads.compress(b"small", "gzip")[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+
+import numpy as np
+
+from polygon_index import PolygonIndex, points_in_edges, _feature_rings, _ring_edges
+
+
+def _square(x0, y0, x1, y1):
+    return [[x0, y0], [x1, y0], [x1, y1], [x0, y1], [x0, y0]]
+
+
+def _collection():
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                # Square with a square hole.
+                "properties": {"WARD": "1"},
+                "geometry": {"type": "Polygon", "coordinates": [_square(0, 0, 1, 1), _square(0.4, 0.4, 0.6, 0.6)]},
+            },
+            {
+                # Two parts, one of them inside the other feature's hole.
+                "properties": {"WARD": "2"},
+                "geometry": {
+                    "type": "MultiPolygon",
+                    "coordinates": [[_square(1, 0, 2, 1)], [_square(0.45, 0.45, 0.55, 0.55)]],
+                },
+            },
+            {"properties": {"WARD": ""}, "geometry": {"type": "Polygon", "coordinates": [_square(5, 5, 6, 6)]}},
+            {"properties": {"WARD": "3"}, "geometry": {"type": "Point", "coordinates": [3, 3]}},
+        ],
+    }
+
+
+class PolygonIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.index = PolygonIndex.from_geojson(_collection(), lambda p: p.get("WARD", ""), cell_degrees=0.07)
+
+    def test_only_named_polygon_features_are_indexed(self):
+        self.assertEqual(self.index.names, ["1", "2"])
+
+    def test_holes_and_multipolygons(self):
+        lng = [0.1, 0.42, 0.5, 1.5, 2.5, 5.5]
+        lat = [0.1, 0.42, 0.5, 0.5, 0.5, 5.5]
+        self.assertEqual(self.index.lookup(lat, lng).tolist(), ["1", "", "2", "2", "", ""])
+
+    def test_scalar_and_non_finite_points(self):
+        self.assertEqual(self.index.lookup(0.2, 0.2).tolist(), ["1"])
+        self.assertEqual(self.index.lookup([np.nan], [0.2]).tolist(), [""])
+
+    def test_grid_lookup_matches_brute_force_ray_test(self):
+        rng = np.random.default_rng(3)
+        lng = rng.uniform(-0.2, 2.2, 5000)
+        lat = rng.uniform(-0.2, 1.2, 5000)
+        expected = np.full(len(lng), "", dtype=object)
+        for feature in reversed(_collection()["features"][:2]):
+            edges = _ring_edges(_feature_rings(feature["geometry"]))
+            expected[points_in_edges(lng, lat, edges)] = feature["properties"]["WARD"]
+        self.assertEqual(self.index.lookup(lat, lng).tolist(), expected.tolist())
+
+
+if __name__ == "__main__":
+    unittest.main()
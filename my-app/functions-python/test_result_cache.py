@@ -0,0 +1,99 @@
+import threading
+import time
+import unittest
+
+import numpy as np
+
+import result_cache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ResultCacheTests(unittest.TestCase):
+    def test_fingerprint_depends_on_coordinates_and_parameters(self):
+        coords = np.array([[38.9, -77.0], [38.8, -76.9]])
+        params = {"drivers_count": 2, "min_deliveries": 1, "max_deliveries": 5}
+
+        key = result_cache.request_fingerprint(coords, params)
+
+        self.assertEqual(key, result_cache.request_fingerprint(coords.tolist(), dict(reversed(params.items()))))
+        self.assertNotEqual(key, result_cache.request_fingerprint(coords[::-1], params))
+        self.assertNotEqual(key, result_cache.request_fingerprint(coords, {**params, "drivers_count": 1}))
+
+    def test_ttl_cache_expires_and_evicts_least_recent(self):
+        clock = FakeClock()
+        cache = result_cache.TTLCache(max_entries=2, ttl_seconds=10, clock=clock)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        clock.now = 11
+        self.assertIsNone(cache.get("a"))
+
+    def test_hits_misses_and_uncacheable_results(self):
+        cache = result_cache.ResultCache(result_cache.TTLCache(8, 60))
+
+        self.assertEqual(cache.get_or_compute("k", lambda: ({"v": 1}, True)), ({"v": 1}, result_cache.MISS))
+        self.assertEqual(cache.get_or_compute("k", lambda: ({"v": 2}, True)), ({"v": 1}, result_cache.HIT))
+        cache.get_or_compute("partial", lambda: ({"v": 3}, False))
+        self.assertEqual(cache.get_or_compute("partial", lambda: ({"v": 4}, True))[0], {"v": 4})
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+
+    def test_concurrent_identical_requests_share_one_computation(self):
+        cache = result_cache.ResultCache(result_cache.TTLCache(8, 60))
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+        statuses = []
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return {"v": 1}, True
+
+        leader = threading.Thread(target=lambda: statuses.append(cache.get_or_compute("k", compute)[1]))
+        leader.start()
+        started.wait(5)
+        followers = [
+            threading.Thread(target=lambda: statuses.append(cache.get_or_compute("k", compute)[1]))
+            for _ in range(3)
+        ]
+        for follower in followers:
+            follower.start()
+        time.sleep(0.2)
+        release.set()
+        for thread in [leader, *followers]:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(statuses.count(result_cache.MISS), 1)
+        self.assertEqual(len(statuses), 4)
+
+    def test_firestore_store_failures_fall_back_to_compute(self):
+        class BrokenStore:
+            def get(self, key):
+                raise RuntimeError("unavailable")
+
+            def put(self, key, value):
+                raise RuntimeError("unavailable")
+
+        cache = result_cache.ResultCache(result_cache.TTLCache(8, 60), BrokenStore())
+
+        with self.assertLogs(level="WARNING"):
+            value, status = cache.get_or_compute("k", lambda: ({"v": 1}, True))
+
+        self.assertEqual((value, status), ({"v": 1}, result_cache.MISS))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import tempfile
+import unittest
+
+import numpy as np
+
+import constrained_kmeans
+import geo
+import road_clustering
+import road_network
+
+
+def _river_graph(path):
+    """Two north-south streets 170 m apart, joined by a single bridge 5 km north."""
+    lats = np.round(np.arange(38.900, 38.9501, 0.001), 3)
+    west = np.column_stack([lats, np.full(len(lats), -77.001)])
+    east = np.column_stack([lats, np.full(len(lats), -76.999)])
+    nodes = np.vstack([west, east])
+    step_km = 0.111
+    edges = [(i, i + 1, step_km) for i in range(len(lats) - 1)]
+    edges += [(len(lats) + i, len(lats) + i + 1, step_km) for i in range(len(lats) - 1)]
+    edges.append((len(lats) - 1, 2 * len(lats) - 1, 0.17))
+    road_network.build_graph(path, nodes, edges)
+
+
+class RoadNetworkTests(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        _river_graph(self.tempdir.name)
+        self.graph = road_network.RoadGraph(self.tempdir.name)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_graph_files_are_memory_mapped(self):
+        self.assertTrue(road_network.graph_exists(self.tempdir.name))
+        self.assertIsInstance(self.graph.nodes, np.memmap)
+
+    def test_crossing_the_river_goes_through_the_bridge(self):
+        distances = self.graph.distances_from([0])
+
+        self.assertAlmostEqual(distances[0, 51], 50 * 0.111 * 2 + 0.17, places=3)
+        self.graph.distances_from([0, 0])
+        self.assertEqual((self.graph.cache_misses, self.graph.cache_hits), (1, 1))
+
+    def test_road_clusters_follow_river_banks(self):
+        lats = 38.900 + 0.002 * np.arange(5)
+        latlon = np.vstack([
+            np.column_stack([lats, np.full(5, -77.001)]),
+            np.column_stack([lats, np.full(5, -76.999)]),
+        ])
+
+        straight = constrained_kmeans.solve(geo.to_local_planar(latlon), 2, 5, 5)
+        road = road_clustering.solve(latlon, self.graph, 2, 5, 5)
+
+        self.assertEqual(len(set(road.labels[:5])), 1)
+        self.assertEqual(len(set(road.labels[5:])), 1)
+        self.assertNotEqual(road.labels[0], road.labels[5])
+        self.assertNotEqual(len(set(straight.labels[:5])), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
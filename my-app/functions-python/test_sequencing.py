@@ -0,0 +1,42 @@
+import itertools
+import unittest
+
+import numpy as np
+
+import sequencing
+
+
+class SequencingTests(unittest.TestCase):
+    def test_small_routes_match_brute_force(self):
+        rng = np.random.default_rng(3)
+        for size in range(3, 8):
+            block = sequencing.distance_block(rng.random((size, 2)))
+
+            order = sequencing.sequence_blocks([block])[0]
+
+            best = min(sequencing.route_length(block, p) for p in itertools.permutations(range(size)))
+            self.assertEqual(sorted(order.tolist()), list(range(size)))
+            self.assertAlmostEqual(sequencing.route_length(block, order), best, places=9)
+
+    def test_stops_along_a_street_are_visited_end_to_end(self):
+        points = np.column_stack([[4.0, 0.0, 3.0, 1.0, 2.0], np.zeros(5)])
+
+        order = sequencing.sequence_blocks([sequencing.distance_block(points)])[0]
+
+        self.assertIn(order.tolist(), ([1, 3, 4, 2, 0], [0, 2, 4, 3, 1]))
+
+    def test_sequence_clusters_returns_each_clusters_points(self):
+        rng = np.random.default_rng(5)
+        points = rng.random((60, 2))
+        labels = np.repeat(np.arange(6), [1, 2, 9, 12, 17, 19])
+
+        orders = sequencing.sequence_clusters(points, labels, 7)
+
+        self.assertEqual(len(orders), 7)
+        self.assertEqual(len(orders[6]), 0)
+        for label, order in enumerate(orders[:6]):
+            self.assertEqual(sorted(order.tolist()), np.flatnonzero(labels == label).tolist())
+
+
+if __name__ == "__main__":
+    unittest.main()
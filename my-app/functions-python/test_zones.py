@@ -0,0 +1,76 @@
+import unittest
+
+import numpy as np
+
+import geo
+import zones
+from zones import ZoneModel
+
+AREAS = np.array([
+    (38.86, -76.99), (38.93, -77.03), (38.90, -76.95), (38.95, -77.08), (38.84, -77.01),
+    (38.97, -77.00), (38.88, -77.06), (38.91, -76.91), (38.82, -76.97), (38.99, -77.05),
+])
+SIZES = [30, 24, 20, 16, 16, 12, 10, 8, 6, 4]
+
+
+def _day(seed, sizes=SIZES, spread=0.004):
+    rng = np.random.default_rng(seed)
+    # Points only: cluster ids are not comparable between days.
+    day = np.vstack([rng.normal(center, spread, (size, 2)) for center, size in zip(AREAS, sizes)])
+    return day[rng.permutation(len(day))]
+
+
+def _km(a, b):
+    return np.linalg.norm(geo.to_cartesian(a) - geo.to_cartesian(b), axis=1)
+
+
+class ZoneModelTests(unittest.TestCase):
+    def setUp(self):
+        history = [_day(seed) for seed in range(6)]
+        history[0] = np.vstack([history[0], [[0.0, 0.0]]])
+        self.model = ZoneModel.from_history(history, len(AREAS))
+
+    def _zone_of_area(self):
+        _, zone = zones.cKDTree(self.model.centers).query(AREAS)
+        return zone
+
+    def test_zones_follow_where_deliveries_are(self):
+        zone = self._zone_of_area()
+        self.assertEqual(sorted(zone.tolist()), list(range(len(AREAS))))
+        self.assertLess(_km(self.model.centers[zone], AREAS).max(), 0.3)
+        self.assertEqual(self.model.capacities[zone].tolist(), SIZES)
+
+    def test_rebuild_from_the_previous_centers_keeps_zone_ids(self):
+        rebuilt = ZoneModel.from_history([_day(seed) for seed in range(3, 9)], len(AREAS), init=self.model.centers)
+        self.assertLess(_km(rebuilt.centers, self.model.centers).max(), 0.3)
+
+    def test_too_few_locations_for_the_zones(self):
+        self.assertIsNone(ZoneModel.from_history([AREAS[:3]], 4))
+
+    def test_routine_day_takes_the_nearest_zone(self):
+        result = zones.assign(_day(20), self.model, 3, 40)
+
+        self.assertEqual((result.imbalance, result.moved), (0.0, 0))
+        sizes = np.bincount(result.labels, minlength=len(AREAS))
+        self.assertEqual(sizes[self._zone_of_area()].tolist(), SIZES)
+
+    def test_zone_capacity_bounds_the_assignment(self):
+        # The biggest area has 3 more deliveries than its share plus 15% allows.
+        sizes = list(SIZES)
+        sizes[0] += 8
+        result = zones.assign(_day(21, sizes), self.model, 3, 40)
+
+        zone = self._zone_of_area()
+        limits = self.model.limits(sum(sizes), 3, 40, zones.DEFAULT_MAX_IMBALANCE)
+        counts = np.bincount(result.labels, minlength=len(AREAS))
+        self.assertTrue((counts <= limits).all())
+        self.assertEqual(counts[zone[0]], limits[zone[0]])
+        self.assertGreater(result.moved, 0)
+
+    def test_day_unlike_the_history_needs_the_full_solve(self):
+        sizes = [4, 4, 4, 4, 4, 4, 4, 4, 4, 60]
+        self.assertIsNone(zones.assign(_day(22, sizes), self.model, 3, 40))
+
+
+if __name__ == "__main__":
+    unittest.main()
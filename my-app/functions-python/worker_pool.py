@@ -0,0 +1,32 @@
+"""Process-pool settings shared by the CPU-bound clustering modes."""
+import multiprocessing
+import os
+
+
+def _env_int(name: str, default: int) -> int:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        return default
+    return value if value > 0 else default
+
+
+def worker_count() -> int:
+    """Worker processes to use; each one holds its own NumPy/scikit-learn heap."""
+    return _env_int("CLUSTER_WORKERS", min(4, os.cpu_count() or 1))
+
+
+def mp_context():
+    # Forking a process that already runs gRPC/Firestore threads can deadlock the
+    # child, so workers start from a clean forkserver (spawn where unavailable).
+    method = os.getenv("CLUSTER_MP_START_METHOD")
+    if not method:
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    context = multiprocessing.get_context(method)
+    if method == "forkserver":
+        # Import the solver once in the server instead of in every worker.
+        context.set_forkserver_preload(["constrained_kmeans"])
+    return context
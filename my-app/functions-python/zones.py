@@ -0,0 +1,153 @@
+"""Fast assignment to stable service areas learned from past delivery days.
+
+Cluster ids in the saved ``clusters`` documents are not comparable across days
+(each solve numbers its clusters afresh), so zones are learned from geography
+alone: the deliveries of recent days are pooled and split into ``k`` zones by
+k-means. A zone's capacity is its median number of deliveries per past day.
+A new day is assigned by a KD-tree nearest-zone lookup (O(n log k)), with each
+zone holding at most its share of the day plus the allowed imbalance. When the
+nearest zones break those limits, one min-cost-flow pass over each point's
+nearest zones rebalances them. Days too far from the historical shape are
+left to the full solver.
+"""
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+import numpy as np
+from scipy.spatial import cKDTree
+from sklearn.cluster import KMeans
+
+import assignment
+import geo
+
+DEFAULT_MAX_IMBALANCE = 0.15
+REBALANCE_CANDIDATES = 4
+# Pooled history is subsampled to this many points before k-means.
+MAX_HISTORY_POINTS = 20000
+
+
+@dataclass
+class ZoneModel:
+    ids: List[str]
+    # (k, 2) lat/lon.
+    centers: np.ndarray
+    # Median deliveries per past day in each zone.
+    capacities: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_history(
+        cls,
+        history: Sequence[np.ndarray],
+        n_zones: int,
+        init: Optional[np.ndarray] = None,
+        random_state: int = 0,
+    ) -> Optional["ZoneModel"]:
+        """Split the deliveries of past days (one (n, 2) lat/lon array per day) into ``n_zones`` zones.
+
+        ``init`` (lat/lon centers of an earlier model with as many zones) keeps
+        zone ids in place across rebuilds. None when the history has fewer
+        distinct locations than zones.
+        """
+        days = [geo.latlon_array(latlon) for latlon in history]
+        days = [latlon[geo.valid_coordinate_mask(latlon)] for latlon in days]
+        day_of = np.concatenate([np.full(len(latlon), day) for day, latlon in enumerate(days)] or [[]]).astype(np.int64)
+        pooled = np.vstack([latlon for latlon in days if len(latlon)] or [np.empty((0, 2))])
+        if len(np.unique(pooled, axis=0)) < n_zones:
+            return None
+        if len(pooled) > MAX_HISTORY_POINTS:
+            keep = np.random.default_rng(random_state).choice(len(pooled), MAX_HISTORY_POINTS, replace=False)
+            pooled, day_of = pooled[keep], day_of[keep]
+
+        origin = tuple(pooled.mean(axis=0))
+        points = geo.to_local_planar(pooled, origin=origin)
+        if init is not None and len(init) == n_zones:
+            kmeans = KMeans(n_zones, init=geo.to_local_planar(init, origin=origin), n_init=1, random_state=random_state)
+        else:
+            kmeans = KMeans(n_zones, n_init=4, random_state=random_state)
+        labels = kmeans.fit_predict(points)
+
+        centers = np.array([pooled[labels == zone].mean(axis=0) for zone in range(n_zones)])
+        per_day = np.zeros((len(days), n_zones), dtype=np.int64)
+        np.add.at(per_day, (day_of, labels), 1)
+        active = per_day.sum(axis=1) > 0
+        return cls(
+            ids=[str(zone + 1) for zone in range(n_zones)],
+            centers=centers,
+            capacities=np.median(per_day[active], axis=0),
+        )
+
+    def limits(self, n_points: int, size_min: int, size_max: int, max_imbalance: float) -> np.ndarray:
+        """Per-zone upper limits for a day of ``n_points``: each zone's share of the day, plus ``max_imbalance``."""
+        total = self.capacities.sum()
+        share = self.capacities / total if total > 0 else np.full(len(self), 1 / len(self))
+        upper = np.ceil(share * n_points * (1 + max_imbalance)).astype(np.int64)
+        return np.clip(upper, size_min, size_max)
+
+
+@dataclass
+class ZoneAssignment:
+    labels: np.ndarray
+    # Share of points that fell outside the size limits on the nearest-zone pass.
+    imbalance: float
+    # Points the rebalancing pass moved away from their nearest zone.
+    moved: int
+    # Sum of squared km to the zone centers.
+    inertia: float
+
+
+def project_centers(centers: np.ndarray, latlon: np.ndarray, projection: str) -> np.ndarray:
+    """Zone centers in the same frame as ``geo.project(latlon, projection)``."""
+    if projection == "planar":
+        return geo.to_local_planar(centers, origin=tuple(latlon.mean(axis=0)))
+    return geo.project(centers, projection)
+
+
+def _overflow(sizes: np.ndarray, size_min: int, upper: np.ndarray) -> int:
+    return int(np.maximum(sizes - upper, 0).sum() + np.maximum(size_min - sizes, 0).sum())
+
+
+def assign(
+    latlon: np.ndarray,
+    zones: ZoneModel,
+    size_min: int,
+    size_max: int,
+    max_imbalance: float = DEFAULT_MAX_IMBALANCE,
+) -> Optional[ZoneAssignment]:
+    """Label each point with a zone, or None when the day needs the full solver.
+
+    That is when more than ``max_imbalance`` of the points would have to leave
+    their nearest zone to meet the limits, or when no assignment meets them.
+    """
+    upper = zones.limits(len(latlon), size_min, size_max, max_imbalance)
+    if upper.sum() < len(latlon):
+        return None
+    points = geo.to_local_planar(latlon)
+    centers = project_centers(zones.centers, latlon, "planar")
+    tree = cKDTree(centers)
+    _, nearest = tree.query(points)
+    sizes = np.bincount(nearest, minlength=len(zones))
+    imbalance = _overflow(sizes, size_min, upper) / max(len(points), 1)
+    if imbalance > max_imbalance:
+        return None
+    labels = nearest
+
+    def candidates_for(m):
+        distances, candidates = tree.query(points, k=m)
+        return candidates.reshape(-1, m), distances.reshape(-1, m) ** 2
+
+    if imbalance > 0:
+        try:
+            labels, _ = assignment.sparse_assignment(
+                candidates_for, len(points), len(zones), size_min, upper, REBALANCE_CANDIDATES
+            )
+        except assignment.AssignmentInfeasible:
+            return None
+    return ZoneAssignment(
+        labels=labels,
+        imbalance=imbalance,
+        moved=int((labels != nearest).sum()),
+        inertia=float(((points - centers[labels]) ** 2).sum()),
+    )